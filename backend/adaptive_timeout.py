@@ -0,0 +1,165 @@
+"""
+Adaptive Modbus Timeouts
+Keeps a rolling round-trip-time estimate per slave (TCP-style SRTT/RTTVAR,
+RFC 6298) and derives per-transaction timeouts and retry budgets from it,
+so a lost frame on a healthy bus is detected in tens of milliseconds
+instead of the fixed TIMEOUT.
+"""
+
+import time
+import threading
+
+# RFC 6298 smoothing constants
+RTT_ALPHA = 1 / 8
+RTT_BETA = 1 / 4
+RTT_K = 4
+RTT_GRANULARITY = 0.01  # Seconds - floor for the variance term
+
+
+def apply_client_timeout(client, timeout):
+    """Set the response timeout on a pymodbus client (sync or async) and its open port"""
+    client.comm_params.timeout_connect = timeout
+    port = getattr(client, 'socket', None)
+    if port is None:
+        return
+    try:
+        if hasattr(port, 'settimeout'):
+            port.settimeout(timeout)  # TCP socket
+        else:
+            port.timeout = timeout  # pyserial port
+    except Exception:
+        pass
+
+
+class RttEstimator:
+    """SRTT/RTTVAR estimate and retransmission timeout for one slave"""
+
+    def __init__(self, min_timeout, max_timeout):
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.srtt = None
+        self.rttvar = None
+        self.rto = max_timeout  # Conservative until the first sample
+        self.backoff = 1
+        self.samples = 0
+        self.timeouts = 0
+        self.last_rtt = None
+        self.min_rtt = None
+        self.max_rtt = None
+        self.lock = threading.Lock()
+
+    def sample(self, rtt):
+        """Feed the round-trip time of a transaction answered on its first try"""
+        with self.lock:
+            if self.srtt is None:
+                self.srtt = rtt
+                self.rttvar = rtt / 2
+            else:
+                self.rttvar = (1 - RTT_BETA) * self.rttvar + RTT_BETA * abs(self.srtt - rtt)
+                self.srtt = (1 - RTT_ALPHA) * self.srtt + RTT_ALPHA * rtt
+            self.samples += 1
+            self.last_rtt = rtt
+            self.min_rtt = rtt if self.min_rtt is None else min(self.min_rtt, rtt)
+            self.max_rtt = rtt if self.max_rtt is None else max(self.max_rtt, rtt)
+            self.backoff = 1
+            self.update_rto()
+
+    def on_timeout(self):
+        """A request went unanswered - back off the timeout (Karn's algorithm)"""
+        with self.lock:
+            self.timeouts += 1
+            self.backoff = min(self.backoff * 2, 64)
+            self.update_rto()
+
+    def update_rto(self):
+        if self.srtt is None:
+            base = self.max_timeout
+        else:
+            base = self.srtt + max(RTT_GRANULARITY, RTT_K * self.rttvar)
+        self.rto = min(max(base * self.backoff, self.min_timeout), self.max_timeout)
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                'srtt_ms': round(self.srtt * 1000, 1) if self.srtt is not None else None,
+                'rttvar_ms': round(self.rttvar * 1000, 1) if self.rttvar is not None else None,
+                'rto_ms': round(self.rto * 1000, 1),
+                'last_rtt_ms': round(self.last_rtt * 1000, 1) if self.last_rtt is not None else None,
+                'min_rtt_ms': round(self.min_rtt * 1000, 1) if self.min_rtt is not None else None,
+                'max_rtt_ms': round(self.max_rtt * 1000, 1) if self.max_rtt is not None else None,
+                'samples': self.samples,
+                'timeouts': self.timeouts,
+                'backoff': self.backoff,
+            }
+
+
+class AdaptiveTimeouts:
+    """Per-slave RTT estimators plus retry budgeting
+
+    Each transaction gets `budget` seconds in total. The number of attempts is
+    how many current timeouts fit in that budget, capped at max_attempts, so a
+    fast bus retries a lost frame quickly while a slow one does not overrun.
+    Every attempt's timeout is clamped to what is left of the budget, so a
+    backed-off timeout cannot stretch a transaction past it either.
+    """
+
+    def __init__(self, min_timeout, max_timeout, budget, max_attempts=3):
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.budget = budget
+        self.max_attempts = max_attempts
+        self.estimators = {}
+        self.lock = threading.Lock()
+        self.retries = 0
+        self.failures = 0
+
+    def estimator(self, slave_id):
+        with self.lock:
+            estimator = self.estimators.get(slave_id)
+            if estimator is None:
+                estimator = RttEstimator(self.min_timeout, self.max_timeout)
+                self.estimators[slave_id] = estimator
+            return estimator
+
+    def timeout_for(self, slave_id, remaining=None):
+        """Current per-transaction timeout for the slave, at most `remaining` seconds"""
+        timeout = self.estimator(slave_id).rto
+        return timeout if remaining is None else min(timeout, remaining)
+
+    def deadline(self):
+        """Monotonic time by which a transaction starting now must finish"""
+        return time.monotonic() + self.budget
+
+    def can_retry(self, attempt, attempts, deadline):
+        """Whether another attempt is allowed and still fits before the deadline"""
+        return attempt < attempts - 1 and deadline - time.monotonic() >= self.min_timeout
+
+    def attempts_for(self, slave_id):
+        """How many tries a transaction to this slave may make within the budget"""
+        return max(1, min(self.max_attempts, int(self.budget / self.timeout_for(slave_id))))
+
+    def record_success(self, slave_id, rtt, attempt):
+        # Only first attempts give an unambiguous RTT sample
+        if attempt == 0:
+            self.estimator(slave_id).sample(rtt)
+
+    def record_timeout(self, slave_id, will_retry):
+        self.estimator(slave_id).on_timeout()
+        with self.lock:
+            if will_retry:
+                self.retries += 1
+            else:
+                self.failures += 1
+
+    def stats(self):
+        """Per-slave RTT stats and totals"""
+        with self.lock:
+            estimators = dict(self.estimators)
+            totals = {'retries': self.retries, 'failed_transactions': self.failures}
+        return {
+            'min_timeout_ms': round(self.min_timeout * 1000, 1),
+            'max_timeout_ms': round(self.max_timeout * 1000, 1),
+            'budget_ms': round(self.budget * 1000, 1),
+            'slaves': {slave_id: estimator.to_dict() for slave_id, estimator in estimators.items()},
+            **totals,
+        }
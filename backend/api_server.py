@@ -3,13 +3,17 @@ REST API Server for Sensor Readings
 Provides endpoints for frontend to get latest sensor data
 """
 
-from flask import Flask, jsonify, request, send_file
+from flask import Flask, Response, jsonify, request, send_file, g
 from flask_cors import CORS
 import psycopg2
 import os
 import io
 import json
-from datetime import datetime
+import base64
+import hashlib
+import time
+import queue
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import pytz
 from reportlab.lib import colors
@@ -23,6 +27,12 @@ matplotlib.use('Agg')  # Use non-interactive backend
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 from matplotlib.backends.backend_agg import FigureCanvasAgg
+from telemetry_rollups import choose_resolution
+from session_archive import load_session_archive, NO_VALVE
+from sensor_calibration import READING_VALUE_COLUMNS, load_calibrations, calibrate_rows
+from db_pool import ConnectionPool
+from live_stream import StreamHub, LiveFeed, format_sse
+from session_cache import SessionCache, FINAL_STATUSES, read_session_version
 
 load_dotenv()
 
@@ -36,6 +46,45 @@ PG_DATABASE = os.getenv('PG_DATABASE', 'autoclave')
 PG_USER = os.getenv('PG_USER', 'postgres')
 PG_PASSWORD = os.getenv('PG_PASSWORD', 'postgres')
 
+# Default point budget for session logs (coarser rollups are used above it; 0 = raw)
+SESSION_LOGS_MAX_POINTS = int(os.getenv('SESSION_LOGS_MAX_POINTS', '2000'))
+
+# Columnar archive of finished sessions (written by the sensor service)
+SESSION_ARCHIVE_DIR = os.getenv(
+    'SESSION_ARCHIVE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'archive')
+)
+
+# Calibration versions are re-read at most this often (seconds)
+CALIBRATION_CACHE_SECONDS = 60
+
+# Database connection pool
+DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', '1'))
+DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', '8'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))  # Seconds a request waits for a free connection
+DB_POOL_MAX_LIFETIME = float(os.getenv('DB_POOL_MAX_LIFETIME', '1800'))  # Seconds before a connection is recycled
+DB_POOL_HEALTH_CHECK_IDLE = float(os.getenv('DB_POOL_HEALTH_CHECK_IDLE', '30'))  # Ping connections idle this long
+
+# /api/stream (Server-Sent Events)
+STREAM_POLL_INTERVAL = float(os.getenv('STREAM_POLL_INTERVAL', '1'))  # Seconds between reads of new samples / session changes
+STREAM_CLIENT_QUEUE = 100  # Events buffered per client before it is dropped as too slow
+STREAM_KEEPALIVE = 15  # Seconds between keepalive comments on an idle stream
+STREAM_RETRY_MS = 2000  # Browser reconnect delay
+STREAM_MAX_SAMPLES = 100  # New samples read per poll at most
+
+# Sessions still in progress are re-read at most this often by the status endpoints (seconds)
+SESSION_CACHE_SECONDS = 2
+
+# /api/sessions page size when per_page is not given, and how long the session total is cached (seconds)
+SESSIONS_PAGE_SIZE = 50
+SESSION_TOTAL_CACHE_SECONDS = 60
+
+# Polled endpoints answer If-None-Match from these in-process copies (seconds)
+LATEST_READING_CACHE_SECONDS = 1  # Newest sample (one is written per second)
+SESSION_VERSION_CACHE_SECONDS = 1  # process_sessions change counter
+# A finished session's last samples can still be queued in the sensor service's
+# telemetry writer; its logs get an ETag only once they have had time to land
+SESSION_LOGS_SETTLE_SECONDS = float(os.getenv('TELEMETRY_FLUSH_INTERVAL', '1')) + 60
+
 # IST timezone (UTC+5:30)
 IST = pytz.timezone('Asia/Kolkata')
 
@@ -43,50 +92,290 @@ def get_ist_now():
     """Get current datetime in IST timezone"""
     return datetime.now(IST)
 
-def get_db_connection():
-    """Create database connection with IST timezone"""
-    conn = psycopg2.connect(
+def connect_db():
+    return psycopg2.connect(
         host=PG_HOST,
         port=PG_PORT,
         database=PG_DATABASE,
         user=PG_USER,
-        password=PG_PASSWORD
+        password=PG_PASSWORD,
+        application_name='autoclave-api'
     )
-    # Set timezone to IST
+
+def set_ist_timezone(conn):
+    """Pool init hook: session timezone IST (once per physical connection)"""
     cursor = conn.cursor()
     cursor.execute("SET timezone = 'Asia/Kolkata'")
-    conn.commit()
     cursor.close()
+
+db_pool = ConnectionPool(
+    connect_db,
+    minconn=DB_POOL_MIN,
+    maxconn=DB_POOL_MAX,
+    timeout=DB_POOL_TIMEOUT,
+    max_lifetime=DB_POOL_MAX_LIFETIME,
+    health_check_idle=DB_POOL_HEALTH_CHECK_IDLE,
+    init_hooks=[set_ist_timezone]
+)
+
+def get_db_connection():
+    """Pooled database connection (IST timezone); conn.close() returns it to the pool
+
+    Connections a handler does not close are returned when the request ends.
+    """
+    conn = db_pool.connection()
+    g.setdefault('db_connections', []).append(conn)
     return conn
 
-@app.route('/api/sensor-readings/latest', methods=['GET'])
-def get_latest_reading():
-    """Get the latest sensor reading"""
-    try:
-        conn = get_db_connection()
+@app.teardown_request
+def release_db_connections(exc=None):
+    for conn in g.pop('db_connections', []):
+        if not conn.returned:
+            conn.close()
+
+calibration_cache = {'loaded_at': 0, 'calibrations': None}
+
+def get_calibrations(cursor):
+    """Sensor calibration versions (cached for CALIBRATION_CACHE_SECONDS)"""
+    now = time.monotonic()
+    if calibration_cache['calibrations'] is None or now - calibration_cache['loaded_at'] > CALIBRATION_CACHE_SECONDS:
+        calibration_cache['calibrations'] = load_calibrations(cursor)
+        calibration_cache['loaded_at'] = now
+    return calibration_cache['calibrations']
+
+def fetch_readings(cursor, sql, params=()):
+    """Run a sensor_readings query selecting timestamp, READING_VALUE_COLUMNS, ...
+    and return rows as (timestamp, pressure, temperature, ...) with counts converted"""
+    cursor.execute(sql, params)
+    rows = cursor.fetchall()
+    return calibrate_rows(rows, get_calibrations(cursor)) if rows else rows
+
+SESSION_COLUMNS = """id, program_name, status, start_time, end_time, target_pressure, duration_minutes, steps_data,
+                   roll_category_name, sub_roll_name, roll_id, operator_name, number_of_rolls"""
+
+def session_to_dict(row):
+    """process_sessions row (SESSION_COLUMNS) as returned by the sessions endpoints"""
+    return {
+        'id': row[0],
+        'program_name': row[1],
+        'status': row[2],
+        'start_time': row[3].isoformat() if row[3] else None,
+        'end_time': row[4].isoformat() if row[4] else None,
+        'target_pressure': float(row[5]) if row[5] else None,
+        'duration_minutes': int(row[6]) if row[6] else None,
+        'steps_data': row[7] if row[7] else None,
+        'roll_category_name': row[8],
+        'sub_roll_name': row[9],
+        'roll_id': row[10],
+        'operator_name': row[11],
+        'number_of_rolls': int(row[12]) if row[12] else None
+    }
+
+session_cache = SessionCache(SESSION_CACHE_SECONDS)
+
+def not_modified(etag):
+    """Empty 304 if the client's If-None-Match already has etag, else None"""
+    if etag is None or not request.if_none_match.contains(etag):
+        return None
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
+
+def with_etag(response, etag):
+    """Strong ETag, and make browsers revalidate instead of reusing the response"""
+    if etag is not None:
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+session_version_cache = {'loaded_at': None, 'version': None}  # loaded_at None: not read yet
+
+def get_session_version():
+    """process_sessions change counter, re-read at most every SESSION_VERSION_CACHE_SECONDS
+
+    None if the counter table does not exist yet (no ETags then). That is
+    cached too, so a missing table costs one failing SELECT per interval.
+    """
+    now = time.monotonic()
+    loaded_at = session_version_cache['loaded_at']
+    if loaded_at is None or now - loaded_at > SESSION_VERSION_CACHE_SECONDS:
+        try:
+            with db_pool.connection() as conn:
+                cursor = conn.cursor()
+                version = read_session_version(cursor)
+                cursor.close()
+        except psycopg2.errors.UndefinedTable:
+            version = None
+        session_version_cache['version'] = version
+        session_version_cache['loaded_at'] = now
+    return session_version_cache['version']
+
+def load_active_session():
+    """Newest running/paused session (partial index idx_sessions_active)"""
+    with db_pool.connection() as conn:
         cursor = conn.cursor()
-        
         cursor.execute(
-            "SELECT timestamp, pressure, temperature FROM sensor_readings ORDER BY timestamp DESC LIMIT 1"
+            f"SELECT {SESSION_COLUMNS} FROM process_sessions "
+            f"WHERE status IN ('running', 'paused') ORDER BY id DESC LIMIT 1"
         )
-        
         row = cursor.fetchone()
         cursor.close()
-        conn.close()
-        
-        if row:
-            return jsonify({
-                'timestamp': row[0].isoformat() if row[0] else None,
-                'pressure': float(row[1]),
-                'temperature': float(row[2])
-            })
+    return session_to_dict(row) if row else None
+
+def load_session(session_id):
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT {SESSION_COLUMNS} FROM process_sessions WHERE id = %s", (session_id,))
+        row = cursor.fetchone()
+        cursor.close()
+    return session_to_dict(row) if row else None
+
+@app.after_request
+def invalidate_sessions_on_write(response):
+    # Every POST endpoint starts, stops, pauses or resumes a session
+    if request.method == 'POST':
+        session_cache.invalidate()
+        session_version_cache['loaded_at'] = None
+    return response
+
+@app.route('/api/sessions/active', methods=['GET'])
+def get_active_session():
+    """The running or paused session, or null - answered from the session cache"""
+    try:
+        return jsonify(session_cache.get_active(load_active_session))
+    except Exception as e:
+        print(f"[ERROR] get_active_session: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/sessions/<int:session_id>', methods=['GET'])
+def get_session(session_id):
+    """One session by id - answered from the session cache"""
+    try:
+        session = session_cache.get(session_id, load_session)
+        if session is None:
+            return jsonify({'error': 'Session not found'}), 404
+        return jsonify(session)
+    except Exception as e:
+        print(f"[ERROR] get_session: {e}")
+        return jsonify({'error': str(e)}), 500
+
+live_state = {'last_timestamp': None, 'sessions': {}}  # Owned by the live feed thread
+
+def poll_live_state(publish):
+    """LiveFeed poll: publish every new sample and every session status change"""
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        if live_state['last_timestamp'] is None:
+            sql, params = "ORDER BY timestamp DESC LIMIT 1", ()
         else:
-            # No readings yet - return default values
-            return jsonify({
-                'timestamp': None,
-                'pressure': 0,
-                'temperature': 25
+            sql, params = "WHERE timestamp > %s ORDER BY timestamp DESC LIMIT %s", (live_state['last_timestamp'], STREAM_MAX_SAMPLES)
+        rows = fetch_readings(
+            cursor, f"SELECT timestamp, {READING_VALUE_COLUMNS}, valve_position, session_id FROM sensor_readings {sql}", params
+        )
+        for row in reversed(rows):
+            publish('reading', {
+                'timestamp': row[0].isoformat(),
+                'pressure': row[1],
+                'temperature': row[2],
+                'valve_position': row[3],
+                'session_id': row[4]
             })
+        if rows:
+            live_state['last_timestamp'] = rows[0][0]
+
+        # Active sessions, plus the ones that were active last time (to see them finish)
+        cursor.execute(
+            f"SELECT {SESSION_COLUMNS} FROM process_sessions "
+            f"WHERE status IN ('running', 'paused') OR id = ANY(%s) ORDER BY id",
+            (list(live_state['sessions']),)
+        )
+        sessions = {}
+        for row in cursor.fetchall():
+            session = session_to_dict(row)
+            if live_state['sessions'].get(session['id']) != session['status']:
+                session_cache.invalidate()  # e.g. completed by the sensor service
+                publish('session', session)
+            if session['status'] in ('running', 'paused'):
+                sessions[session['id']] = session['status']
+        live_state['sessions'] = sessions
+        cursor.close()
+
+stream_hub = StreamHub(STREAM_CLIENT_QUEUE)
+live_feed = LiveFeed(stream_hub, poll_live_state, STREAM_POLL_INTERVAL)
+
+@app.route('/api/stream', methods=['GET'])
+def stream_events():
+    """Server-Sent Events: 'reading' for each new sample, 'session' for each session status change
+
+    All clients share one feed thread, so N dashboards cost one read per
+    interval. A client that falls STREAM_CLIENT_QUEUE events behind is sent
+    'dropped' and disconnected; the browser reconnects by itself.
+    """
+    subscriber = stream_hub.subscribe()
+    live_feed.ensure_running()
+
+    def events():
+        try:
+            yield f"retry: {STREAM_RETRY_MS}\n\n"
+            while not subscriber.dropped:
+                try:
+                    _, message = subscriber.queue.get(timeout=STREAM_KEEPALIVE)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                yield message
+            yield format_sse('dropped', {'reason': 'client too slow'})
+        finally:
+            stream_hub.unsubscribe(subscriber)
+
+    return Response(events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Don't let a reverse proxy buffer the stream
+    })
+
+latest_reading_cache = {'loaded_at': 0, 'reading': None}
+
+@app.route('/api/sensor-readings/latest', methods=['GET'])
+def get_latest_reading():
+    """Get the latest sensor reading
+
+    The newest sample is read at most every LATEST_READING_CACHE_SECONDS
+    however many clients poll; its timestamp is the ETag, so a poll that
+    finds nothing new gets an empty 304.
+    """
+    try:
+        now = time.monotonic()
+        reading = latest_reading_cache['reading']
+        if reading is None or now - latest_reading_cache['loaded_at'] > LATEST_READING_CACHE_SECONDS:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            
+            rows = fetch_readings(
+                cursor, f"SELECT timestamp, {READING_VALUE_COLUMNS} FROM sensor_readings ORDER BY timestamp DESC LIMIT 1"
+            )
+            
+            row = rows[0] if rows else None
+            cursor.close()
+            conn.close()
+            
+            if row:
+                reading = {
+                    'timestamp': row[0].isoformat() if row[0] else None,
+                    'pressure': float(row[1]),
+                    'temperature': float(row[2])
+                }
+            else:
+                # No readings yet - return default values
+                reading = {
+                    'timestamp': None,
+                    'pressure': 0,
+                    'temperature': 25
+                }
+            latest_reading_cache['reading'] = reading
+            latest_reading_cache['loaded_at'] = now
+        
+        etag = f"reading-{reading['timestamp']}"
+        return not_modified(etag) or with_etag(jsonify(reading), etag)
     except Exception as e:
         import traceback
         print(f"[ERROR] get_latest_reading: {e}")
@@ -102,12 +391,11 @@ def get_recent_readings():
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        cursor.execute(
-            "SELECT timestamp, pressure, temperature FROM sensor_readings ORDER BY timestamp DESC LIMIT %s",
+        rows = fetch_readings(
+            cursor,
+            f"SELECT timestamp, {READING_VALUE_COLUMNS} FROM sensor_readings ORDER BY timestamp DESC LIMIT %s",
             (limit,)
         )
-        
-        rows = cursor.fetchall()
         cursor.close()
         conn.close()
         
@@ -124,206 +412,277 @@ def get_recent_readings():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def session_detail_count_sql(alias):
+    """How many roll detail columns of a session are filled in (SQL expression)"""
+    columns = ('roll_category_name', 'sub_roll_name', 'roll_id', 'operator_name', 'number_of_rolls')
+    return ' + '.join(f"({alias}.{column} IS NOT NULL)::int" for column in columns)
+
+# Sessions created twice (same start_time, program_name and roll_category_name) are
+# listed once: the copy with the most roll details, and of those the newest id.
+# Evaluated per row through the start_time index, so it does not grow with the table.
+UNIQUE_SESSION_SQL = f"""NOT EXISTS (
+                SELECT 1 FROM process_sessions d
+                WHERE d.start_time = s.start_time
+                  AND d.program_name IS NOT DISTINCT FROM s.program_name
+                  AND d.roll_category_name IS NOT DISTINCT FROM s.roll_category_name
+                  AND ({session_detail_count_sql('d')}, d.id) > ({session_detail_count_sql('s')}, s.id)
+            )"""
+
+def encode_cursor(session, direction):
+    """Opaque page cursor: the (start_time, id) key of a session plus the direction to read in"""
+    payload = json.dumps([session['start_time'], session['id'], direction]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+def decode_cursor(cursor_param):
+    """(start_time, id, direction) from a cursor; ValueError if it is not one of ours"""
+    try:
+        payload = base64.urlsafe_b64decode(cursor_param + '=' * (-len(cursor_param) % 4))
+        start_time, session_id, direction = json.loads(payload)
+        if direction not in ('next', 'prev'):
+            raise ValueError(direction)
+        return datetime.fromisoformat(start_time), int(session_id), direction
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+session_total_cache = {'loaded_at': 0, 'total': None, 'version': None}
+
+def get_session_total(cursor, version=None):
+    """Number of (de-duplicated) sessions
+
+    Re-counted when the session change counter moves, or without the
+    counter at most every SESSION_TOTAL_CACHE_SECONDS (approximate in between).
+    """
+    now = time.monotonic()
+    if version is not None:
+        stale = session_total_cache['version'] != version
+    else:
+        stale = session_total_cache['total'] is None or now - session_total_cache['loaded_at'] > SESSION_TOTAL_CACHE_SECONDS
+    if stale:
+        cursor.execute(f"SELECT COUNT(*) FROM process_sessions s WHERE {UNIQUE_SESSION_SQL}")
+        session_total_cache['total'] = cursor.fetchone()[0]
+        session_total_cache['loaded_at'] = now
+        session_total_cache['version'] = version
+    return session_total_cache['total']
+
 @app.route('/api/sessions', methods=['GET'])
 def get_sessions():
-    """Get all process sessions with pagination support"""
+    """Process sessions, newest first, with keyset (cursor) pagination
+
+    ?per_page=N (default SESSIONS_PAGE_SIZE, at most 1000) and ?cursor= from
+    a previous page's next_cursor / prev_cursor. Pages are read with an
+    index range scan on (start_time, id), so a deep page costs the same as
+    the first. Duplicate sessions are filtered out in the query
+    (UNIQUE_SESSION_SQL). The total is cached and approximate (?total=0
+    leaves it out).
+
+    The ETag is the process_sessions change counter plus the query string,
+    so an unchanged page is answered with an empty 304.
+    """
+    per_page = request.args.get('per_page', type=int)
+    per_page = min(per_page, 1000) if per_page and per_page > 0 else SESSIONS_PAGE_SIZE
+    with_total = request.args.get('total', '1') != '0'
+    cursor_param = request.args.get('cursor')
+    try:
+        key = decode_cursor(cursor_param) if cursor_param else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     try:
-        # Get database connection first
+        # Version first: a page read after it is never older than its ETag says
+        version = get_session_version()
+        etag = None
+        if version is not None:
+            etag = f"sessions-{version}-{hashlib.sha1(request.query_string).hexdigest()[:16]}"
+            response = not_modified(etag)
+            if response:
+                return response
+        
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        # Get pagination parameters
-        page = request.args.get('page', 1, type=int)
-        per_page_param = request.args.get('per_page', type=int)
-        
-        # If per_page is not specified or is 0, get all sessions (no pagination)
-        if per_page_param is None or per_page_param <= 0:
-            # Get all sessions without limit
-            cursor.execute("""
-                SELECT id, program_name, status, start_time, end_time, target_pressure, duration_minutes, steps_data,
-                       roll_category_name, sub_roll_name, roll_id, operator_name, number_of_rolls
-                FROM process_sessions 
-                ORDER BY start_time DESC
-            """)
-            rows = cursor.fetchall()
-            
-            # Get total count
-            cursor.execute("SELECT COUNT(*) FROM process_sessions")
-            total_count = cursor.fetchone()[0]
-            
-            cursor.close()
-            conn.close()
-            
-            sessions = [
-                {
-                    'id': row[0],
-                    'program_name': row[1],
-                    'status': row[2],
-                    'start_time': row[3].isoformat() if row[3] else None,
-                    'end_time': row[4].isoformat() if row[4] else None,
-                    'target_pressure': float(row[5]) if row[5] else None,
-                    'duration_minutes': int(row[6]) if row[6] else None,
-                    'steps_data': row[7] if row[7] else None,
-                    'roll_category_name': row[8] if len(row) > 8 else None,
-                    'sub_roll_name': row[9] if len(row) > 9 else None,
-                    'roll_id': row[10] if len(row) > 10 else None,
-                    'operator_name': row[11] if len(row) > 11 else None,
-                    'number_of_rolls': int(row[12]) if len(row) > 12 and row[12] else None
-                }
-                for row in rows
-            ]
-            
-            # Deduplicate (same logic as below)
-            seen_sessions = {}
-            deduplicated = []
-            
-            for session in sessions:
-                if session['roll_category_name']:
-                    key = f"{session['start_time']}_{session['program_name']}_{session['roll_category_name']}"
-                else:
-                    key = f"{session['start_time']}_{session['program_name']}"
-                
-                if key not in seen_sessions:
-                    seen_sessions[key] = session
-                    deduplicated.append(session)
-                else:
-                    existing = seen_sessions[key]
-                    if session['roll_category_name'] and not existing['roll_category_name']:
-                        deduplicated.remove(existing)
-                        deduplicated.append(session)
-                        seen_sessions[key] = session
-                    elif session['roll_category_name'] == existing['roll_category_name']:
-                        session_fields = sum(1 for v in [session.get('roll_category_name'), session.get('sub_roll_name'), 
-                                                         session.get('roll_id'), session.get('operator_name'), 
-                                                         session.get('number_of_rolls')] if v is not None)
-                        existing_fields = sum(1 for v in [existing.get('roll_category_name'), existing.get('sub_roll_name'),
-                                                           existing.get('roll_id'), existing.get('operator_name'),
-                                                           existing.get('number_of_rolls')] if v is not None)
-                        if session_fields > existing_fields:
-                            deduplicated.remove(existing)
-                            deduplicated.append(session)
-                            seen_sessions[key] = session
-            
-            return jsonify({
-                'sessions': deduplicated,
-                'pagination': {
-                    'page': 1,
-                    'per_page': len(deduplicated),
-                    'total': total_count,
-                    'total_pages': 1,
-                    'has_next': False,
-                    'has_prev': False
-                }
-            })
-        
-        # Validate parameters for pagination
-        page = max(1, page)  # Page must be at least 1
-        per_page = min(max(1, per_page_param), 1000)  # Between 1 and 1000
-        
-        offset = (page - 1) * per_page
-        
-        # Get total count for pagination
-        cursor.execute("SELECT COUNT(*) FROM process_sessions")
-        total_count = cursor.fetchone()[0]
-        
-        # Get paginated sessions
-        cursor.execute("""
-            SELECT id, program_name, status, start_time, end_time, target_pressure, duration_minutes, steps_data,
-                   roll_category_name, sub_roll_name, roll_id, operator_name, number_of_rolls
-            FROM process_sessions 
-            ORDER BY start_time DESC 
-            LIMIT %s OFFSET %s
-        """, (per_page, offset))
-        
+        # start_time is set for every session on insert; the keyset needs it
+        if key is None:
+            where, order, params = "s.start_time IS NOT NULL", "DESC", ()
+        elif key[2] == 'next':
+            where, order, params = "s.start_time IS NOT NULL AND (s.start_time, s.id) < (%s, %s)", "DESC", key[:2]
+        else:
+            where, order, params = "s.start_time IS NOT NULL AND (s.start_time, s.id) > (%s, %s)", "ASC", key[:2]
+        cursor.execute(f"""
+            SELECT {SESSION_COLUMNS}
+            FROM process_sessions s
+            WHERE {where} AND {UNIQUE_SESSION_SQL}
+            ORDER BY s.start_time {order}, s.id {order}
+            LIMIT %s
+        """, params + (per_page + 1,))
         rows = cursor.fetchall()
+        total = get_session_total(cursor, version) if with_total else None
         cursor.close()
         conn.close()
         
-        sessions = [
-            {
-                'id': row[0],
-                'program_name': row[1],
-                'status': row[2],
-                'start_time': row[3].isoformat() if row[3] else None,
-                'end_time': row[4].isoformat() if row[4] else None,
-                'target_pressure': float(row[5]) if row[5] else None,
-                'duration_minutes': int(row[6]) if row[6] else None,
-                'steps_data': row[7] if row[7] else None,
-                'roll_category_name': row[8] if len(row) > 8 else None,
-                'sub_roll_name': row[9] if len(row) > 9 else None,
-                'roll_id': row[10] if len(row) > 10 else None,
-                'operator_name': row[11] if len(row) > 11 else None,
-                'number_of_rolls': int(row[12]) if len(row) > 12 and row[12] else None
-            }
-            for row in rows
-        ]
+        more = len(rows) > per_page  # Another page in the direction we read
+        rows = rows[:per_page]
+        if order == 'ASC':
+            rows.reverse()
+        if key is None:
+            has_prev, has_next = False, more
+        elif key[2] == 'next':
+            has_prev, has_next = True, more
+        else:
+            has_prev, has_next = more, True
         
-        # Deduplicate sessions: If multiple sessions have same start_time, program_name, and roll_category_name,
-        # keep only the one with roll details (roll_category_name is not null) or the one with more details
-        seen_sessions = {}
-        deduplicated = []
+        sessions = [session_to_dict(row) for row in rows]
         
-        for session in sessions:
-            # Create a key based on start_time, program_name, and roll_category_name
-            # For auto programs, use roll_category_name as part of the key
-            if session['roll_category_name']:
-                key = f"{session['start_time']}_{session['program_name']}_{session['roll_category_name']}"
-            else:
-                key = f"{session['start_time']}_{session['program_name']}"
-            
-            if key not in seen_sessions:
-                # First time seeing this key - add it
-                seen_sessions[key] = session
-                deduplicated.append(session)
-            else:
-                # Duplicate found - keep the one with more details (roll_category_name, etc.)
-                existing = seen_sessions[key]
-                
-                # Prefer session with roll_category_name over one without
-                if session['roll_category_name'] and not existing['roll_category_name']:
-                    # Replace with the one that has roll details
-                    deduplicated.remove(existing)
-                    deduplicated.append(session)
-                    seen_sessions[key] = session
-                elif session['roll_category_name'] == existing['roll_category_name']:
-                    # Both have same roll_category_name - prefer the one with more non-null fields
-                    session_fields = sum(1 for v in [session.get('roll_category_name'), session.get('sub_roll_name'), 
-                                                     session.get('roll_id'), session.get('operator_name'), 
-                                                     session.get('number_of_rolls')] if v is not None)
-                    existing_fields = sum(1 for v in [existing.get('roll_category_name'), existing.get('sub_roll_name'),
-                                                       existing.get('roll_id'), existing.get('operator_name'),
-                                                       existing.get('number_of_rolls')] if v is not None)
-                    
-                    if session_fields > existing_fields:
-                        deduplicated.remove(existing)
-                        deduplicated.append(session)
-                        seen_sessions[key] = session
-                # Otherwise keep the existing one
-        
-        # Calculate pagination metadata
-        total_pages = (total_count + per_page - 1) // per_page if total_count > 0 else 1
-        
-        return jsonify({
-            'sessions': deduplicated,
+        return with_etag(jsonify({
+            'sessions': sessions,
             'pagination': {
-                'page': page,
                 'per_page': per_page,
-                'total': total_count,
-                'total_pages': total_pages,
-                'has_next': page < total_pages,
-                'has_prev': page > 1
+                'next_cursor': encode_cursor(sessions[-1], 'next') if has_next and sessions else None,
+                'prev_cursor': encode_cursor(sessions[0], 'prev') if has_prev and sessions else None,
+                'has_next': has_next and bool(sessions),
+                'has_prev': has_prev and bool(sessions),
+                'total': total,
+                'total_pages': max(1, -(-total // per_page)) if total is not None else None,
+                'total_is_approximate': version is None
             }
-        })
+        }), etag)
     except Exception as e:
         import traceback
         print(f"[ERROR] get_sessions: {e}")
         print(traceback.format_exc())
         return jsonify({'error': str(e), 'detail': traceback.format_exc()}), 500
 
+def archived_session_rows(archive, newest_first=False, limit=None):
+    """Rows in the fetch_session_readings format from a session archive (converted column-wise)"""
+    def column(values):
+        values = values[::-1] if newest_first else values
+        return values[:limit] if limit else values
+    timestamps = column(archive['timestamp']).astype(datetime).tolist()
+    pressures = column(archive['pressure']).astype('float64').round(2).tolist()
+    temperatures = column(archive['temperature']).astype('float64').round(2).tolist()
+    valves = [None if v == NO_VALVE else v for v in column(archive['valve']).tolist()]
+    return list(zip(timestamps, pressures, temperatures, valves))
+
+def fetch_session_readings(cursor, session_id, start_time, end_time, newest_first=False, limit=None):
+    """Telemetry rows (timestamp, pressure, temperature, valve_position) for a session
+
+    Samples are tagged with their session_id at ingest. Sessions recorded
+    before that have no tagged rows and fall back to the session's time range.
+    The start_time bound lets PostgreSQL skip older monthly partitions.
+    Archived sessions are read from their memory-mapped archive file instead.
+    Raw ADC counts are converted with the calibration in effect at each sample.
+    """
+    archive = load_session_archive(SESSION_ARCHIVE_DIR, session_id)
+    if archive is not None:
+        return archived_session_rows(archive, newest_first, limit)
+    order = 'DESC' if newest_first else 'ASC'
+    limit_sql = f" LIMIT {int(limit)}" if limit else ""
+    rows = fetch_readings(
+        cursor,
+        f"""
+        SELECT timestamp, {READING_VALUE_COLUMNS}, valve_position
+        FROM sensor_readings
+        WHERE session_id = %s AND timestamp >= %s
+        ORDER BY timestamp {order}{limit_sql}
+        """,
+        (session_id, start_time)
+    )
+    if rows:
+        return rows
+    if end_time:
+        where, params = "timestamp >= %s AND timestamp <= %s", (start_time, end_time)
+    else:
+        where, params = "timestamp >= %s", (start_time,)
+    return fetch_readings(
+        cursor,
+        f"""
+        SELECT timestamp, {READING_VALUE_COLUMNS}, valve_position
+        FROM sensor_readings
+        WHERE {where}
+        ORDER BY timestamp {order}{limit_sql}
+        """,
+        params
+    )
+
+def fetch_session_rollups(cursor, table, unit, session_id, start_time, end_time):
+    """Rollup buckets for a session from a sensor_rollup_* table, oldest first
+
+    Each row is (bucket, samples, pressure min/max/avg/last, temperature
+    min/max/avg/last, valve min/max/avg/last). Sessions recorded before
+    samples were session-tagged fall back to the idle buckets (session 0)
+    in the session's time range.
+    """
+    columns = """bucket, samples,
+               pressure_min, pressure_max, pressure_avg, pressure_last,
+               temperature_min, temperature_max, temperature_avg, temperature_last,
+               valve_min, valve_max, valve_avg, valve_last"""
+    cursor.execute(
+        f"SELECT {columns} FROM {table} WHERE session_id = %s AND bucket >= date_trunc(%s, %s::timestamp) ORDER BY bucket",
+        (session_id, unit, start_time)
+    )
+    rows = cursor.fetchall()
+    if rows:
+        return rows
+    if end_time:
+        cursor.execute(
+            f"SELECT {columns} FROM {table} WHERE session_id = 0 AND bucket >= date_trunc(%s, %s::timestamp) AND bucket <= %s ORDER BY bucket",
+            (unit, start_time, end_time)
+        )
+    else:
+        cursor.execute(
+            f"SELECT {columns} FROM {table} WHERE session_id = 0 AND bucket >= date_trunc(%s, %s::timestamp) ORDER BY bucket",
+            (unit, start_time)
+        )
+    return cursor.fetchall()
+
+def format_rollup(row):
+    """One rollup bucket in the session log format, plus min/max per metric"""
+    def value(v):
+        return round(float(v), 2) if v is not None else None
+    log = {
+        'timestamp': row[0].isoformat() if row[0] else None,
+        'pressure': value(row[4]),
+        'temperature': value(row[8]),
+        'valve_position': int(row[13]) if row[13] is not None else None,
+        'status': 'running',
+        'samples': row[1],
+    }
+    for offset, metric in ((2, 'pressure'), (6, 'temperature'), (10, 'valve')):
+        log[f'{metric}_min'] = value(row[offset])
+        log[f'{metric}_max'] = value(row[offset + 1])
+    return log
+
+def session_logs_etag(session, max_points):
+    """ETag of a finished session's logs, or None while they can still change
+
+    A session counts as finished SESSION_LOGS_SETTLE_SECONDS after its end,
+    once the writer has flushed its last samples. Covers the calibration
+    versions in use (a new version recalculates history), so it needs them
+    loaded; None until then.
+    """
+    if session is None or session['status'] not in FINAL_STATUSES or calibration_cache['calibrations'] is None:
+        return None
+    if session['end_time'] is None:
+        return None
+    settled = datetime.fromisoformat(session['end_time']).replace(tzinfo=None) + timedelta(seconds=SESSION_LOGS_SETTLE_SECONDS)
+    if get_ist_now().replace(tzinfo=None) < settled:
+        return None
+    calibration = max((c.version or 0 for c in calibration_cache['calibrations']), default=0)
+    return f"logs-{session['id']}-{session['end_time']}-{max_points}-cal{calibration}"
+
 @app.route('/api/sessions/<int:session_id>/logs', methods=['GET'])
 def get_session_logs(session_id):
-    """Get logs for a specific session - includes all sensor readings during session time range"""
+    """Get logs for a specific session - every telemetry sample recorded for it
+
+    ?max_points=N (default SESSION_LOGS_MAX_POINTS, 0 = raw) picks the finest
+    resolution (raw, 1-minute or 1-hour rollups) that fits in N points. The
+    resolution used is returned in the X-Resolution header.
+    """
+    max_points = request.args.get('max_points', SESSION_LOGS_MAX_POINTS, type=int)
     try:
+        # Finished sessions no longer change - their logs can be revalidated without a query
+        response = not_modified(session_logs_etag(session_cache.get(session_id, load_session), max_points))
+        if response:
+            return response
+        
         conn = get_db_connection()
         cursor = conn.cursor()
         
@@ -339,41 +698,34 @@ def get_session_logs(session_id):
         
         start_time, end_time = session_row
         
+        # Session length decides how many raw samples there are
+        now = get_ist_now() if start_time.tzinfo else get_ist_now().replace(tzinfo=None)
+        span_seconds = ((end_time or now) - start_time).total_seconds()
+        resolution, _, table, unit = choose_resolution(span_seconds, max_points)
+        
+        if resolution != 'raw':
+            logs = [format_rollup(row) for row in fetch_session_rollups(cursor, table, unit, session_id, start_time, end_time)]
+            cursor.close()
+            conn.close()
+            response = jsonify(logs)
+            response.headers['X-Resolution'] = resolution
+            return with_etag(response, session_logs_etag(session_cache.get(session_id, load_session), max_points))
+        
         if end_time:
-            # Session is completed - get all sensor readings within time range
-            cursor.execute(
-                """
-                SELECT timestamp, pressure, temperature 
-                FROM sensor_readings 
-                WHERE timestamp >= %s AND timestamp <= %s 
-                ORDER BY timestamp ASC
-                """,
-                (start_time, end_time)
-            )
+            # Session is completed - all of its samples
+            rows = fetch_session_readings(cursor, session_id, start_time, end_time)
         else:
-            # Session is still running - get recent readings
-            cursor.execute(
-                """
-                SELECT timestamp, pressure, temperature 
-                FROM sensor_readings 
-                WHERE timestamp >= %s
-                ORDER BY timestamp DESC
-                LIMIT 1000
-                """,
-                (start_time,)
-            )
-        
-        rows = cursor.fetchall()
+            # Session is still running - most recent samples
+            rows = fetch_session_readings(cursor, session_id, start_time, end_time, newest_first=True, limit=1000)
         cursor.close()
         conn.close()
         
-        # Format logs with valve_position and status (use null for historical data)
         logs = [
             {
                 'timestamp': row[0].isoformat() if row[0] else None,
                 'pressure': float(row[1]),
                 'temperature': float(row[2]),
-                'valve_position': None,
+                'valve_position': row[3],
                 'status': 'running'
             }
             for row in rows
@@ -383,7 +735,9 @@ def get_session_logs(session_id):
         if not end_time and len(logs) > 0:
             logs.reverse()
         
-        return jsonify(logs)
+        response = jsonify(logs)
+        response.headers['X-Resolution'] = resolution
+        return with_etag(response, session_logs_etag(session_cache.get(session_id, load_session), max_points))
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -423,23 +777,7 @@ def generate_pdf_report(session_id):
                 program_steps = steps_data if isinstance(steps_data, list) else [steps_data]
         
         # Get sensor readings for the session
-        if end_time:
-            cursor.execute("""
-                SELECT timestamp, pressure, temperature 
-                FROM sensor_readings 
-                WHERE timestamp >= %s AND timestamp <= %s 
-                ORDER BY timestamp ASC
-            """, (start_time, end_time))
-        else:
-            cursor.execute("""
-                SELECT timestamp, pressure, temperature 
-                FROM sensor_readings 
-                WHERE timestamp >= %s
-                ORDER BY timestamp ASC
-                LIMIT 1000
-            """, (start_time,))
-        
-        readings = cursor.fetchall()
+        readings = fetch_session_readings(cursor, session_id, start_time, end_time, limit=None if end_time else 1000)
         cursor.close()
         conn.close()
         
@@ -761,9 +1099,12 @@ def generate_pdf_report(session_id):
         
         # Prepare data for side-by-side tables - split 72 records into two columns
         # Create left table data (first 36 records)
-        left_table_data = [['Timestamp', 'PSI', '°C']]
+        # Valve column only for sessions recorded with valve positions
+        has_valve = any(r[3] is not None for r in readings)
+        header = ['Timestamp', 'PSI', '°C', 'Valve'] if has_valve else ['Timestamp', 'PSI', '°C']
+        left_table_data = [list(header)]
         # Create right table data (last 36 records)
-        right_table_data = [['Timestamp', 'PSI', '°C']]
+        right_table_data = [list(header)]
         
         # Split records into two halves
         mid_point = len(sampled_indices) // 2
@@ -777,6 +1118,9 @@ def generate_pdf_report(session_id):
                     f"{float(pressure):.2f}",
                     f"{float(temperature):.2f}"
                 ]
+                if has_valve:
+                    valve = readings[idx][3]
+                    row_data.append(str(valve) if valve is not None else '-')
                 
                 if i < mid_point:
                     left_table_data.append(row_data)
@@ -787,13 +1131,15 @@ def generate_pdf_report(session_id):
         available_width = 8.27*inch - 1.0*inch  # A4 width minus left and right margins
         table_width = available_width / 2 - 0.1*inch  # Half width minus gap between tables
         
+        col_widths = [1.4*inch, 0.6*inch, 0.6*inch, 0.6*inch] if has_valve else [1.6*inch, 0.8*inch, 0.8*inch]
+        
         # Create left table with reduced column widths
-        left_table = Table(left_table_data, colWidths=[1.6*inch, 0.8*inch, 0.8*inch])
+        left_table = Table(left_table_data, colWidths=col_widths)
         left_table.setStyle(TableStyle([
             ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
             ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
             ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('ALIGN', (1, 1), (2, -1), 'CENTER'),
+            ('ALIGN', (1, 1), (-1, -1), 'CENTER'),
             ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
             ('FONTSIZE', (0, 0), (-1, 0), 7),
             ('FONTSIZE', (0, 1), (-1, -1), 6),
@@ -807,12 +1153,12 @@ def generate_pdf_report(session_id):
         ]))
         
         # Create right table with reduced column widths
-        right_table = Table(right_table_data, colWidths=[1.6*inch, 0.8*inch, 0.8*inch])
+        right_table = Table(right_table_data, colWidths=col_widths)
         right_table.setStyle(TableStyle([
             ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
             ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
             ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('ALIGN', (1, 1), (2, -1), 'CENTER'),
+            ('ALIGN', (1, 1), (-1, -1), 'CENTER'),
             ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
             ('FONTSIZE', (0, 0), (-1, 0), 7),
             ('FONTSIZE', (0, 1), (-1, -1), 6),
@@ -1347,17 +1693,19 @@ def health_check():
     try:
         conn = get_db_connection()
         conn.close()
-        return jsonify({'status': 'healthy', 'database': 'connected'})
+        return jsonify({'status': 'healthy', 'database': 'connected', 'db_pool': db_pool.stats(), 'stream': stream_hub.stats(),
+                        'session_cache': session_cache.stats()})
     except Exception as e:
-        return jsonify({'status': 'unhealthy', 'error': str(e)}), 500
+        return jsonify({'status': 'unhealthy', 'error': str(e), 'db_pool': db_pool.stats()}), 500
 
 if __name__ == '__main__':
     print("="*60)
     print("Sensor Readings API Server")
     print("="*60)
-    print(f"PostgreSQL: {PG_HOST}:{PG_PORT}/{PG_DATABASE}")
+    print(f"PostgreSQL: {PG_HOST}:{PG_PORT}/{PG_DATABASE} (pool of up to {DB_POOL_MAX} connections)")
     print(f"Starting server on http://localhost:5000")
     print("="*60)
     
+    db_pool.fill()
     app.run(host='0.0.0.0', port=5000, debug=True)
 
@@ -11,6 +11,7 @@ from dotenv import load_dotenv
 import subprocess
 import threading
 import time
+from sensor_calibration import READING_VALUE_COLUMNS, load_calibrations, calibrate_rows
 
 load_dotenv()
 
@@ -108,10 +109,11 @@ def get_latest_reading():
         cursor = conn.cursor()
         
         cursor.execute(
-            "SELECT timestamp, pressure, temperature FROM sensor_readings ORDER BY timestamp DESC LIMIT 1"
+            f"SELECT timestamp, {READING_VALUE_COLUMNS} FROM sensor_readings ORDER BY timestamp DESC LIMIT 1"
         )
         
-        row = cursor.fetchone()
+        rows = calibrate_rows(cursor.fetchall(), load_calibrations(cursor))
+        row = rows[0] if rows else None
         cursor.close()
         conn.close()
         
@@ -0,0 +1,318 @@
+"""
+PostgreSQL Connection Pool
+ConnectionPool is a thread-safe pool of psycopg2 connections for the API
+server. Connections are set up once (init hooks, e.g. the IST timezone) and
+reused across requests:
+
+- getconn() blocks up to `timeout` seconds when every connection is in use
+- a connection idle for more than `health_check_idle` seconds is checked
+  with SELECT 1 before it is handed out; broken ones are replaced
+- connections older than `max_lifetime` seconds are closed on return
+- putconn() rolls back anything the caller left open
+
+PooledConnection wraps a checked-out connection so existing code that calls
+conn.close() returns it to the pool instead of closing it.
+
+ThreadConnections gives each thread of a long-running service its own
+connection, reopened with exponential backoff once it breaks, so a slow
+query or a dead connection on one thread does not stall the others.
+"""
+
+import time
+import threading
+import psycopg2
+from psycopg2 import extensions
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """No connection became free within the pool timeout"""
+
+
+class PooledConnection:
+    """A checked-out connection; close() hands it back to the pool"""
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise psycopg2.InterfaceError("connection already returned to the pool")
+        return getattr(self._conn, name)
+
+    @property
+    def returned(self):
+        return self._conn is None
+
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.putconn(conn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """Bounded pool of psycopg2 connections
+
+    connect_fn() opens a new connection; each init hook is called with a new
+    connection (and its transaction committed) before first use.
+    """
+
+    def __init__(self, connect_fn, minconn=1, maxconn=8, timeout=10.0, max_lifetime=1800.0,
+                 health_check_idle=30.0, init_hooks=()):
+        self.connect_fn = connect_fn
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.health_check_idle = health_check_idle
+        self.init_hooks = list(init_hooks)
+        self.idle = []  # [(conn, idle_since)], most recently used last
+        self.created_at = {}  # id(conn) -> monotonic creation time
+        self.in_use = 0
+        self.condition = threading.Condition()
+        self.closed = False
+
+        # Metrics
+        self.acquisitions = 0
+        self.waits = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.timeouts = 0
+        self.connections_created = 0
+        self.connections_closed = 0
+        self.health_check_failures = 0
+
+    def open_connection(self):
+        conn = self.connect_fn()
+        try:
+            for hook in self.init_hooks:
+                hook(conn)
+            conn.commit()
+        except Exception:
+            conn.close()
+            raise
+        with self.condition:
+            self.created_at[id(conn)] = time.monotonic()
+            self.connections_created += 1
+        return conn
+
+    def discard(self, conn):
+        with self.condition:
+            self.created_at.pop(id(conn), None)
+            self.connections_closed += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def healthy(self, conn):
+        """SELECT 1 round trip; False if the connection is unusable"""
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def getconn(self):
+        """Check out a connection, waiting up to timeout seconds for a free one"""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+        with self.condition:
+            while True:
+                if self.closed:
+                    raise psycopg2.InterfaceError("connection pool is closed")
+                if self.idle:
+                    conn, idle_since = self.idle.pop()
+                    self.in_use += 1
+                    break
+                if self.in_use + len(self.idle) < self.maxconn:
+                    conn, idle_since = None, None
+                    self.in_use += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(f"no database connection free after {self.timeout}s ({self.maxconn} in use)")
+                waited = True
+                self.condition.wait(remaining)
+
+        try:
+            if conn is not None and (conn.closed or (
+                    time.monotonic() - idle_since > self.health_check_idle and not self.healthy(conn))):
+                with self.condition:
+                    self.health_check_failures += 1
+                self.discard(conn)
+                conn = None
+            if conn is None:
+                conn = self.open_connection()
+        except Exception:
+            with self.condition:
+                self.in_use -= 1
+                self.condition.notify()
+            raise
+
+        wait_ms = (time.monotonic() - started) * 1000
+        with self.condition:
+            self.acquisitions += 1
+            if waited:
+                self.waits += 1
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+        return conn
+
+    def putconn(self, conn):
+        """Return a connection: reset its transaction, retire it if broken or too old"""
+        keep = not conn.closed and not self.closed
+        if keep and conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except Exception:
+                keep = False
+        created = self.created_at.get(id(conn), 0)
+        if keep and time.monotonic() - created > self.max_lifetime:
+            keep = False
+        if not keep:
+            self.discard(conn)
+        with self.condition:
+            self.in_use -= 1
+            if keep:
+                self.idle.append((conn, time.monotonic()))
+            self.condition.notify()
+
+    def connection(self):
+        """Checked-out connection as a PooledConnection (use with `with` or call close())"""
+        return PooledConnection(self, self.getconn())
+
+    def fill(self):
+        """Open connections up to minconn (errors are left to the first request)"""
+        while True:
+            with self.condition:
+                if self.in_use + len(self.idle) >= self.minconn:
+                    return
+                self.in_use += 1
+            try:
+                conn = self.open_connection()
+            except Exception:
+                with self.condition:
+                    self.in_use -= 1
+                return
+            self.putconn(conn)
+
+    def closeall(self):
+        with self.condition:
+            self.closed = True
+            idle, self.idle = self.idle, []
+            self.condition.notify_all()
+        for conn, _ in idle:
+            self.discard(conn)
+
+    def stats(self):
+        with self.condition:
+            return {
+                'in_use': self.in_use,
+                'idle': len(self.idle),
+                'max_connections': self.maxconn,
+                'acquisitions': self.acquisitions,
+                'waits': self.waits,
+                'avg_wait_ms': round(self.total_wait_ms / self.acquisitions, 2) if self.acquisitions else None,
+                'max_wait_ms': round(self.max_wait_ms, 2),
+                'timeouts': self.timeouts,
+                'connections_created': self.connections_created,
+                'connections_closed': self.connections_closed,
+                'health_check_failures': self.health_check_failures,
+            }
+
+
+class ThreadConnections:
+    """One connection per thread, reopened with backoff after it breaks
+
+    get() returns the calling thread's connection, or None while the database
+    is unreachable (no new attempt is made until the backoff delay has
+    passed). A connection left in a failed transaction is rolled back.
+    """
+
+    def __init__(self, connect_fn, init_hooks=(), min_delay=1.0, max_delay=30.0):
+        self.connect_fn = connect_fn
+        self.init_hooks = list(init_hooks)
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.connections = {}  # thread -> connection
+        self.lock = threading.Lock()
+        self.delay = min_delay
+        self.next_attempt = 0.0  # monotonic time of the next reconnect attempt
+        self.failures = 0
+        self.reconnects = 0
+
+    def get(self):
+        thread = threading.current_thread()
+        conn = self.connections.get(thread)
+        if conn is not None:
+            if not conn.closed:
+                if conn.info.transaction_status == extensions.TRANSACTION_STATUS_INERROR:
+                    try:
+                        conn.rollback()
+                    except Exception:
+                        pass
+                if not conn.closed:
+                    return conn
+            with self.lock:
+                self.connections.pop(thread, None)
+                self.reconnects += 1
+            print(f"[WARNING] PostgreSQL connection of {thread.name} lost, reconnecting")
+        return self.open(thread)
+
+    def open(self, thread):
+        with self.lock:
+            if time.monotonic() < self.next_attempt:
+                return None
+        conn = None
+        try:
+            conn = self.connect_fn()
+            for hook in self.init_hooks:
+                hook(conn)
+            conn.commit()
+        except Exception as e:
+            if conn is not None:
+                conn.close()
+            with self.lock:
+                self.failures += 1
+                self.next_attempt = time.monotonic() + self.delay
+                print(f"[WARNING] PostgreSQL unavailable ({e}), retrying in {self.delay:g}s")
+                self.delay = min(self.delay * 2, self.max_delay)
+            return None
+        with self.lock:
+            self.delay = self.min_delay
+            self.next_attempt = 0.0
+            # Drop connections of threads that have finished
+            for dead in [t for t in self.connections if not t.is_alive()]:
+                self.connections.pop(dead).close()
+            self.connections[thread] = conn
+        return conn
+
+    def closeall(self):
+        with self.lock:
+            connections, self.connections = list(self.connections.values()), {}
+        for conn in connections:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def stats(self):
+        with self.lock:
+            return {
+                'connections': len(self.connections),
+                'reconnects': self.reconnects,
+                'connect_failures': self.failures,
+            }
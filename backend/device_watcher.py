@@ -0,0 +1,173 @@
+"""
+Serial Device Hot-plug Watcher
+Uses Linux inotify on /dev (and the device's own directory, e.g.
+/dev/serial/by-id) to notice within milliseconds when the RS485 adapter is
+unplugged or comes back, instead of polling os.path.exists once a second.
+
+The sysfs USB path of the adapter (e.g. "1-1.2", used for USB resets) is
+resolved from /sys/class/tty when the device appears and cached, so no
+udevadm subprocess is needed.
+"""
+
+import os
+import re
+import sys
+import errno
+import ctypes
+import ctypes.util
+import select
+import threading
+
+# inotify event masks (linux/inotify.h)
+IN_ATTRIB = 0x00000004  # Permissions changed (udev fixing up group/mode)
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+
+# USB interface directory in a sysfs path, e.g. ".../usb1/1-1/1-1.2/1-1.2:1.0/ttyUSB0"
+USB_INTERFACE_PATTERN = re.compile(r'/(\d+-[\d.]+):\d+\.\d+(?:/|$)')
+
+
+def load_inotify():
+    """libc with inotify, or None on platforms without it"""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+def resolve_usb_path(tty_device):
+    """USB device path ("1-2" or "1-2.1") of a tty from sysfs, or None"""
+    tty_name = os.path.basename(os.path.realpath(tty_device))  # Follow /dev/serial/by-id links
+    sys_path = f'/sys/class/tty/{tty_name}/device'
+    if not os.path.exists(sys_path):
+        return None
+    match = USB_INTERFACE_PATTERN.search(os.path.realpath(sys_path))
+    return match.group(1) if match else None
+
+
+class DeviceWatcher:
+    """Tracks whether a serial device node exists, driven by inotify events
+
+    on_added / on_removed are called from the watcher thread when the device
+    node appears or disappears.
+    """
+
+    def __init__(self, device_path, on_added=None, on_removed=None):
+        self.device_path = device_path
+        self.on_added = on_added
+        self.on_removed = on_removed
+        self.present_event = threading.Event()
+        self.usb_path = None  # Cached sysfs USB path of the adapter
+        self.events = 0
+        self.thread = None
+        self.fd = None
+        self.watches = {}  # directory -> watch descriptor
+        self.stop_pipe = None
+        self.libc = load_inotify()
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def is_present(self):
+        return self.present_event.is_set()
+
+    def get_usb_path(self):
+        """Cached USB path, resolved from sysfs if not known yet"""
+        if self.usb_path is None:
+            self.usb_path = resolve_usb_path(self.device_path)
+        return self.usb_path
+
+    def check_present(self):
+        return os.path.exists(self.device_path) and os.access(self.device_path, os.R_OK)
+
+    def add_watches(self):
+        """Watch /dev and the device's own directory
+
+        Adding a watch that already exists is a no-op in inotify, so this is
+        also how a recreated /dev/serial/by-id directory gets watched again.
+        """
+        for directory in ('/dev', os.path.dirname(self.device_path)):
+            if not os.path.isdir(directory):
+                continue
+            wd = self.libc.inotify_add_watch(self.fd, directory.encode(), WATCH_MASK)
+            if wd >= 0:
+                self.watches[directory] = wd
+
+    def refresh(self):
+        """Re-check the device after an inotify event and fire callbacks on change"""
+        present = self.check_present()
+        if present == self.is_present():
+            return
+        if present:
+            self.usb_path = resolve_usb_path(self.device_path) or self.usb_path
+            self.present_event.set()
+            print(f"[HOTPLUG] {self.device_path} appeared" + (f" (USB {self.usb_path})" if self.usb_path else ""))
+            callback = self.on_added
+        else:
+            self.present_event.clear()
+            print(f"[HOTPLUG] {self.device_path} removed")
+            callback = self.on_removed
+        if callback:
+            try:
+                callback()
+            except Exception as e:
+                print(f"[ERROR] Hot-plug callback failed: {e}")
+
+    def start(self):
+        """Start watching; returns False if inotify is unavailable"""
+        if self.running:
+            return True
+        if self.libc is None:
+            return False
+        self.fd = self.libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            print(f"[WARNING] inotify unavailable: {os.strerror(ctypes.get_errno())}")
+            return False
+        self.watches = {}
+        self.add_watches()
+        self.stop_pipe = os.pipe()
+        if self.check_present():
+            self.usb_path = resolve_usb_path(self.device_path)
+            self.present_event.set()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return True
+
+    def run(self):
+        """Watcher thread - sleeps in select() until /dev changes"""
+        stop_fd = self.stop_pipe[0]
+        while True:
+            readable, _, _ = select.select([self.fd, stop_fd], [], [])
+            if stop_fd in readable:
+                break
+            try:
+                os.read(self.fd, 4096)  # Contents not needed - any change triggers a re-check
+            except OSError as e:
+                if e.errno != errno.EAGAIN:
+                    print(f"[ERROR] inotify read failed: {e}")
+                    break
+            self.events += 1
+            self.add_watches()  # The by-id directory may have been recreated
+            self.refresh()
+        os.close(self.fd)
+        for fd in self.stop_pipe:
+            os.close(fd)
+        self.fd = None
+
+    def stop(self):
+        """Stop the watcher thread"""
+        if not self.running:
+            return
+        os.write(self.stop_pipe[1], b'x')
+        self.thread.join(timeout=2)
@@ -5,7 +5,18 @@ Initialize PostgreSQL database with tables for Docker deployment
 import psycopg2
 import os
 import sys
+from datetime import date
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from telemetry_partitions import run_partition_maintenance, is_partitioned
+from telemetry_rollups import backfill_rollups
+from sensor_calibration import create_calibration_table
+from session_linkage import backfill_session_ids
+from session_cache import create_session_version_table
+
+# Session archive of the sensor service (archived sessions are not re-linked)
+SESSION_ARCHIVE_DIR = os.getenv(
+    'SESSION_ARCHIVE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'archive')
+)
 
 def check_table_exists(cursor, table_name):
     """Check if a table exists in the database"""
@@ -64,15 +75,20 @@ def init_database():
             CREATE TABLE IF NOT EXISTS sensor_readings (
                 id SERIAL PRIMARY KEY,
                 timestamp TIMESTAMP NOT NULL DEFAULT NOW(),
-                pressure NUMERIC(6,2) NOT NULL,
-                temperature NUMERIC(6,2) NOT NULL
+                pressure NUMERIC(6,2),
+                temperature NUMERIC(6,2),
+                pressure_raw SMALLINT,
+                temperature_raw SMALLINT
             );
         """)
         
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_sensor_timestamp 
-            ON sensor_readings(timestamp DESC);
-        """)
+        # Only on the plain table - once partitioned, each month gets its own
+        # index (btree while current, BRIN once sealed) from telemetry_partitions
+        if not is_partitioned(cursor):
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_sensor_timestamp 
+                ON sensor_readings(timestamp DESC);
+            """)
         
         print("[OK] Created/verified sensor_readings table")
         
@@ -120,6 +136,50 @@ def init_database():
         """)
         
         print("[OK] Created/verified process_logs table")
+
+        # Idempotency keys for batched / spooled telemetry inserts (migration)
+        for table in ('sensor_readings', 'process_logs'):
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS ingest_key UUID")
+            cursor.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_ingest_key ON {table}(ingest_key, timestamp)")
+        
+        print("[OK] Created/verified ingest_key on telemetry tables")
+
+        # One telemetry row per sample: sensor_readings carries the session and valve (migration)
+        cursor.execute("ALTER TABLE sensor_readings ADD COLUMN IF NOT EXISTS session_id INTEGER")
+        cursor.execute("ALTER TABLE sensor_readings ADD COLUMN IF NOT EXISTS valve_position INTEGER")
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_sensor_readings_session
+            ON sensor_readings(session_id, timestamp);
+        """)
+        
+        print("[OK] Created/verified unified telemetry columns on sensor_readings")
+
+        # Raw ADC counts, converted on read with the versioned calibration (migration);
+        # pressure / temperature are only set on rows from before raw counts were stored
+        cursor.execute("ALTER TABLE sensor_readings ADD COLUMN IF NOT EXISTS pressure_raw SMALLINT")
+        cursor.execute("ALTER TABLE sensor_readings ADD COLUMN IF NOT EXISTS temperature_raw SMALLINT")
+        cursor.execute("ALTER TABLE sensor_readings ALTER COLUMN pressure DROP NOT NULL")
+        cursor.execute("ALTER TABLE sensor_readings ALTER COLUMN temperature DROP NOT NULL")
+        create_calibration_table(cursor)
+        
+        print("[OK] Created/verified raw counts on sensor_readings and sensor_calibration table")
+
+        # Monthly partitions for sensor_readings (an existing table is converted once)
+        conn.commit()
+        try:
+            run_partition_maintenance(conn, date.today())
+            print("[OK] Created/verified sensor_readings partitions")
+        except Exception as e:
+            print(f"[WARNING] Could not set up sensor_readings partitions: {e}")
+
+        # Minute / hour rollups of sensor_readings (history rolled up on first run)
+        try:
+            if backfill_rollups(conn):
+                print("[OK] Rolled up existing sensor_readings history")
+            print("[OK] Created/verified sensor_readings rollup tables")
+        except Exception as e:
+            conn.rollback()
+            print(f"[WARNING] Could not set up sensor_readings rollups: {e}")
         
         # Create autoclave_programs table
         cursor.execute("""
@@ -248,6 +308,36 @@ def init_database():
             print(f"[ERROR] Failed to add roll_category_name to autoclave_programs: {e}")
             raise  # Re-raise to fail the initialization
         
+        # Indexes for session lists, active-session lookups and program lookup by roll category
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_sessions_start_time
+            ON process_sessions(start_time DESC, id DESC);
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_sessions_active
+            ON process_sessions(status, id DESC)
+            WHERE status IN ('running', 'paused');
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_programs_roll_category
+            ON autoclave_programs(roll_category_name);
+        """)
+        conn.commit()
+        print("[OK] Created/verified session and roll category indexes")
+        
+        # Change counter for process_sessions (ETags of the session endpoints)
+        create_session_version_table(cursor)
+        conn.commit()
+        print("[OK] Created/verified process_sessions_version and its trigger")
+        
+        # Tag the samples of sessions recorded before telemetry was session-tagged (migration)
+        try:
+            sessions, rows = backfill_session_ids(conn, SESSION_ARCHIVE_DIR)
+            if sessions:
+                print(f"[OK] Linked {rows} sensor reading(s) to {sessions} earlier session(s)")
+        except Exception as e:
+            print(f"[WARNING] Could not link earlier sessions to their sensor readings: {e}")
+        
         # Commit changes
         conn.commit()
         
@@ -0,0 +1,187 @@
+"""
+PLC Link Supervisor
+Background state machine that owns reconnects and USB resets, so the threads
+that read sensors and drive the valve never block on them.
+
+    DISCONNECTED -> PROBING -> CONNECTED <-> DEGRADED
+         ^              |                      |
+         +--------------+----------------------+
+
+Hot-path code only asks is_usable() and reports the outcome of its
+transactions; while the link is down its Modbus calls fail immediately.
+"""
+
+import time
+import threading
+
+# Link states
+DISCONNECTED = 'DISCONNECTED'
+PROBING = 'PROBING'
+CONNECTED = 'CONNECTED'
+DEGRADED = 'DEGRADED'
+
+# Failed transactions in a row before the link is dropped and re-probed
+LINK_DISCONNECT_AFTER = 3
+# Reconnect attempts without a successful transaction before the USB adapter is reset
+USB_RESET_AFTER_PROBES = 3
+# Probe backoff (seconds)
+PROBE_MIN_DELAY = 1
+PROBE_MAX_DELAY = 10
+
+
+class LinkSupervisor:
+    """Runs connect_fn / reset_fn on its own thread and tracks link state
+
+    connect_fn() makes one connection attempt and returns True on success.
+    reset_fn() (optional) power-cycles the adapter, e.g. a USB unbind/bind.
+    """
+
+    def __init__(self, connect_fn, reset_fn=None, name='PLC'):
+        self.connect_fn = connect_fn
+        self.reset_fn = reset_fn
+        self.name = name
+        self.state = DISCONNECTED
+        self.lock = threading.Lock()
+        self.wake_event = threading.Event()
+        self.stop_event = threading.Event()
+        self.connected_event = threading.Event()
+        self.thread = None
+
+        self.consecutive_failures = 0
+        self.probes_since_traffic = 0  # Reconnects that were not followed by a good transaction
+        self.probe_delay = PROBE_MIN_DELAY
+        self.probes = 0
+        self.usb_resets = 0
+        self.disconnects = 0
+        self.state_since = time.time()
+
+    def set_state(self, state):
+        """Change state (caller holds self.lock)"""
+        if state == self.state:
+            return
+        print(f"[LINK] {self.name} link {self.state} -> {state}")
+        self.state = state
+        self.state_since = time.time()
+        if state in (CONNECTED, DEGRADED):
+            self.connected_event.set()
+        else:
+            self.connected_event.clear()
+
+    def is_usable(self):
+        """True if hot-path I/O may use the link (connected or degraded)"""
+        return self.state in (CONNECTED, DEGRADED)
+
+    def report_success(self):
+        """A transaction was answered"""
+        if self.state == CONNECTED and self.consecutive_failures == 0 and self.probes_since_traffic == 0:
+            return  # Fast path - nothing to update
+        with self.lock:
+            self.consecutive_failures = 0
+            self.probes_since_traffic = 0
+            if self.state == DEGRADED:
+                self.set_state(CONNECTED)
+
+    def report_failure(self):
+        """A transaction failed or went unanswered"""
+        with self.lock:
+            self.consecutive_failures += 1
+            if self.state == CONNECTED:
+                self.set_state(DEGRADED)
+            if self.state == DEGRADED and self.consecutive_failures >= LINK_DISCONNECT_AFTER:
+                self.drop()
+
+    def report_link_lost(self):
+        """The port or socket is closed - reconnect without waiting for more failures"""
+        with self.lock:
+            if self.is_usable():
+                self.drop()
+
+    def poke(self):
+        """Probe now instead of waiting out the backoff (e.g. the device reappeared)"""
+        with self.lock:
+            self.probe_delay = PROBE_MIN_DELAY
+        self.wake_event.set()
+
+    def drop(self):
+        """Mark the link down and wake the supervisor (caller holds self.lock)"""
+        self.disconnects += 1
+        self.set_state(DISCONNECTED)
+        self.wake_event.set()
+
+    def probe(self):
+        """One reconnect attempt, with a USB reset if reconnecting keeps not helping"""
+        with self.lock:
+            self.set_state(PROBING)
+            self.probes += 1
+            self.probes_since_traffic += 1
+            reset_due = self.reset_fn is not None and self.probes_since_traffic % USB_RESET_AFTER_PROBES == 0
+
+        if reset_due:
+            print(f"[USB RESET] {self.probes_since_traffic - 1} reconnect(s) did not restore the link, resetting adapter...")
+            try:
+                if self.reset_fn():
+                    self.usb_resets += 1
+            except Exception as e:
+                print(f"[USB RESET] Failed: {e}")
+
+        try:
+            connected = self.connect_fn()
+        except Exception as e:
+            print(f"[LINK] {self.name} connect error: {e}")
+            connected = False
+
+        with self.lock:
+            if connected:
+                self.consecutive_failures = 0
+                self.probe_delay = PROBE_MIN_DELAY
+                self.set_state(CONNECTED)
+            else:
+                self.set_state(DISCONNECTED)
+        return connected
+
+    def run(self):
+        """Supervisor thread - probes while disconnected, otherwise sleeps until woken"""
+        print("[LINK] Link supervisor started")
+        while not self.stop_event.is_set():
+            if self.state == DISCONNECTED:
+                if not self.probe():
+                    delay = self.probe_delay
+                    self.probe_delay = min(self.probe_delay * 2, PROBE_MAX_DELAY)
+                    # poke() (e.g. device plugged back in) cuts the backoff short
+                    self.wake_event.wait(delay)
+                    self.wake_event.clear()
+                continue
+            self.wake_event.wait(1)
+            self.wake_event.clear()
+        print("[LINK] Link supervisor stopped")
+
+    def start(self):
+        """Start the supervisor thread if it is not already running"""
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the supervisor thread"""
+        self.stop_event.set()
+        self.wake_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=PROBE_MAX_DELAY)
+
+    def wait_connected(self, timeout):
+        """Block until the link is usable or timeout expires (startup only)"""
+        return self.connected_event.wait(timeout)
+
+    def stats(self):
+        """Current state and reconnect counters"""
+        with self.lock:
+            return {
+                'state': self.state,
+                'state_since': self.state_since,
+                'consecutive_failures': self.consecutive_failures,
+                'probes': self.probes,
+                'disconnects': self.disconnects,
+                'usb_resets': self.usb_resets,
+            }
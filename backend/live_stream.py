@@ -0,0 +1,121 @@
+"""
+Live Stream Hub
+In-process publish/subscribe for the /api/stream Server-Sent Events endpoint.
+One LiveFeed thread reads the latest state (one query per interval, however
+many dashboards are open) and publishes whatever changed; every subscriber
+gets each event once through its own bounded queue. A subscriber whose queue
+is full is too slow to keep up and is dropped - its browser reconnects and
+starts again from the current state.
+"""
+
+import json
+import queue
+import threading
+
+
+def format_sse(event, data, event_id=None):
+    """One Server-Sent Events message"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return '\n'.join(lines) + '\n\n'
+
+
+class Subscriber:
+    def __init__(self, maxsize):
+        self.queue = queue.Queue(maxsize)
+        self.dropped = False
+
+
+class StreamHub:
+    """Fan-out of (event, data) messages to bounded subscriber queues
+
+    The last message of each event type is kept so a new subscriber starts
+    with the current state.
+    """
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self.subscribers = set()
+        self.latest = {}  # event -> last message
+        self.lock = threading.Lock()
+        self.event_id = 0
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self):
+        subscriber = Subscriber(self.queue_size)
+        with self.lock:
+            for message in sorted(self.latest.values()):
+                subscriber.queue.put_nowait(message)
+            self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+    def subscriber_count(self):
+        with self.lock:
+            return len(self.subscribers)
+
+    def publish(self, event, data):
+        with self.lock:
+            self.event_id += 1
+            message = format_sse(event, data, self.event_id)
+            self.latest[event] = (self.event_id, message)
+            self.published += 1
+            for subscriber in list(self.subscribers):
+                try:
+                    subscriber.queue.put_nowait((self.event_id, message))
+                except queue.Full:
+                    # Slow consumer - drop it rather than buffer without bound
+                    subscriber.dropped = True
+                    self.subscribers.discard(subscriber)
+                    self.dropped += 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                'subscribers': len(self.subscribers),
+                'published': self.published,
+                'dropped_clients': self.dropped,
+            }
+
+
+class LiveFeed:
+    """Background thread calling poll_fn(publish) every interval while anyone is subscribed
+
+    poll_fn reads the current state and calls publish(event, data) for what
+    changed; it keeps its own last-seen state between calls.
+    """
+
+    def __init__(self, hub, poll_fn, interval=1.0):
+        self.hub = hub
+        self.poll_fn = poll_fn
+        self.interval = interval
+        self.thread = None
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+
+    def ensure_running(self):
+        """Start the thread on the first subscriber"""
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name='live-feed', daemon=True)
+                self.thread.start()
+        self.wakeup.set()
+
+    def run(self):
+        while True:
+            self.wakeup.clear()
+            if self.hub.subscriber_count() == 0:
+                self.wakeup.wait()  # Nobody listening - no queries until the next subscriber
+                continue
+            try:
+                self.poll_fn(self.hub.publish)
+            except Exception as e:
+                print(f"[WARNING] Live stream poll failed: {e}")
+            self.wakeup.wait(self.interval)
@@ -0,0 +1,170 @@
+"""
+PLC Transport Layer
+Builds Modbus clients for the configured link: a local RS485 serial port,
+a Modbus TCP gateway, or RTU frames tunnelled over TCP.
+
+TCP connections are pooled per gateway endpoint, so several PLCs behind
+one gateway share a single socket and lock.
+"""
+
+import os
+import threading
+from dotenv import load_dotenv
+from pymodbus import Framer
+from pymodbus.client import (
+    ModbusSerialClient, AsyncModbusSerialClient,
+    ModbusTcpClient, AsyncModbusTcpClient,
+)
+
+load_dotenv()
+
+# Transport configuration
+PLC_TRANSPORT = os.getenv('PLC_TRANSPORT', 'serial').lower()  # serial | tcp | rtu-over-tcp
+PLC_HOST = os.getenv('PLC_HOST', '127.0.0.1')
+PLC_TCP_PORT = int(os.getenv('PLC_TCP_PORT', '502'))
+
+
+class TcpClientPool:
+    """Reference-counted shared TCP clients, one per (host, port, framer)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}  # key -> {'client', 'lock', 'refs'}
+
+    def acquire(self, key, factory):
+        """Get the shared client for key, creating it with factory() if needed"""
+        with self.lock:
+            entry = self.entries.setdefault(key, {'client': None, 'lock': threading.Lock(), 'refs': 0})
+            if entry['client'] is None:
+                entry['client'] = factory()
+            entry['refs'] += 1
+            return entry['client']
+
+    def lock_for(self, key):
+        """Lock serializing requests on the shared connection for key"""
+        with self.lock:
+            entry = self.entries.setdefault(key, {'client': None, 'lock': threading.Lock(), 'refs': 0})
+            return entry['lock']
+
+    def release(self, key):
+        """Drop one reference; the socket is closed when nobody uses it"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry['client'] is None:
+                return
+            entry['refs'] -= 1
+            if entry['refs'] <= 0:
+                try:
+                    entry['client'].close()
+                except Exception:
+                    pass
+                entry['client'] = None
+                entry['refs'] = 0
+
+    def stats(self):
+        """Open connections and their users"""
+        with self.lock:
+            return {
+                f"{host}:{port}/{framer.value}": entry['refs']
+                for (host, port, framer), entry in self.entries.items()
+                if entry['client'] is not None
+            }
+
+
+TCP_CLIENT_POOL = TcpClientPool()
+
+
+class SerialTransport:
+    """Modbus RTU on a local serial port (USB RS485 adapter)"""
+    name = 'serial'
+    is_serial = True
+    supports_usb_reset = True
+    serialize_requests = True  # Half-duplex bus - one transaction at a time
+
+    def __init__(self, port, baud_rate, timeout):
+        self.port = port
+        self.baud_rate = baud_rate
+        self.timeout = timeout
+        self.lock = threading.Lock()
+
+    def describe(self):
+        return self.port
+
+    def create_client(self):
+        return ModbusSerialClient(
+            port=self.port,
+            baudrate=self.baud_rate,
+            parity='N',
+            stopbits=1,
+            bytesize=8,
+            timeout=self.timeout,
+            retries=0  # Retries are budgeted by the caller (adaptive_timeout.py)
+        )
+
+    def create_async_client(self):
+        return AsyncModbusSerialClient(
+            port=self.port,
+            baudrate=self.baud_rate,
+            parity='N',
+            stopbits=1,
+            bytesize=8,
+            timeout=self.timeout,
+            retries=0
+        )
+
+    def release_client(self, client):
+        try:
+            client.close()
+        except Exception:
+            pass
+
+
+class TcpTransport:
+    """Modbus TCP gateway, or RTU frames over a TCP socket (framer=Framer.RTU)"""
+    is_serial = False
+    supports_usb_reset = False
+
+    def __init__(self, host, port, timeout, framer=Framer.SOCKET):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.framer = framer
+        self.name = 'tcp' if framer == Framer.SOCKET else 'rtu-over-tcp'
+        self.key = (host, port, framer)
+        self.lock = TCP_CLIENT_POOL.lock_for(self.key)
+        # Modbus TCP tags requests with a transaction ID, so the async client
+        # can pipeline them. RTU-over-TCP has no ID and must be serialized.
+        self.serialize_requests = framer != Framer.SOCKET
+
+    def describe(self):
+        return f"{self.name}://{self.host}:{self.port}"
+
+    def create_client(self):
+        return TCP_CLIENT_POOL.acquire(
+            self.key,
+            lambda: ModbusTcpClient(self.host, port=self.port, framer=self.framer, timeout=self.timeout, retries=0)
+        )
+
+    def create_async_client(self):
+        # Async clients are bound to their event loop, so they are not pooled
+        return AsyncModbusTcpClient(self.host, port=self.port, framer=self.framer, timeout=self.timeout, retries=0)
+
+    def release_client(self, client):
+        if isinstance(client, AsyncModbusTcpClient):
+            client.close()
+        else:
+            TCP_CLIENT_POOL.release(self.key)
+
+
+def build_transport(com_port, baud_rate, timeout, kind=None, host=None, tcp_port=None):
+    """Create the transport selected by PLC_TRANSPORT (or the explicit arguments)"""
+    kind = (kind or PLC_TRANSPORT).lower()
+    host = host or PLC_HOST
+    tcp_port = tcp_port or PLC_TCP_PORT
+    if kind == 'serial':
+        return SerialTransport(com_port, baud_rate, timeout)
+    if kind == 'tcp':
+        return TcpTransport(host, tcp_port, timeout)
+    if kind in ('rtu-over-tcp', 'rtutcp'):
+        return TcpTransport(host, tcp_port, timeout, framer=Framer.RTU)
+    raise ValueError(f"Unknown PLC_TRANSPORT '{kind}' (expected serial, tcp or rtu-over-tcp)")
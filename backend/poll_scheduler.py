@@ -0,0 +1,193 @@
+"""
+Multi-drop RS485 Poll Scheduler
+Round-robins several Modbus slave IDs on one serial bus in fixed time slots,
+tracks per-slave health and reports how much bus time each unit uses
+"""
+
+import time
+import threading
+
+# A slave is marked offline after this many consecutive failed polls,
+# and is then only retried once every OFFLINE_RETRY_CYCLES poll cycles
+OFFLINE_AFTER_FAILURES = 5
+OFFLINE_RETRY_CYCLES = 10
+
+# Modbus RTU framing: start + 8 data + stop (8N1) = 10 bits per character,
+# 3.5 character silent interval between frames
+RTU_BITS_PER_CHAR = 10
+RTU_INTER_FRAME_CHARS = 3.5
+
+
+def estimate_rtu_transaction_time(baud_rate, request_bytes, response_bytes):
+    """Theoretical wire time (seconds) of one RTU request/response pair"""
+    char_time = RTU_BITS_PER_CHAR / baud_rate
+    return (request_bytes + response_bytes + 2 * RTU_INTER_FRAME_CHARS) * char_time
+
+
+def estimate_register_read_time(baud_rate, count):
+    """Theoretical wire time of a read holding/input registers transaction"""
+    # Request: addr(1) + func(1) + start(2) + count(2) + crc(2)
+    # Response: addr(1) + func(1) + bytecount(1) + 2*count + crc(2)
+    return estimate_rtu_transaction_time(baud_rate, 8, 5 + 2 * count)
+
+
+class SlaveHealth:
+    """Poll statistics for one slave on the bus"""
+
+    def __init__(self, slave_id):
+        self.slave_id = slave_id
+        self.polls = 0
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_success = None  # time.time() of last good poll
+        self.bus_time = 0.0  # Seconds of bus time spent on this slave
+        self.last_poll_time = None  # Seconds the last poll took
+        self.offline = False
+        self.skip_cycles = 0
+
+    @property
+    def state(self):
+        if self.offline:
+            return 'offline'
+        if self.consecutive_failures > 0:
+            return 'degraded'
+        if self.successes == 0:
+            return 'unknown'
+        return 'ok'
+
+    def to_dict(self):
+        return {
+            'slave_id': self.slave_id,
+            'state': self.state,
+            'polls': self.polls,
+            'successes': self.successes,
+            'failures': self.failures,
+            'consecutive_failures': self.consecutive_failures,
+            'last_success': self.last_success,
+            'bus_time_seconds': round(self.bus_time, 3),
+            'avg_poll_ms': round(self.bus_time / self.polls * 1000, 1) if self.polls else None,
+        }
+
+
+class PollScheduler:
+    """Time-slotted round-robin over the slaves on one bus
+
+    Each poll cycle lasts `cycle_seconds` and is split into one slot per slave.
+    The caller asks for the next slave with next_slave(), runs its transaction(s)
+    and reports the outcome with record_poll(). Offline slaves are skipped so a
+    dead unit does not eat its full timeout every cycle - except those in
+    always_poll (the controlled unit), which get every one of their slots:
+    their outages are link outages, handled by the link supervisor, and
+    control needs their first reading as soon as the link is back.
+    """
+
+    def __init__(self, slave_ids, cycle_seconds, baud_rate=9600, always_poll=()):
+        if not slave_ids:
+            raise ValueError("PollScheduler needs at least one slave ID")
+        self.slave_ids = list(dict.fromkeys(slave_ids))  # Keep order, drop duplicates
+        self.cycle_seconds = cycle_seconds
+        self.baud_rate = baud_rate
+        self.always_poll = set(always_poll)
+        self.health = {slave_id: SlaveHealth(slave_id) for slave_id in self.slave_ids}
+        self.position = 0
+        self.cycles = 0
+        self.started_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    @property
+    def slot_seconds(self):
+        """Length of one time slot"""
+        return self.cycle_seconds / len(self.slave_ids)
+
+    def next_slave(self):
+        """Slave ID that owns the next slot, or None if the slot should stay idle"""
+        with self.lock:
+            slave_id = self.slave_ids[self.position]
+            self.position += 1
+            if self.position >= len(self.slave_ids):
+                self.position = 0
+                self.cycles += 1
+
+            health = self.health[slave_id]
+            if health.offline and slave_id not in self.always_poll:
+                if health.skip_cycles > 0:
+                    health.skip_cycles -= 1
+                    return None
+                health.skip_cycles = OFFLINE_RETRY_CYCLES
+            return slave_id
+
+    def record_poll(self, slave_id, success, elapsed):
+        """Record the outcome and bus time of one slot's transactions"""
+        with self.lock:
+            health = self.health[slave_id]
+            health.polls += 1
+            health.bus_time += elapsed
+            health.last_poll_time = elapsed
+            if success:
+                if health.offline:
+                    print(f"[BUS] Slave {slave_id} back online")
+                health.successes += 1
+                health.consecutive_failures = 0
+                health.last_success = time.time()
+                health.offline = False
+                health.skip_cycles = 0
+            else:
+                health.failures += 1
+                health.consecutive_failures += 1
+                if not health.offline and health.consecutive_failures >= OFFLINE_AFTER_FAILURES:
+                    print(f"[BUS] Slave {slave_id} offline after {health.consecutive_failures} failed polls")
+                    health.offline = True
+                    health.skip_cycles = OFFLINE_RETRY_CYCLES
+
+    def is_healthy(self, slave_id):
+        """True if the slave answered its most recent poll"""
+        health = self.health.get(slave_id)
+        return health is not None and health.state == 'ok'
+
+    def bus_report(self, transactions_per_poll=None):
+        """Per-slave health and bus utilisation, plus a capacity estimate
+
+        transactions_per_poll is a list of register counts read per poll
+        (e.g. [2, 1]) used for the theoretical wire-time estimate.
+        """
+        with self.lock:
+            elapsed = max(time.monotonic() - self.started_at, 1e-6)
+            slaves = []
+            total_bus_time = 0.0
+            total_polls = 0
+            for slave_id in self.slave_ids:
+                health = self.health[slave_id]
+                entry = health.to_dict()
+                entry['bus_utilisation'] = round(health.bus_time / elapsed, 4)
+                slaves.append(entry)
+                total_bus_time += health.bus_time
+                total_polls += health.polls
+
+        avg_poll_seconds = total_bus_time / total_polls if total_polls else None
+        report = {
+            'cycle_seconds': self.cycle_seconds,
+            'slot_seconds': self.slot_seconds,
+            'cycles': self.cycles,
+            'bus_utilisation': round(total_bus_time / elapsed, 4),
+            'avg_poll_ms': round(avg_poll_seconds * 1000, 1) if avg_poll_seconds else None,
+            # Units one bus can serve at the current sample rate, from measured poll time
+            'max_units_measured': int(self.cycle_seconds / avg_poll_seconds) if avg_poll_seconds else None,
+            'slaves': slaves,
+        }
+        if transactions_per_poll:
+            wire_time = sum(estimate_register_read_time(self.baud_rate, count) for count in transactions_per_poll)
+            report['wire_time_ms'] = round(wire_time * 1000, 1)
+            report['max_units_theoretical'] = int(self.cycle_seconds / wire_time)
+        return report
+
+    def print_report(self, transactions_per_poll=None):
+        """Print a one-line-per-slave bus summary"""
+        report = self.bus_report(transactions_per_poll)
+        print(f"[BUS] {len(self.slave_ids)} slave(s), cycle {self.cycle_seconds}s, "
+              f"utilisation {report['bus_utilisation'] * 100:.1f}%, avg poll {report['avg_poll_ms']} ms, "
+              f"capacity ~{report['max_units_measured']} unit(s) at this rate")
+        for entry in report['slaves']:
+            print(f"[BUS]   slave {entry['slave_id']}: {entry['state']}, "
+                  f"{entry['successes']}/{entry['polls']} ok, avg {entry['avg_poll_ms']} ms, "
+                  f"{entry['bus_utilisation'] * 100:.1f}% of bus")
@@ -10,14 +10,51 @@
 CREATE TABLE IF NOT EXISTS public.sensor_readings (
   id SERIAL PRIMARY KEY,
   timestamp TIMESTAMP NOT NULL DEFAULT NOW(),
-  pressure DECIMAL(10, 2) NOT NULL,
-  temperature DECIMAL(10, 2) NOT NULL
+  pressure DECIMAL(10, 2),  -- Only on rows written before raw counts were stored
+  temperature DECIMAL(10, 2),
+  pressure_raw SMALLINT,  -- 12-bit ADC counts, converted on read (see sensor_calibration)
+  temperature_raw SMALLINT,
+  valve_position INTEGER,  -- Valve at sample time (NULL when no session is running)
+  session_id INTEGER,  -- Session the sample belongs to (NULL when idle)
+  ingest_key UUID  -- Idempotency key set by the telemetry writer
 );
 
 -- Create index for performance
 CREATE INDEX IF NOT EXISTS idx_sensor_readings_timestamp 
   ON public.sensor_readings(timestamp DESC);
 
+CREATE UNIQUE INDEX IF NOT EXISTS idx_sensor_readings_ingest_key
+  ON public.sensor_readings(ingest_key, timestamp);
+
+CREATE INDEX IF NOT EXISTS idx_sensor_readings_session
+  ON public.sensor_readings(session_id, timestamp);
+
+-- Versioned counts -> PSI / degrees C conversion (see sensor_calibration.py)
+CREATE TABLE IF NOT EXISTS public.sensor_calibration (
+  version SERIAL PRIMARY KEY,
+  effective_from TIMESTAMP NOT NULL,
+  pressure_counts_min SMALLINT NOT NULL DEFAULT 0,
+  pressure_counts_max SMALLINT NOT NULL DEFAULT 4095,
+  pressure_min REAL NOT NULL DEFAULT 0.0,
+  pressure_max REAL NOT NULL DEFAULT 87.0,
+  temperature_counts_min SMALLINT NOT NULL DEFAULT 0,
+  temperature_counts_max SMALLINT NOT NULL DEFAULT 4095,
+  temperature_min REAL NOT NULL DEFAULT 0.0,
+  temperature_max REAL NOT NULL DEFAULT 350.0,
+  temperature_knee REAL NOT NULL DEFAULT 80.0,
+  temperature_knee_gain REAL NOT NULL DEFAULT 0.2,
+  note TEXT,
+  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO public.sensor_calibration (version, effective_from, note)
+  VALUES (1, '1970-01-01 00:00:00', 'Factory scaling')
+  ON CONFLICT (version) DO NOTHING;
+
+-- The sensor service (or docker-init-db.py) converts sensor_readings into a
+-- table partitioned by month on timestamp and manages the partitions
+-- (see telemetry_partitions.py).
+
 -- Grant access (optional, depending on your setup)
 -- GRANT ALL ON sensor_readings TO postgres;
 -- GRANT ALL ON SEQUENCE sensor_readings_id_seq TO postgres;
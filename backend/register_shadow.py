@@ -0,0 +1,100 @@
+"""
+Shadow Register Map
+Remembers the last value this service wrote to (or read back from) each of its
+own PLC outputs - the valve holding register and the buzzer coil - so that
+redundant writes are skipped and read-backs are served from memory.
+
+The PLC is still the source of truth: every entry is re-read from the PLC once
+every `verify_interval` seconds, and a mismatch replaces the shadow value.
+"""
+
+import time
+import threading
+
+# Register kinds
+HOLDING_REGISTER = 'hr'
+COIL = 'coil'
+
+
+class RegisterShadow:
+    """Last known value of each output register, keyed by (kind, slave_id, address)"""
+
+    def __init__(self, verify_interval):
+        self.verify_interval = verify_interval
+        self.lock = threading.Lock()
+        self.entries = {}  # key -> {'value', 'verified_at'}
+        self.writes_saved = 0
+        self.reads_saved = 0
+        self.writes = 0
+        self.verifications = 0
+        self.mismatches = 0
+
+    def should_write(self, kind, slave_id, address, value):
+        """False if the PLC already holds value (the write is counted as saved)"""
+        with self.lock:
+            entry = self.entries.get((kind, slave_id, address))
+            if entry is not None and entry['value'] == value:
+                self.writes_saved += 1
+                return False
+            return True
+
+    def record_write(self, kind, slave_id, address, value):
+        """A write was acknowledged by the PLC"""
+        with self.lock:
+            self.writes += 1
+            entry = self.entries.get((kind, slave_id, address))
+            # Keep the verification clock running - an ack is not a read-back
+            verified_at = entry['verified_at'] if entry is not None else time.monotonic()
+            self.entries[(kind, slave_id, address)] = {'value': value, 'verified_at': verified_at}
+
+    def cached_read(self, kind, slave_id, address):
+        """Shadow value, or None if unknown or due for verification against the PLC"""
+        with self.lock:
+            entry = self.entries.get((kind, slave_id, address))
+            if entry is None or time.monotonic() - entry['verified_at'] >= self.verify_interval:
+                return None
+            self.reads_saved += 1
+            return entry['value']
+
+    def record_read(self, kind, slave_id, address, value):
+        """Value read back from the PLC; returns False if it disagreed with the shadow"""
+        with self.lock:
+            self.verifications += 1
+            entry = self.entries.get((kind, slave_id, address))
+            matched = entry is None or entry['value'] == value
+            if not matched:
+                self.mismatches += 1
+                print(f"[SHADOW] slave {slave_id} {kind} {address}: PLC has {value}, expected {entry['value']}")
+            self.entries[(kind, slave_id, address)] = {'value': value, 'verified_at': time.monotonic()}
+            return matched
+
+    def due_for_verify(self, kind=None):
+        """Keys whose shadow value has not been checked against the PLC recently"""
+        now = time.monotonic()
+        with self.lock:
+            return [
+                key for key, entry in self.entries.items()
+                if (kind is None or key[0] == kind) and now - entry['verified_at'] >= self.verify_interval
+            ]
+
+    def invalidate(self, slave_id=None):
+        """Forget shadow values (after a reconnect the PLC may have restarted)"""
+        with self.lock:
+            if slave_id is None:
+                self.entries.clear()
+            else:
+                for key in [key for key in self.entries if key[1] == slave_id]:
+                    del self.entries[key]
+
+    def stats(self):
+        """Transactions saved and verification results"""
+        with self.lock:
+            return {
+                'verify_interval': self.verify_interval,
+                'entries': len(self.entries),
+                'writes': self.writes,
+                'writes_saved': self.writes_saved,
+                'reads_saved': self.reads_saved,
+                'verifications': self.verifications,
+                'mismatches': self.mismatches,
+            }
@@ -0,0 +1,289 @@
+"""
+Sensor Calibration
+sensor_readings stores the raw 12-bit ADC counts of the pressure and
+temperature transmitters (pressure_raw / temperature_raw SMALLINT). The
+conversion to PSI and degrees C lives in the versioned sensor_calibration
+table and is applied on read:
+
+    pressure    = pressure_min + (counts - counts_min) * span / count_span
+    temperature = t + knee_gain * max(t - knee, 0)   (t = linear 0-350 C scale)
+
+A reading uses the newest calibration whose effective_from is at or before
+its timestamp. After a sensor swap, add a version effective from the swap;
+to correct history, add a version effective from the start of the affected
+range (the rollups are recomputed from there). Rows written before raw
+counts were stored keep their stored pressure / temperature values.
+
+Usage:
+    python sensor_calibration.py list
+    python sensor_calibration.py add --from "2026-10-01 08:00" --pressure-max 100 --note "New transmitter"
+"""
+
+import os
+import sys
+import argparse
+from datetime import datetime
+import numpy as np
+
+CALIBRATION_TABLE = 'sensor_calibration'
+RAW_COUNT_MAX = 32767  # SMALLINT upper bound
+
+# Conversion parameters (columns of sensor_calibration) and their factory values
+CALIBRATION_PARAMS = {
+    'pressure_counts_min': 0,
+    'pressure_counts_max': 4095,
+    'pressure_min': 0.0,  # PSI
+    'pressure_max': 87.0,
+    'temperature_counts_min': 0,
+    'temperature_counts_max': 4095,
+    'temperature_min': 0.0,  # Degrees C
+    'temperature_max': 350.0,
+    'temperature_knee': 80.0,  # Above this the reading is corrected...
+    'temperature_knee_gain': 0.2,  # ...by gain * (temperature - knee)
+}
+FIRST_EFFECTIVE_FROM = datetime(1970, 1, 1)
+
+
+class Calibration:
+    """One calibration version; parameters may be scalars or per-row numpy arrays"""
+    __slots__ = ('version', 'effective_from') + tuple(CALIBRATION_PARAMS)
+
+    def __init__(self, version=None, effective_from=FIRST_EFFECTIVE_FROM, **params):
+        self.version = version
+        self.effective_from = effective_from
+        for name, default in CALIBRATION_PARAMS.items():
+            setattr(self, name, params.get(name, default))
+
+    def params(self):
+        return {name: getattr(self, name) for name in CALIBRATION_PARAMS}
+
+    def pressure(self, counts):
+        """Counts to PSI (scalar or array)"""
+        return self.pressure_min + (counts - self.pressure_counts_min) * (
+            (self.pressure_max - self.pressure_min) / (self.pressure_counts_max - self.pressure_counts_min)
+        )
+
+    def temperature(self, counts):
+        """Counts to degrees C, with the correction above the knee (scalar or array)"""
+        linear = self.temperature_min + (counts - self.temperature_counts_min) * (
+            (self.temperature_max - self.temperature_min) / (self.temperature_counts_max - self.temperature_counts_min)
+        )
+        return linear + self.temperature_knee_gain * np.maximum(linear - self.temperature_knee, 0)
+
+    def __repr__(self):
+        return f"Calibration(version={self.version}, effective_from={self.effective_from})"
+
+
+DEFAULT_CALIBRATION = Calibration(version=1)
+
+
+def calibration_table_statements():
+    """DDL for the calibration table plus the factory calibration as version 1 (idempotent)"""
+    columns = ',\n'.join(
+        f"                {name} {'SMALLINT' if isinstance(default, int) else 'REAL'} NOT NULL DEFAULT {default}"
+        for name, default in CALIBRATION_PARAMS.items()
+    )
+    return [
+        f"""
+            CREATE TABLE IF NOT EXISTS {CALIBRATION_TABLE} (
+                version SERIAL PRIMARY KEY,
+                effective_from TIMESTAMP NOT NULL,
+{columns},
+                note TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+        """,
+        f"CREATE INDEX IF NOT EXISTS idx_{CALIBRATION_TABLE}_effective_from ON {CALIBRATION_TABLE}(effective_from)",
+        f"""
+            INSERT INTO {CALIBRATION_TABLE} (version, effective_from, note)
+            VALUES (1, '{FIRST_EFFECTIVE_FROM.isoformat(sep=' ')}', 'Factory scaling')
+            ON CONFLICT (version) DO NOTHING
+        """,
+        f"SELECT setval(pg_get_serial_sequence('{CALIBRATION_TABLE}', 'version'), (SELECT max(version) FROM {CALIBRATION_TABLE}))",
+    ]
+
+
+def create_calibration_table(cursor):
+    """Create and seed the calibration table if needed"""
+    for sql in calibration_table_statements():
+        cursor.execute(sql)
+
+
+def load_calibrations(cursor):
+    """Every calibration version ordered by (effective_from, version)"""
+    names = ', '.join(CALIBRATION_PARAMS)
+    cursor.execute(f"SELECT version, effective_from, {names} FROM {CALIBRATION_TABLE} ORDER BY effective_from, version")
+    calibrations = [
+        Calibration(row[0], row[1], **dict(zip(CALIBRATION_PARAMS, row[2:])))
+        for row in cursor.fetchall()
+    ]
+    return calibrations or [DEFAULT_CALIBRATION]
+
+
+def calibration_at(calibrations, timestamp):
+    """Calibration in effect at a (naive) timestamp"""
+    current = calibrations[0]
+    for calibration in calibrations:
+        if calibration.effective_from <= timestamp:
+            current = calibration
+    return current
+
+
+def wall_clock(ts):
+    """Naive local wall-clock time (the database stores IST)"""
+    return ts.replace(tzinfo=None) if ts.tzinfo else ts
+
+
+def calibrate(timestamps, pressure_raw, temperature_raw, calibrations):
+    """Vectorized counts -> (pressure, temperature) float64 arrays
+
+    timestamps is a datetime64 array; each sample is converted with the
+    calibration in effect at its timestamp (the first version for anything
+    older). NaN counts stay NaN.
+    """
+    effective = np.array([wall_clock(c.effective_from) for c in calibrations], dtype='datetime64[ms]')
+    index = np.clip(np.searchsorted(effective, timestamps.astype('datetime64[ms]'), side='right') - 1, 0, None)
+    per_row = Calibration(**{
+        name: np.array([getattr(c, name) for c in calibrations], dtype=np.float64)[index]
+        for name in CALIBRATION_PARAMS
+    })
+    return per_row.pressure(pressure_raw), per_row.temperature(temperature_raw)
+
+
+def calibrate_rows(rows, calibrations):
+    """(timestamp, pressure, temperature, pressure_raw, temperature_raw, *rest) rows
+    -> (timestamp, pressure, temperature, *rest) with values rounded to 2 decimals
+
+    Rows with raw counts are converted in one vectorized pass; rows without
+    them keep their stored values.
+    """
+    if not rows:
+        return []
+
+    def column(index):
+        return np.array([np.nan if row[index] is None else float(row[index]) for row in rows], dtype=np.float64)
+
+    timestamps = np.array([wall_clock(row[0]) for row in rows], dtype='datetime64[ms]')
+    pressure_raw, temperature_raw = column(3), column(4)
+    pressure, temperature = calibrate(timestamps, pressure_raw, temperature_raw, calibrations)
+    pressure = np.where(np.isnan(pressure_raw), column(1), pressure).round(2)
+    temperature = np.where(np.isnan(temperature_raw), column(2), temperature).round(2)
+    return [
+        (row[0], None if np.isnan(p) else p, None if np.isnan(t) else t) + tuple(row[5:])
+        for row, p, t in zip(rows, pressure.tolist(), temperature.tolist())
+    ]
+
+
+# Select list that calibrate_rows() expects after the timestamp
+READING_VALUE_COLUMNS = 'pressure, temperature, pressure_raw, temperature_raw'
+
+
+def calibration_join_sql(readings='r', alias='c'):
+    """LATERAL join of each reading to the calibration in effect at its timestamp"""
+    return (
+        f"LEFT JOIN LATERAL (SELECT * FROM {CALIBRATION_TABLE} {alias}_v "
+        f"WHERE {alias}_v.effective_from <= {readings}.timestamp "
+        f"ORDER BY {alias}_v.effective_from DESC, {alias}_v.version DESC LIMIT 1) {alias} ON true"
+    )
+
+
+def pressure_sql(readings='r', alias='c'):
+    """SQL expression for a reading's pressure (same formula as Calibration.pressure)"""
+    r, c = readings, alias
+    return (
+        f"CASE WHEN {r}.pressure_raw IS NULL THEN {r}.pressure::real ELSE "
+        f"{c}.pressure_min + ({r}.pressure_raw - {c}.pressure_counts_min) "
+        f"* ({c}.pressure_max - {c}.pressure_min) / ({c}.pressure_counts_max - {c}.pressure_counts_min) END"
+    )
+
+
+def temperature_sql(readings='r', alias='c'):
+    """SQL expression for a reading's temperature (same formula as Calibration.temperature)"""
+    r, c = readings, alias
+    linear = (
+        f"({c}.temperature_min + ({r}.temperature_raw - {c}.temperature_counts_min) "
+        f"* ({c}.temperature_max - {c}.temperature_min) / ({c}.temperature_counts_max - {c}.temperature_counts_min))"
+    )
+    return (
+        f"CASE WHEN {r}.temperature_raw IS NULL THEN {r}.temperature::real ELSE "
+        f"{linear} + {c}.temperature_knee_gain * GREATEST({linear} - {c}.temperature_knee, 0) END"
+    )
+
+
+def raw_counts(counts):
+    """ADC counts clamped to the SMALLINT column range (None stays None)"""
+    if counts is None:
+        return None
+    return max(0, min(int(counts), RAW_COUNT_MAX))
+
+
+def add_calibration(conn, effective_from, note=None, **params):
+    """Insert a new calibration version and commit; returns its version number
+
+    Parameters not given are copied from the calibration in effect at
+    effective_from. Callers should refresh the rollups from effective_from.
+    """
+    cursor = conn.cursor()
+    try:
+        base = calibration_at(load_calibrations(cursor), effective_from).params()
+        base.update({name: value for name, value in params.items() if value is not None})
+        names = ', '.join(base)
+        placeholders = ', '.join(['%s'] * len(base))
+        cursor.execute(
+            f"INSERT INTO {CALIBRATION_TABLE} (effective_from, note, {names}) VALUES (%s, %s, {placeholders}) RETURNING version",
+            (effective_from, note, *base.values())
+        )
+        version = cursor.fetchone()[0]
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return version
+
+
+def main(argv=None):
+    import psycopg2
+    from dotenv import load_dotenv
+    from telemetry_rollups import refresh_rollups
+
+    parser = argparse.ArgumentParser(description='Sensor calibration versions')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help='Show all calibration versions')
+    add = commands.add_parser('add', help='Add a calibration version and recompute rollups from its start')
+    add.add_argument('--from', dest='effective_from', required=True, type=datetime.fromisoformat,
+                     help='IST wall-clock time the calibration applies from, e.g. "2026-10-01 08:00"')
+    add.add_argument('--note')
+    for name, default in CALIBRATION_PARAMS.items():
+        add.add_argument(f"--{name.replace('_', '-')}", dest=name, type=type(default))
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    conn = psycopg2.connect(
+        host=os.getenv('PG_HOST', '127.0.0.1'),
+        port=os.getenv('PG_PORT', '5432'),
+        database=os.getenv('PG_DATABASE', 'autoclave'),
+        user=os.getenv('PG_USER', 'postgres'),
+        password=os.getenv('PG_PASSWORD', 'postgres'),
+        options='-c timezone=Asia/Kolkata'
+    )
+    try:
+        if args.command == 'add':
+            params = {name: getattr(args, name) for name in CALIBRATION_PARAMS}
+            version = add_calibration(conn, args.effective_from, args.note, **params)
+            print(f"[OK] Calibration version {version} effective from {args.effective_from}")
+            refresh_rollups(conn, args.effective_from)
+            print(f"[OK] Rollups recomputed from {args.effective_from}")
+        cursor = conn.cursor()
+        for calibration in load_calibrations(cursor):
+            params = ', '.join(f"{name}={value}" for name, value in calibration.params().items())
+            print(f"v{calibration.version}  from {calibration.effective_from}  {params}")
+        cursor.close()
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
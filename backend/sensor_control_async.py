@@ -0,0 +1,860 @@
+"""
+Asyncio Sensor and Control Service
+Same job as sensor_control_service.py, but acquisition, control, buzzer,
+session watching and DB persistence all run as tasks on one event loop.
+Every Modbus and database call has its own timeout, so a slow commit
+never delays a valve write.
+
+Start with: SERVICE_RUNTIME=asyncio python sensor_control_service.py
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import contextlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import psycopg2
+try:
+    import asyncpg
+except ImportError:
+    # Async runtime is optional - the threaded service does not need asyncpg
+    asyncpg = None
+
+from sensor_control_service import (
+    COM_PORT, BAUD_RATE, SLAVE_ID, TIMEOUT,
+    VALVE_CONTROL_REGISTER, BUZZER_COIL_ADDRESS,
+    PRESSURE_REGISTER, TEMPERATURE_REGISTER,
+    SNAPSHOT_INPUT_START, SNAPSHOT_INPUT_COUNT,
+    CONTROL_INTERVAL, PRESSURE_TOLERANCE, MAX_VALVE_VALUE,
+    BUZZER_ON_DURATION, BUZZER_OFF_DURATION, BUZZER_CHECK_INTERVAL,
+    PG_HOST, PG_PORT, PG_DATABASE, PG_USER, PG_PASSWORD,
+    MODBUS_MIN_TIMEOUT, MODBUS_TRANSACTION_BUDGET, MODBUS_MAX_ATTEMPTS,
+    SENSOR_READ_INTERVAL, ACQUISITION_INTERVAL, SNAPSHOT_BUFFER_SIZE, SNAPSHOT_MAX_AGE,
+    SHADOW_VERIFY_INTERVAL, TELEMETRY_BATCH_SIZE, TELEMETRY_FLUSH_INTERVAL, TELEMETRY_SPOOL_PATH,
+    TELEMETRY_PARTITIONS_AHEAD, TELEMETRY_RETENTION_MONTHS, TELEMETRY_RETENTION_ACTION,
+    PARTITION_MAINTENANCE_INTERVAL, SESSION_ARCHIVE_DIR, SESSION_ARCHIVE_AFTER_HOURS, RETENTION_DAYS,
+    IST, get_ist_now, SensorSnapshot,
+    scale_pressure_counts, scale_temperature_counts,
+    parse_pressure_range, get_buzzer_threshold,
+)
+from plc_transport import build_transport
+from adaptive_timeout import AdaptiveTimeouts, apply_client_timeout
+from register_shadow import RegisterShadow, HOLDING_REGISTER, COIL
+from device_watcher import DeviceWatcher
+from telemetry_partitions import run_partition_maintenance
+from telemetry_rollups import rollup_table_statements, refresh_statements, refresh_rollups
+from telemetry_writer import TELEMETRY_TABLES, SPOOL_REPLAY_CHUNK
+from telemetry_spool import TelemetrySpool
+from session_archive import archive_sessions
+from telemetry_retention import run_retention
+from sensor_calibration import DEFAULT_CALIBRATION, load_calibrations, calibration_at, raw_counts
+from pymodbus.exceptions import ModbusIOException
+
+# Timeouts (seconds) for the asyncio runtime
+MODBUS_CALL_TIMEOUT = TIMEOUT
+DB_CALL_TIMEOUT = 5
+SESSION_WATCH_INTERVAL = 1
+CONTROL_TICK = 1
+RECONNECT_MAX_DELAY = 10
+PERSIST_QUEUE_SIZE = 600  # Samples buffered for the DB task (10 minutes at 1 Hz)
+TELEMETRY_COLUMNS = TELEMETRY_TABLES['sensor_readings']
+TELEMETRY_INSERT = (
+    f"INSERT INTO sensor_readings ({', '.join(TELEMETRY_COLUMNS)}) "
+    f"VALUES ({', '.join(f'${i}' for i in range(1, len(TELEMETRY_COLUMNS) + 1))}) "
+    f"ON CONFLICT (ingest_key, timestamp) DO NOTHING"
+)
+TELEMETRY_TS_INDEX = TELEMETRY_COLUMNS.index('timestamp')
+
+
+def get_ist_naive():
+    """Current IST wall-clock time without tzinfo (for TIMESTAMP columns)"""
+    return get_ist_now().replace(tzinfo=None)
+
+
+class AsyncSensorControlService:
+    def __init__(self):
+        """Initialize service (loop objects are created in run())"""
+        # PLC state
+        self.plc_client = None
+        self.slave_id = SLAVE_ID
+        self.com_port = COM_PORT
+        self.transport = build_transport(COM_PORT, BAUD_RATE, MODBUS_CALL_TIMEOUT)
+        self.bus_lock = None
+        self.connect_lock = None
+        self.adaptive_timeouts = AdaptiveTimeouts(
+            MODBUS_MIN_TIMEOUT, MODBUS_CALL_TIMEOUT, MODBUS_TRANSACTION_BUDGET, MODBUS_MAX_ATTEMPTS
+        )
+        self.register_shadow = RegisterShadow(SHADOW_VERIFY_INTERVAL)
+        self.reconnect_delay = 1
+        self.next_connect_attempt = 0
+        self.device_watcher = None
+        if self.transport.is_serial and not sys.platform.startswith('win'):
+            self.device_watcher = DeviceWatcher(COM_PORT, on_added=self.on_device_added)
+
+        # Database state
+        self.db_pool = None
+        self.next_db_attempt = 0
+        self.db_errors = 0
+        # The spool (SQLite) and its replay connection live on one worker thread
+        self.spool = TelemetrySpool(TELEMETRY_SPOOL_PATH)
+        self.spool_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='telemetry-spool')
+        self.replay_conn = None
+
+        # Acquisition state
+        self.latest_snapshot = None
+        self.snapshot_buffer = deque(maxlen=SNAPSHOT_BUFFER_SIZE)
+        self.persist_queue = None
+        self.dropped_samples = 0
+        self.last_flush_ms = None
+        self.rollup_tables_ready = False
+        self.calibration = DEFAULT_CALIBRATION  # Live scaling; reloaded by the maintenance task
+
+        # Control state
+        self.control_active = False
+        self.target_pressure = None
+        self.current_psi_range = None
+        self.remaining_minutes = 0
+        self.valve_position = 0
+        self.session_id = None
+        self.session_status = None
+        self.end_time = None
+        self.last_checked_session_id = None
+        self.no_active_session_count = 0
+
+        # Buzzer state
+        self.buzzer_active = False
+
+        # Multi-step program state
+        self.program_steps = []
+        self.current_step_index = 0
+        self.step_start_time = None
+        self.step_pause_offset = 0
+        self.paused_time = None
+
+        self.stop_event = None
+
+    async def wait_or_stop(self, seconds):
+        """Sleep for up to `seconds`; returns True if the service is stopping"""
+        if seconds <= 0:
+            return self.stop_event.is_set()
+        try:
+            await asyncio.wait_for(self.stop_event.wait(), timeout=seconds)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    # ===== PLC =====
+
+    def check_device_available(self):
+        """Check if the serial device exists (always True on Windows and TCP)"""
+        if not self.transport.is_serial or sys.platform.startswith('win'):
+            return True
+        if self.device_watcher and self.device_watcher.running:
+            return self.device_watcher.is_present()
+        return os.path.exists(self.com_port) and os.access(self.com_port, os.R_OK)
+
+    def on_device_added(self):
+        """Hot-plug watcher callback - skip the remaining reconnect backoff"""
+        self.reconnect_delay = 1
+        self.next_connect_attempt = 0
+
+    async def ensure_plc_connected(self):
+        """Connect once even if several pipelined calls find the link down"""
+        if self.plc_client and self.plc_client.connected:
+            return True
+        async with self.connect_lock:
+            return await self.connect_plc()
+
+    async def connect_plc(self):
+        """Connect to the PLC; reconnect attempts back off up to RECONNECT_MAX_DELAY"""
+        if self.plc_client and self.plc_client.connected:
+            return True
+        if time.monotonic() < self.next_connect_attempt:
+            return False
+
+        if self.plc_client:
+            self.transport.release_client(self.plc_client)
+            self.plc_client = None
+
+        connected = False
+        if self.check_device_available():
+            try:
+                self.plc_client = self.transport.create_async_client()
+                connected = await asyncio.wait_for(self.plc_client.connect(), MODBUS_CALL_TIMEOUT)
+            except Exception as e:
+                print(f"[ERROR] PLC connect failed: {e}")
+
+        if connected:
+            print(f"[OK] Connected to PLC on {self.transport.describe()}")
+            self.reconnect_delay = 1
+            self.register_shadow.invalidate()
+            return True
+
+        print(f"[RECONNECT] PLC on {self.transport.describe()} unavailable, retrying in {self.reconnect_delay}s")
+        self.next_connect_attempt = time.monotonic() + self.reconnect_delay
+        self.reconnect_delay = min(self.reconnect_delay * 2, RECONNECT_MAX_DELAY)
+        return False
+
+    async def plc_call(self, method_name, *args, **kwargs):
+        """Run one Modbus transaction with an RTT-derived timeout and retry budget
+
+        Serialized on the bus lock for serial and RTU-over-TCP links; Modbus TCP
+        requests carry transaction IDs and are pipelined on one socket.
+        """
+        if not await self.ensure_plc_connected():
+            return None
+        lock = self.bus_lock if self.transport.serialize_requests else contextlib.nullcontext()
+        attempts = self.adaptive_timeouts.attempts_for(self.slave_id)
+        result = None
+        async with lock:
+            deadline = self.adaptive_timeouts.deadline()
+            for attempt in range(attempts):
+                if not self.plc_client or not self.plc_client.connected:
+                    break
+                timeout = self.adaptive_timeouts.timeout_for(self.slave_id, deadline - time.monotonic())
+                apply_client_timeout(self.plc_client, timeout)
+                started = time.monotonic()
+                try:
+                    method = getattr(self.plc_client, method_name)
+                    result = await asyncio.wait_for(
+                        method(*args, slave=self.slave_id, **kwargs),
+                        MODBUS_CALL_TIMEOUT
+                    )
+                except (ModbusIOException, asyncio.TimeoutError):
+                    result = None
+                    will_retry = self.adaptive_timeouts.can_retry(attempt, attempts, deadline)
+                    self.adaptive_timeouts.record_timeout(self.slave_id, will_retry=will_retry)
+                    if not will_retry:
+                        break
+                    continue
+                except Exception as e:
+                    print(f"[ERROR] Modbus {method_name} failed: {type(e).__name__} {e}")
+                    return None
+                self.adaptive_timeouts.record_success(self.slave_id, time.monotonic() - started, attempt)
+                break
+        if result is None or result.isError():
+            return None
+        return result
+
+    async def read_valve_register(self):
+        """Read the valve register back from the PLC and refresh the shadow"""
+        result = await self.plc_call('read_holding_registers', VALVE_CONTROL_REGISTER, count=1)
+        if result is None:
+            return None
+        self.register_shadow.record_read(HOLDING_REGISTER, self.slave_id, VALVE_CONTROL_REGISTER, result.registers[0])
+        return result.registers[0]
+
+    async def read_snapshot(self):
+        """Read pressure/temperature block and valve register into a SensorSnapshot
+
+        The valve register comes from the shadow while it is fresh.
+        """
+        valve_position = self.register_shadow.cached_read(HOLDING_REGISTER, self.slave_id, VALVE_CONTROL_REGISTER)
+        if valve_position is not None:
+            result = await self.plc_call('read_input_registers', SNAPSHOT_INPUT_START, count=SNAPSHOT_INPUT_COUNT)
+            if result is None:
+                return None
+        elif self.transport.serialize_requests:
+            result = await self.plc_call('read_input_registers', SNAPSHOT_INPUT_START, count=SNAPSHOT_INPUT_COUNT)
+            if result is None:
+                return None
+            valve_position = await self.read_valve_register()
+        else:
+            # Modbus TCP: both requests in flight on the socket at once
+            result, valve_position = await asyncio.gather(
+                self.plc_call('read_input_registers', SNAPSHOT_INPUT_START, count=SNAPSHOT_INPUT_COUNT),
+                self.read_valve_register()
+            )
+            if result is None:
+                return None
+
+        raw_pressure = result.registers[PRESSURE_REGISTER - SNAPSHOT_INPUT_START]
+        raw_temperature = result.registers[TEMPERATURE_REGISTER - SNAPSHOT_INPUT_START]
+        return SensorSnapshot(
+            timestamp=get_ist_now(),
+            pressure=scale_pressure_counts(raw_pressure, self.calibration),
+            temperature=scale_temperature_counts(raw_temperature, self.calibration),
+            valve_position=valve_position,
+            raw_pressure=raw_pressure,
+            raw_temperature=raw_temperature
+        )
+
+    async def set_valve_position(self, value):
+        """Set valve control register (0-4000); skipped if the PLC already holds value"""
+        if self.register_shadow.should_write(HOLDING_REGISTER, self.slave_id, VALVE_CONTROL_REGISTER, value):
+            result = await self.plc_call('write_register', VALVE_CONTROL_REGISTER, value)
+            if result is None:
+                self.register_shadow.invalidate(self.slave_id)
+                return False
+            self.register_shadow.record_write(HOLDING_REGISTER, self.slave_id, VALVE_CONTROL_REGISTER, value)
+        self.valve_position = value
+        return True
+
+    async def set_buzzer(self, state):
+        """Set buzzer coil (True=ON, False=OFF); skipped if the coil is already in state"""
+        state = bool(state)
+        if not self.register_shadow.should_write(COIL, self.slave_id, BUZZER_COIL_ADDRESS, state):
+            return True
+        if await self.plc_call('write_coil', BUZZER_COIL_ADDRESS, state) is None:
+            self.register_shadow.invalidate(self.slave_id)
+            return False
+        self.register_shadow.record_write(COIL, self.slave_id, BUZZER_COIL_ADDRESS, state)
+        return True
+
+    async def verify_shadow_coils(self):
+        """Re-read shadowed coils that are due for verification"""
+        for _, slave_id, address in self.register_shadow.due_for_verify(COIL):
+            result = await self.plc_call('read_coils', address, count=1)
+            if result is not None:
+                self.register_shadow.record_read(COIL, slave_id, address, bool(result.bits[0]))
+
+    def get_latest_snapshot(self, max_age=SNAPSHOT_MAX_AGE):
+        """Get the most recent snapshot, or None if there is none or it is stale"""
+        snapshot = self.latest_snapshot
+        if snapshot is None:
+            return None
+        if max_age is not None and (get_ist_now() - snapshot.timestamp).total_seconds() > max_age:
+            return None
+        return snapshot
+
+    # ===== Database =====
+
+    async def ensure_db_pool(self):
+        """Create the asyncpg pool if needed (retried at most every 10 seconds)"""
+        if self.db_pool is not None:
+            return True
+        if time.monotonic() < self.next_db_attempt:
+            return False
+        try:
+            self.db_pool = await asyncio.wait_for(
+                asyncpg.create_pool(
+                    host=PG_HOST,
+                    port=int(PG_PORT),
+                    database=PG_DATABASE,
+                    user=PG_USER,
+                    password=PG_PASSWORD,
+                    min_size=1,
+                    max_size=4,
+                    command_timeout=DB_CALL_TIMEOUT,
+                    server_settings={'timezone': 'Asia/Kolkata'}
+                ),
+                DB_CALL_TIMEOUT
+            )
+            print("[OK] Connected to PostgreSQL (asyncpg pool)")
+            return True
+        except Exception as e:
+            print(f"[WARNING] Failed to connect to PostgreSQL: {e}")
+            self.next_db_attempt = time.monotonic() + 10
+            return False
+
+    async def db_execute(self, query, *args):
+        """Run a statement with a timeout; errors are counted, not raised"""
+        if not await self.ensure_db_pool():
+            return False
+        try:
+            await asyncio.wait_for(self.db_pool.execute(query, *args), DB_CALL_TIMEOUT)
+            return True
+        except Exception as e:
+            self.db_errors += 1
+            print(f"[ERROR] DB write failed ({self.db_errors} total): {e}")
+            return False
+
+    async def db_fetchrow(self, query, *args):
+        """Fetch one row with a timeout; returns None on error"""
+        if not await self.ensure_db_pool():
+            return None
+        try:
+            return await asyncio.wait_for(self.db_pool.fetchrow(query, *args), DB_CALL_TIMEOUT)
+        except Exception as e:
+            self.db_errors += 1
+            print(f"[ERROR] DB read failed ({self.db_errors} total): {e}")
+            return None
+
+    # ===== Session and step logic =====
+
+    def check_step_completion(self):
+        """Check if current step duration has been exceeded"""
+        if not self.program_steps or self.current_step_index >= len(self.program_steps):
+            return False
+        if self.step_start_time is None:
+            self.step_start_time = time.time()
+            return False
+
+        elapsed_seconds = time.time() - self.step_start_time - self.step_pause_offset
+        if self.paused_time is not None:
+            # Currently paused - add pause time to offset
+            self.step_pause_offset += time.time() - self.paused_time
+            self.paused_time = time.time()
+
+        return elapsed_seconds / 60 >= self.program_steps[self.current_step_index]['duration_minutes']
+
+    def mark_paused(self):
+        """Mark that the step is now paused"""
+        if self.paused_time is None:
+            self.paused_time = time.time()
+
+    def mark_resumed(self):
+        """Mark that the step has resumed"""
+        if self.paused_time is not None:
+            self.step_pause_offset += time.time() - self.paused_time
+            self.paused_time = None
+
+    async def advance_to_next_step(self):
+        """Move to next program step"""
+        self.current_step_index += 1
+        if self.current_step_index >= len(self.program_steps):
+            print(f"[COMPLETE] All {len(self.program_steps)} steps completed")
+            await self.complete_session()
+            return
+
+        new_step = self.program_steps[self.current_step_index]
+        self.target_pressure = parse_pressure_range(new_step['psi_range'])
+        self.current_psi_range = new_step['psi_range']
+        self.step_start_time = time.time()
+        self.step_pause_offset = 0
+        self.paused_time = None
+
+        print(f"\n[STEP] Advanced to step {self.current_step_index + 1}/{len(self.program_steps)}")
+        print(f"[STEP] Target: {self.target_pressure} PSI ({new_step['psi_range']})")
+        print(f"[STEP] Duration: {new_step['duration_minutes']} min")
+
+    def start_control_session(self, session_id, target_pressure, duration_minutes, steps_data):
+        """Start controlling an API-created session"""
+        if steps_data:
+            self.program_steps = json.loads(steps_data) if isinstance(steps_data, str) else steps_data
+            self.current_step_index = 0
+            self.step_start_time = time.time()
+            first_step = self.program_steps[0]
+            self.target_pressure = parse_pressure_range(first_step['psi_range'])
+            self.current_psi_range = first_step['psi_range']
+            print(f"[PROGRAM] Loaded {len(self.program_steps)} step program")
+        else:
+            self.program_steps = []
+            self.current_step_index = 0
+            self.step_start_time = None
+            self.target_pressure = float(target_pressure)
+            self.current_psi_range = None
+
+        self.step_pause_offset = 0
+        self.paused_time = None
+        self.session_id = session_id
+        self.session_status = 'running'
+        self.no_active_session_count = 0
+        self.remaining_minutes = int(duration_minutes)
+        self.end_time = get_ist_now().timestamp() + int(duration_minutes) * 60
+        self.control_active = True
+
+        end_datetime = datetime.fromtimestamp(self.end_time, IST)
+        print(f"[OK] Started control session {session_id}")
+        print(f"     Target: {self.target_pressure} PSI")
+        print(f"     Will complete at: {end_datetime.strftime('%Y-%m-%d %H:%M:%S')}")
+
+    async def stop_control(self, reason):
+        """Stop control locally and put outputs in a safe state"""
+        print(f"[CONTROL] {reason}, stopping control and closing valve")
+        self.control_active = False
+        self.target_pressure = None
+        self.session_id = None
+        self.session_status = None
+        if self.buzzer_active:
+            self.buzzer_active = False
+        await self.set_buzzer(False)
+        if await self.set_valve_position(0):
+            print("[SAFETY] Valve closed to 0/4000")
+
+    async def complete_session(self):
+        """Mark the current session completed and stop control"""
+        session_id = self.session_id
+        if session_id and await self.ensure_db_pool():
+            try:
+                async with self.db_pool.acquire() as conn:
+                    async with conn.transaction():
+                        status = await asyncio.wait_for(
+                            conn.fetchval("SELECT status FROM process_sessions WHERE id=$1 FOR UPDATE", session_id),
+                            DB_CALL_TIMEOUT
+                        )
+                        if status in ('running', 'paused'):
+                            await asyncio.wait_for(
+                                conn.execute(
+                                    "UPDATE process_sessions SET status='completed', end_time=$1 WHERE id=$2",
+                                    get_ist_naive(), session_id
+                                ),
+                                DB_CALL_TIMEOUT
+                            )
+                            print(f"[COMPLETE] Session {session_id} completed successfully")
+                        else:
+                            print(f"[INFO] Session {session_id} already has status '{status}', skipping update")
+            except Exception as e:
+                self.db_errors += 1
+                print(f"[ERROR] Completing session: {e}")
+        await self.stop_control(f"Session {session_id} complete")
+
+    # ===== Tasks =====
+
+    async def acquisition_task(self):
+        """Sample the PLC every ACQUISITION_INTERVAL and hand samples to the DB task"""
+        print(f"[ACQ] Acquisition task started ({ACQUISITION_INTERVAL}s interval)")
+        while not self.stop_event.is_set():
+            started = time.monotonic()
+            snapshot = await self.read_snapshot()
+            if snapshot is not None:
+                self.snapshot_buffer.append(snapshot)
+                self.latest_snapshot = snapshot
+                if snapshot.valve_position is not None:
+                    self.valve_position = snapshot.valve_position
+                try:
+                    self.persist_queue.put_nowait(snapshot)
+                except asyncio.QueueFull:
+                    self.dropped_samples += 1
+                await self.verify_shadow_coils()
+            if await self.wait_or_stop(started + ACQUISITION_INTERVAL - time.monotonic()):
+                break
+
+    async def flush_telemetry(self, rows):
+        """Insert buffered rows in one transaction; returns True if written"""
+        if not await self.ensure_db_pool():
+            return False
+        started = time.monotonic()
+        try:
+            async with self.db_pool.acquire() as conn:
+                async with conn.transaction():
+                    if not self.rollup_tables_ready:
+                        for sql in rollup_table_statements():
+                            await conn.execute(sql)
+                    await conn.executemany(TELEMETRY_INSERT, rows)
+                    # Recompute the minute/hour rollups touched by this batch
+                    oldest = min(row[TELEMETRY_TS_INDEX] for row in rows)
+                    for sql in refresh_statements('$1'):
+                        await conn.execute(sql, oldest)
+                self.rollup_tables_ready = True
+        except (asyncpg.exceptions.DataError, asyncpg.exceptions.IntegrityConstraintViolationError) as e:
+            # Bad data would fail forever - drop the batch rather than spool it
+            self.db_errors += 1
+            self.dropped_samples += len(rows)
+            print(f"[ERROR] Telemetry batch rejected, {len(rows)} row(s) dropped ({self.db_errors} total): {e}")
+            return True
+        except Exception as e:
+            self.db_errors += 1
+            print(f"[ERROR] Telemetry flush failed ({self.db_errors} total): {e}")
+            return False
+        self.last_flush_ms = (time.monotonic() - started) * 1000
+        return True
+
+    async def spool_telemetry(self, rows):
+        """Move rows that could not be written to the local spool; returns True if stored"""
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(
+                self.spool_executor, self.spool.append, [('sensor_readings', row) for row in rows], TELEMETRY_TABLES
+            )
+        except Exception as e:
+            print(f"[ERROR] Telemetry spool failed: {e}")
+            return False
+        return True
+
+    def replay_spool_chunk(self):
+        """Replay one chunk of spooled rows on a psycopg2 connection (runs on the spool thread)
+
+        Returns the number of rows replayed, or None on error.
+        """
+        try:
+            if self.replay_conn is None or self.replay_conn.closed:
+                self.replay_conn = self.connect_sync_db()
+            replayed = self.spool.replay(self.replay_conn, SPOOL_REPLAY_CHUNK)
+            if replayed and self.spool.oldest_replayed:
+                refresh_rollups(self.replay_conn, self.spool.oldest_replayed)
+        except Exception as e:
+            print(f"[ERROR] Spool replay failed: {e}")
+            if self.replay_conn is not None:
+                try:
+                    self.replay_conn.rollback()
+                except Exception:
+                    pass
+                if isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError)):
+                    self.replay_conn = None
+            return None
+        if replayed and self.spool.depth == 0:
+            print(f"[SPOOL] Replay complete ({self.spool.replayed} row(s) in total)")
+        return replayed
+
+    def close_spool(self):
+        """Close the spool and its replay connection (runs on the spool thread)"""
+        self.spool.close()
+        if self.replay_conn is not None:
+            try:
+                self.replay_conn.close()
+            except Exception:
+                pass
+            self.replay_conn = None
+
+    async def persistence_task(self):
+        """Write one sensor_readings row per sample (session-tagged while controlling) in batches
+
+        Rows that cannot be written go to the local spool. Once a flush
+        succeeds again, the spool is replayed a chunk at a time between flushes.
+        """
+        loop = asyncio.get_running_loop()
+        last_reading_saved = 0
+        rows = []
+        db_ok = True  # Last write (flush or replay) reached the database
+        next_flush = time.monotonic() + TELEMETRY_FLUSH_INTERVAL
+        while not self.stop_event.is_set() or rows:
+            if len(rows) >= TELEMETRY_BATCH_SIZE or time.monotonic() >= next_flush or self.stop_event.is_set():
+                next_flush = time.monotonic() + TELEMETRY_FLUSH_INTERVAL
+                if rows:
+                    db_ok = await self.flush_telemetry(rows)
+                    if db_ok or await self.spool_telemetry(rows):
+                        rows = []
+                    elif len(rows) > PERSIST_QUEUE_SIZE:
+                        # Spool unavailable too - keep only the newest rows
+                        self.dropped_samples += len(rows) - PERSIST_QUEUE_SIZE
+                        rows = rows[-PERSIST_QUEUE_SIZE:]
+                if self.stop_event.is_set():
+                    break
+                if db_ok and self.spool.depth:
+                    replayed = await loop.run_in_executor(self.spool_executor, self.replay_spool_chunk)
+                    db_ok = replayed is not None
+                    if replayed:
+                        next_flush = time.monotonic()  # More to replay - come back right after this sample
+            try:
+                snapshot = await asyncio.wait_for(self.persist_queue.get(), SESSION_WATCH_INTERVAL)
+            except asyncio.TimeoutError:
+                continue
+            ts = snapshot.timestamp.replace(tzinfo=None)
+            reading_due = snapshot.timestamp.timestamp() - last_reading_saved >= SENSOR_READ_INTERVAL
+
+            pressure_raw, temperature_raw = raw_counts(snapshot.raw_pressure), raw_counts(snapshot.raw_temperature)
+            if self.control_active and self.session_id:
+                # Every sample of a session, with the valve position
+                rows.append((self.session_id, pressure_raw, temperature_raw, snapshot.valve_position, ts, str(uuid.uuid4())))
+            elif reading_due:
+                rows.append((None, pressure_raw, temperature_raw, None, ts, str(uuid.uuid4())))
+
+            if reading_due:
+                last_reading_saved = snapshot.timestamp.timestamp()
+                control_status = ""
+                if self.control_active:
+                    control_status = f" | Target: {self.target_pressure} PSI | Valve: {self.valve_position}/4000 | Time: {self.remaining_minutes} min"
+                print(f"[{snapshot.timestamp.strftime('%H:%M:%S')}] Pressure: {snapshot.pressure} PSI, Temperature: {snapshot.temperature}°C{control_status}")
+
+    def connect_sync_db(self):
+        """New psycopg2 connection for the worker-thread jobs"""
+        return psycopg2.connect(
+            host=PG_HOST, port=PG_PORT, database=PG_DATABASE, user=PG_USER, password=PG_PASSWORD,
+            options='-c timezone=Asia/Kolkata'
+        )
+
+    def db_maintenance(self):
+        """Calibration reload, partition maintenance, session archiving and retention on a psycopg2 connection (runs in a worker thread)"""
+        conn = None
+        try:
+            conn = self.connect_sync_db()
+            cursor = conn.cursor()
+            calibration = calibration_at(load_calibrations(cursor), get_ist_naive())
+            cursor.close()
+            conn.commit()
+            if calibration.version != self.calibration.version:
+                print(f"[CALIBRATION] Using calibration version {calibration.version} (effective from {calibration.effective_from})")
+            self.calibration = calibration
+            run_partition_maintenance(
+                conn, get_ist_now().date(), TELEMETRY_PARTITIONS_AHEAD,
+                TELEMETRY_RETENTION_MONTHS, TELEMETRY_RETENTION_ACTION
+            )
+            if SESSION_ARCHIVE_AFTER_HOURS > 0:
+                ended_before = get_ist_naive() - timedelta(hours=SESSION_ARCHIVE_AFTER_HOURS)
+                for session_id, samples in archive_sessions(conn, SESSION_ARCHIVE_DIR, ended_before):
+                    print(f"[ARCHIVE] Session {session_id}: {samples} sample(s) moved to {SESSION_ARCHIVE_DIR}")
+            if not self.control_active:
+                run_retention(
+                    conn, get_ist_naive(), RETENTION_DAYS,
+                    should_continue=lambda: not self.control_active and not self.stop_event.is_set()
+                )
+        except Exception as e:
+            print(f"[WARNING] Database maintenance failed: {e}")
+        finally:
+            if conn is not None:
+                conn.close()
+
+    async def maintenance_task(self):
+        """Reload the calibration, keep sensor_readings partitions ahead of time, expire old ones, archive finished sessions and prune idle telemetry"""
+        while not self.stop_event.is_set():
+            await asyncio.to_thread(self.db_maintenance)
+            if await self.wait_or_stop(PARTITION_MAINTENANCE_INTERVAL):
+                break
+
+    async def session_watch_task(self):
+        """Track the session status and pick up new API-created sessions"""
+        while not self.stop_event.is_set():
+            if self.control_active and self.session_id:
+                row = await self.db_fetchrow("SELECT status FROM process_sessions WHERE id=$1", self.session_id)
+                status = row['status'] if row else None
+
+                if status in ('stopped', 'completed'):
+                    await self.stop_control(f"Session status changed to: {status}")
+                elif status == 'paused':
+                    self.no_active_session_count = 0
+                    if self.session_status != 'paused':
+                        print("[CONTROL] Paused")
+                        self.mark_paused()
+                elif status == 'running':
+                    self.no_active_session_count = 0
+                    if self.session_status == 'paused':
+                        print("[CONTROL] Resumed")
+                        self.mark_resumed()
+                else:
+                    self.no_active_session_count += 1
+                    if self.no_active_session_count > 300:
+                        await self.stop_control("No active session for 5 minutes")
+                if self.control_active:
+                    self.session_status = status
+            elif not self.control_active:
+                row = await self.db_fetchrow(
+                    "SELECT id, target_pressure, duration_minutes, program_name, steps_data FROM process_sessions WHERE status='running' AND target_pressure IS NOT NULL ORDER BY id DESC LIMIT 1"
+                )
+                if row and row['id'] != self.last_checked_session_id:
+                    print(f"\n[NEW SESSION] Detected session {row['id']} ({row['program_name']})")
+                    self.last_checked_session_id = row['id']
+                    self.start_control_session(row['id'], row['target_pressure'], row['duration_minutes'], row['steps_data'])
+
+            if await self.wait_or_stop(SESSION_WATCH_INTERVAL):
+                break
+
+    async def control_task(self):
+        """Step timing, completion and valve control - never waits on the database"""
+        control_count = 0
+        while not self.stop_event.is_set():
+            if self.control_active:
+                # Step completion (sequential steps)
+                if self.program_steps and self.current_step_index < len(self.program_steps) and self.check_step_completion():
+                    print(f"[STEP] Step {self.current_step_index + 1}/{len(self.program_steps)} completed, advancing to next step")
+                    await self.advance_to_next_step()
+
+                # Total time completion
+                if self.control_active and self.end_time:
+                    remaining_seconds = self.end_time - get_ist_now().timestamp()
+                    self.remaining_minutes = max(0, int(remaining_seconds / 60) + 1)
+                    if remaining_seconds <= 0:
+                        print(f"[COMPLETE] Time elapsed for session {self.session_id}")
+                        await self.complete_session()
+
+                snapshot = self.get_latest_snapshot()
+                if self.control_active and self.session_status == 'running' and snapshot is not None:
+                    control_count += 1
+                    if control_count >= CONTROL_INTERVAL:
+                        control_count = 0
+                        pressure_diff = float(snapshot.pressure) - float(self.target_pressure)
+                        if abs(pressure_diff) > PRESSURE_TOLERANCE:
+                            if pressure_diff < 0:
+                                new_valve = max(self.valve_position - 800, 0)
+                                if await self.set_valve_position(new_valve):
+                                    print(f"[CONTROL] Pressure low ({snapshot.pressure:.1f}), decreasing valve to {new_valve}")
+                            else:
+                                new_valve = min(self.valve_position + 800, MAX_VALVE_VALUE)
+                                if await self.set_valve_position(new_valve):
+                                    print(f"[CONTROL] Pressure high ({snapshot.pressure:.1f}), increasing valve to {new_valve}")
+            else:
+                control_count = 0
+
+            if await self.wait_or_stop(CONTROL_TICK):
+                break
+
+    async def buzzer_task(self):
+        """Sound the buzzer (3 s on / 3 s off) while pressure is below threshold"""
+        while not self.stop_event.is_set():
+            snapshot = self.get_latest_snapshot()
+            if not self.control_active or self.target_pressure is None or snapshot is None:
+                if await self.wait_or_stop(BUZZER_CHECK_INTERVAL):
+                    break
+                continue
+
+            buzzer_threshold = get_buzzer_threshold(self.target_pressure, self.current_psi_range)
+            if snapshot.pressure < buzzer_threshold:
+                if not self.buzzer_active:
+                    print(f"[BUZZER] Pressure {snapshot.pressure:.2f} PSI below threshold ({buzzer_threshold:.2f} PSI), activating buzzer")
+                    self.buzzer_active = True
+                await self.set_buzzer(True)
+                stopping = await self.wait_or_stop(BUZZER_ON_DURATION)
+                await self.set_buzzer(False)
+                if stopping or await self.wait_or_stop(BUZZER_OFF_DURATION):
+                    break
+            else:
+                if self.buzzer_active:
+                    await self.set_buzzer(False)
+                    self.buzzer_active = False
+                    print(f"[BUZZER] Pressure {snapshot.pressure:.2f} PSI above threshold ({buzzer_threshold:.2f} PSI), buzzer deactivated")
+                if await self.wait_or_stop(BUZZER_CHECK_INTERVAL):
+                    break
+
+    async def run(self):
+        """Main service coroutine"""
+        print(f"\n{'='*60}")
+        print("Sensor & Control Service (asyncio runtime)")
+        print(f"{'='*60}")
+        print(f"PLC link: {self.transport.describe()}")
+        print(f"Sampling every {ACQUISITION_INTERVAL} second, saving readings every {SENSOR_READ_INTERVAL} seconds")
+        print(f"{'='*60}\n")
+
+        if asyncpg is None:
+            print("[ERROR] asyncpg is not installed - run: pip install asyncpg")
+            return
+
+        self.stop_event = asyncio.Event()
+        self.bus_lock = asyncio.Lock()
+        self.connect_lock = asyncio.Lock()
+        self.persist_queue = asyncio.Queue(maxsize=PERSIST_QUEUE_SIZE)
+
+        if self.device_watcher and self.device_watcher.start():
+            print(f"[HOTPLUG] Watching {COM_PORT} for unplug/replug")
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(self.spool_executor, self.spool.open)  # Rows left over from a previous run are replayed first
+        except Exception as e:
+            print(f"[ERROR] Telemetry spool unavailable: {e}")
+        await self.ensure_db_pool()
+        await self.connect_plc()
+        await self.set_valve_position(0)
+
+        tasks = [
+            asyncio.create_task(self.acquisition_task()),
+            asyncio.create_task(self.persistence_task()),
+            asyncio.create_task(self.maintenance_task()),
+            asyncio.create_task(self.session_watch_task()),
+            asyncio.create_task(self.control_task()),
+            asyncio.create_task(self.buzzer_task()),
+        ]
+        print("[INFO] Service ready. Waiting for frontend to start control...\n")
+
+        try:
+            await self.stop_event.wait()
+        finally:
+            self.stop_event.set()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if self.control_active:
+                await self.stop_control("Service stopping")
+            if self.plc_client:
+                self.transport.release_client(self.plc_client)
+            if self.device_watcher:
+                self.device_watcher.stop()
+            if self.db_pool:
+                await self.db_pool.close()
+            await loop.run_in_executor(self.spool_executor, self.close_spool)
+            self.spool_executor.shutdown()
+            print("\n[OK] Service stopped")
+
+
+def run_async_service():
+    """Run the asyncio service until interrupted"""
+    service = AsyncSensorControlService()
+    try:
+        asyncio.run(service.run())
+    except KeyboardInterrupt:
+        print("\n\n[STOPPED] Service stopped by user")
+
+
+if __name__ == "__main__":
+    run_async_service()
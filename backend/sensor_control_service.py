@@ -9,13 +9,28 @@ import time
 import sys
 import subprocess
 import re
-from datetime import datetime
-from pymodbus.client import ModbusSerialClient
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import psycopg2
 import threading
+import queue
+from collections import deque
 import requests
 import pytz
+from poll_scheduler import PollScheduler
+from plc_transport import build_transport
+from adaptive_timeout import AdaptiveTimeouts, apply_client_timeout
+from register_shadow import RegisterShadow, HOLDING_REGISTER, COIL
+from link_supervisor import LinkSupervisor
+from device_watcher import DeviceWatcher, resolve_usb_path
+from db_pool import ThreadConnections
+from telemetry_writer import TelemetryWriter
+from telemetry_spool import TelemetrySpool
+from telemetry_partitions import run_partition_maintenance
+from session_archive import archive_sessions
+from telemetry_retention import run_retention
+from sensor_calibration import DEFAULT_CALIBRATION, load_calibrations, calibration_at, raw_counts
+from pymodbus.exceptions import ModbusIOException
 try:
     import serial
     import serial.tools.list_ports
@@ -29,7 +44,18 @@ load_dotenv()
 COM_PORT = os.getenv('COM_PORT', 'COM10')
 BAUD_RATE = int(os.getenv('BAUD_RATE', '9600'))
 SLAVE_ID = int(os.getenv('SLAVE_ID', '1'))
-TIMEOUT = 2
+TIMEOUT = 2  # Upper bound for a single transaction's timeout
+
+# Adaptive timeouts: per-slave RTT estimate drives each transaction's timeout
+MODBUS_MIN_TIMEOUT = float(os.getenv('MODBUS_MIN_TIMEOUT', '0.05'))  # Floor (seconds)
+MODBUS_TRANSACTION_BUDGET = float(os.getenv('MODBUS_TRANSACTION_BUDGET', '1.0'))  # Total per transaction incl. retries
+MODBUS_MAX_ATTEMPTS = 3
+
+# Multi-drop: all slave IDs polled on this bus (comma-separated).
+# SLAVE_ID is the unit this service controls; the others are monitored.
+SLAVE_IDS = [int(x) for x in os.getenv('SLAVE_IDS', str(SLAVE_ID)).split(',') if x.strip()]
+if SLAVE_ID not in SLAVE_IDS:
+    SLAVE_IDS.insert(0, SLAVE_ID)
 
 # Register addresses
 PRESSURE_REGISTER = 68
@@ -37,11 +63,9 @@ TEMPERATURE_REGISTER = 69
 VALVE_CONTROL_REGISTER = 51
 BUZZER_COIL_ADDRESS = 0  # Coil address for buzzer control
 
-# Scaling
-PRESSURE_MIN = 0
-PRESSURE_MAX = 4095
-PRESSURE_OUTPUT_MIN = 0
-PRESSURE_OUTPUT_MAX = 87
+# Pressure and temperature are contiguous input registers - read them in one block
+SNAPSHOT_INPUT_START = min(PRESSURE_REGISTER, TEMPERATURE_REGISTER)
+SNAPSHOT_INPUT_COUNT = abs(TEMPERATURE_REGISTER - PRESSURE_REGISTER) + 1
 
 # Control parameters
 CONTROL_INTERVAL = 7  # Check every 15 seconds
@@ -62,10 +86,54 @@ PG_PORT = os.getenv('PG_PORT', '5432')
 PG_DATABASE = os.getenv('PG_DATABASE', 'autoclave')
 PG_USER = os.getenv('PG_USER', 'postgres')
 PG_PASSWORD = os.getenv('PG_PASSWORD', 'postgres')
+DB_RECONNECT_MIN_DELAY = 1  # Seconds before the first reconnect attempt, doubling...
+DB_RECONNECT_MAX_DELAY = 30  # ...up to this
 
 # Sensor reading interval
 SENSOR_READ_INTERVAL = 7
 
+# Telemetry writer - sensor_readings rows (one per sample) are inserted in batches
+TELEMETRY_BATCH_SIZE = int(os.getenv('TELEMETRY_BATCH_SIZE', '100'))  # Flush when this many rows are queued
+TELEMETRY_FLUSH_INTERVAL = float(os.getenv('TELEMETRY_FLUSH_INTERVAL', '1'))  # ... or after this many seconds (live values are read back from the database)
+TELEMETRY_QUEUE_SIZE = 5000  # Rows buffered in memory before they are flushed or spooled
+# Local SQLite spool that keeps telemetry while PostgreSQL is unreachable
+TELEMETRY_SPOOL_PATH = os.getenv(
+    'TELEMETRY_SPOOL_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'spool', 'telemetry_spool.db')
+)
+# Monthly sensor_readings partitions (see telemetry_partitions.py)
+TELEMETRY_PARTITIONS_AHEAD = int(os.getenv('TELEMETRY_PARTITIONS_AHEAD', '3'))  # Months created in advance
+TELEMETRY_RETENTION_MONTHS = int(os.getenv('TELEMETRY_RETENTION_MONTHS', '0'))  # 0 = keep all months
+TELEMETRY_RETENTION_ACTION = os.getenv('TELEMETRY_RETENTION_ACTION', 'detach')  # 'detach' or 'drop' expired months
+PARTITION_MAINTENANCE_INTERVAL = 3600  # Seconds between partition maintenance runs
+# Finished sessions are moved from sensor_readings into per-session columnar files
+SESSION_ARCHIVE_DIR = os.getenv(
+    'SESSION_ARCHIVE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'archive')
+)
+SESSION_ARCHIVE_AFTER_HOURS = float(os.getenv('SESSION_ARCHIVE_AFTER_HOURS', '24'))  # 0 = never archive
+# Row-level retention while idle (see telemetry_retention.py), in days; 0 = keep (default)
+RETENTION_DAYS = {
+    'idle_readings': int(os.getenv('RETENTION_IDLE_READINGS_DAYS', '0')),
+    'idle_rollups_1m': int(os.getenv('RETENTION_IDLE_ROLLUPS_DAYS', '0')),
+    'process_logs': int(os.getenv('RETENTION_PROCESS_LOGS_DAYS', '0')),
+}
+
+# Runtime: 'threads' (default) or 'asyncio' (see sensor_control_async.py)
+SERVICE_RUNTIME = os.getenv('SERVICE_RUNTIME', 'threads')
+
+# Acquisition thread - the only thread that talks to the RS485 bus
+ACQUISITION_INTERVAL = 1  # Sample the PLC every second
+SNAPSHOT_BUFFER_SIZE = 120  # Ring buffer of recent snapshots (2 minutes at 1 Hz)
+SNAPSHOT_MAX_AGE = 5  # Snapshots older than this (seconds) are treated as missing
+PLC_WRITE_WAIT = 10  # Max seconds a caller waits for the acquisition thread to run a write
+BUS_REPORT_INTERVAL = 300  # Print per-slave bus usage every 5 minutes
+
+# Shadow register map: our own outputs (valve, buzzer) are served from memory
+# and only re-read from the PLC this often (seconds)
+SHADOW_VERIFY_INTERVAL = float(os.getenv('SHADOW_VERIFY_INTERVAL', '30'))
+
+# How long run() waits for the first PLC connection before carrying on (seconds)
+LINK_STARTUP_WAIT = 10
+
 # IST timezone (UTC+5:30)
 IST = pytz.timezone('Asia/Kolkata')
 
@@ -74,6 +142,84 @@ def get_ist_now():
     return datetime.now(IST)
 
 
+class SensorSnapshot:
+    """One timestamped acquisition of pressure, temperature and valve position"""
+    __slots__ = ('timestamp', 'pressure', 'temperature', 'valve_position',
+                 'raw_pressure', 'raw_temperature', 'slave_id')
+
+    def __init__(self, timestamp, pressure, temperature, valve_position=None,
+                 raw_pressure=None, raw_temperature=None, slave_id=None):
+        self.timestamp = timestamp
+        self.pressure = pressure
+        self.temperature = temperature
+        self.valve_position = valve_position
+        self.raw_pressure = raw_pressure
+        self.raw_temperature = raw_temperature
+        self.slave_id = slave_id
+
+    def __repr__(self):
+        return (f"SensorSnapshot(timestamp={self.timestamp.isoformat()}, pressure={self.pressure}, "
+                f"temperature={self.temperature}, valve_position={self.valve_position})")
+
+
+def prepare_session_queries(conn):
+    """Connection init hook: prepared statement for the once-a-second session status check"""
+    cursor = conn.cursor()
+    cursor.execute("PREPARE session_status (integer) AS SELECT status FROM process_sessions WHERE id = $1")
+    cursor.close()
+
+
+def scale_pressure_counts(raw_value, calibration=DEFAULT_CALIBRATION):
+    """Scale raw 12-bit ADC counts to PSI (live value - rows store the counts)"""
+    if raw_value is None:
+        return None
+    return round(float(calibration.pressure(raw_value)), 2)
+
+
+def scale_temperature_counts(raw_value, calibration=DEFAULT_CALIBRATION):
+    """Scale raw 12-bit ADC counts to degrees C, including the correction above 80 C"""
+    if raw_value is None:
+        return None
+    return round(float(calibration.temperature(raw_value)), 2)
+
+
+def parse_pressure_range(psi_range):
+    """Parse pressure from range string (e.g., '5-10' -> 7.5, '10' -> 10)"""
+    if '-' in psi_range:
+        parts = psi_range.split('-')
+        if len(parts) == 2:
+            try:
+                low = float(parts[0].strip())
+                high = float(parts[1].strip())
+                return (low + high) / 2  # Median
+            except:
+                pass
+    # Single value or "Steady at X"
+    try:
+        numbers = re.findall(r'\d+(?:\.\d+)?', psi_range)
+        if numbers:
+            return float(numbers[0])
+    except:
+        pass
+    return 0
+
+
+def get_buzzer_threshold(target_pressure, psi_range):
+    """Pressure below which the buzzer sounds for the current step"""
+    if psi_range and '-' in psi_range:
+        # Range: buzzer activates when pressure < (lower + 1)
+        parts = psi_range.split('-')
+        if len(parts) == 2:
+            try:
+                lower_bound = float(parts[0].strip())
+                return lower_bound + 1
+            except:
+                pass
+    
+    # Constant value: buzzer activates when pressure < (constant - 2)
+    return target_pressure - 2
+
+
 class SensorControlService:
     def __init__(self):
         """Initialize service"""
@@ -81,16 +227,24 @@ class SensorControlService:
         self.plc_client = None
         self.slave_id = SLAVE_ID
         self.com_port = COM_PORT
+        self.transport = build_transport(COM_PORT, BAUD_RATE, TIMEOUT)  # serial, tcp or rtu-over-tcp
         self.is_connected = False
-        self.connection_retry_count = 0
-        self.max_retries = 10
-        self.usb_reset_enabled = True  # Enable USB reset on persistent failures
-        self.consecutive_failures = 0
-        self.max_consecutive_failures = 3  # Reset USB after 5 consecutive failures
+        self.usb_reset_enabled = self.transport.supports_usb_reset  # Enable USB reset on persistent failures
         
-        # Initialize PostgreSQL connection
-        self.conn = None
+        # PostgreSQL: each thread gets its own connection (self.conn), reopened with backoff
+        self.db_connections = ThreadConnections(
+            self.open_db_connection, [prepare_session_queries], DB_RECONNECT_MIN_DELAY, DB_RECONNECT_MAX_DELAY
+        )
         self.db_connect()
+        # Samples are written in batches on their own connection
+        self.telemetry_writer = TelemetryWriter(
+            self.open_db_connection, TELEMETRY_BATCH_SIZE, TELEMETRY_FLUSH_INTERVAL, TELEMETRY_QUEUE_SIZE,
+            spool=TelemetrySpool(TELEMETRY_SPOOL_PATH)
+        )
+        self.telemetry_lock = threading.Lock()
+        self.maintenance_stop_event = threading.Event()
+        self.last_telemetry_timestamp = None  # Snapshot last queued (run() and control_loop() both save)
+        self.calibration = DEFAULT_CALIBRATION  # Live scaling; reloaded by the maintenance thread
         
         # Control state
         self.control_active = False
@@ -107,7 +261,38 @@ class SensorControlService:
         self.buzzer_active = False
         self.buzzer_thread = None
         self.buzzer_stop_event = threading.Event()
-        self.plc_lock = threading.Lock()  # Lock for thread-safe PLC access
+        self.plc_lock = self.transport.lock  # Lock for thread-safe PLC access (shared per TCP gateway)
+        self.closed_by_timeout = False  # pymodbus closed the client after an unanswered request
+        self.adaptive_timeouts = AdaptiveTimeouts(
+            MODBUS_MIN_TIMEOUT, TIMEOUT, MODBUS_TRANSACTION_BUDGET, MODBUS_MAX_ATTEMPTS
+        )
+        self.register_shadow = RegisterShadow(SHADOW_VERIFY_INTERVAL)  # Last written valve/buzzer values
+        
+        # Reconnects and USB resets run on the link supervisor thread, never on the hot path
+        self.link_supervisor = LinkSupervisor(
+            self.probe_plc,
+            self.reset_usb_adapter if self.usb_reset_enabled else None,
+            name=self.transport.describe()
+        )
+        # inotify hot-plug watcher for the serial adapter (started in run())
+        self.device_watcher = None
+        if self.transport.is_serial and not sys.platform.startswith('win'):
+            self.device_watcher = DeviceWatcher(
+                COM_PORT,
+                on_added=self.link_supervisor.poke,
+                on_removed=self.link_supervisor.report_link_lost
+            )
+        
+        # Acquisition state - one thread owns the bus and publishes snapshots
+        self.latest_snapshot = None  # Latest-value slot (replaced atomically, read without locking)
+        self.snapshot_buffer = deque(maxlen=SNAPSHOT_BUFFER_SIZE)
+        self.acquisition_thread = None
+        self.acquisition_stop_event = threading.Event()
+        self.plc_write_queue = queue.Queue()
+        
+        # Multi-drop polling - one time slot per slave per acquisition cycle
+        self.poll_scheduler = PollScheduler(SLAVE_IDS, ACQUISITION_INTERVAL, BAUD_RATE, always_poll=(self.slave_id,))
+        self.slave_snapshots = {}  # Latest snapshot per slave ID
         
         # Multi-step program state
         self.program_steps = []
@@ -131,120 +316,56 @@ class SensorControlService:
             except:
                 return False
         else:
-            # Linux/Unix: check if file exists and is readable
+            # Linux/Unix: the hot-plug watcher already knows; otherwise check the file
+            if self.device_watcher and self.device_watcher.running and port_path == self.device_watcher.device_path:
+                return self.device_watcher.is_present()
             return os.path.exists(port_path) and os.access(port_path, os.R_OK)
     
-    def wait_for_device(self, port_path, max_wait_seconds=30, check_interval=1):
-        """Wait for device to become available"""
-        elapsed = 0
-        while elapsed < max_wait_seconds:
-            if self.check_device_available(port_path):
-                return True
-            time.sleep(check_interval)
-            elapsed += check_interval
-            if elapsed % 5 == 0:  # Print every 5 seconds
-                print(f"[WAIT] Waiting for device {port_path}... ({elapsed}s)")
-        return False
-    
-    def connect_plc(self, retry=True):
-        """Connect to PLC with retry logic"""
-        if self.is_connected and self.plc_client and self.plc_client.is_socket_open():
-            return True
-        
-        # Check if device is available
-        if not self.check_device_available(self.com_port):
-            if retry:
-                print(f"[WAIT] Device {self.com_port} not available, waiting...")
-                if not self.wait_for_device(self.com_port):
-                    print(f"[ERROR] Device {self.com_port} not found after waiting")
-                    return False
-            else:
-                print(f"[ERROR] Device {self.com_port} not available")
-                return False
+    def probe_plc(self):
+        """One connection attempt without waiting or retrying - called by the link supervisor"""
+        if self.transport.is_serial and not self.check_device_available(self.com_port):
+            print(f"[WAIT] Device {self.com_port} not available")
+            return False
         
-        # Close existing connection if any
-        if self.plc_client:
+        with self.plc_lock:  # Don't swap the client under an in-flight transaction
+            if self.plc_client:
+                self.transport.release_client(self.plc_client)
+                self.plc_client = None
             try:
-                self.plc_client.close()
-            except:
-                pass
+                self.plc_client = self.transport.create_client()
+                if self.plc_client.connect():
+                    self.is_connected = True
+                    self.register_shadow.invalidate()  # PLC may have restarted while we were away
+                    print(f"[OK] Connected to PLC on {self.transport.describe()}")
+                    return True
+            except Exception as e:
+                print(f"[ERROR] PLC connect failed: {e}")
         
-        # Create new client
-        try:
-            self.plc_client = ModbusSerialClient(
-                port=self.com_port,
-                baudrate=BAUD_RATE,
-                parity='N',
-                stopbits=1,
-                bytesize=8,
-                timeout=TIMEOUT
-            )
-            
-            # Attempt connection with exponential backoff
-            retry_delay = 1
-            for attempt in range(self.max_retries):
-                try:
-                    if self.plc_client.connect():
-                        self.is_connected = True
-                        self.connection_retry_count = 0
-                        self.consecutive_failures = 0
-                        return True
-                except Exception as e:
-                    if attempt < self.max_retries - 1:
-                        print(f"[RETRY] Connection attempt {attempt + 1}/{self.max_retries} failed: {e}")
-                        
-                        # If we've had multiple consecutive failures, try USB reset
-                        if (attempt == self.max_retries // 2 and 
-                            self.consecutive_failures >= self.max_consecutive_failures and 
-                            self.usb_reset_enabled):
-                            print(f"[USB RESET] Multiple connection failures detected, attempting USB reset...")
-                            if self.reset_usb_device(self.com_port):
-                                print(f"[USB RESET] USB device reset, waiting 3 seconds before retry...")
-                                time.sleep(3)
-                        
-                        print(f"        Retrying in {retry_delay} seconds...")
-                        time.sleep(retry_delay)
-                        retry_delay = min(retry_delay * 2, 10)  # Exponential backoff, max 10s
-                    else:
-                        print(f"[ERROR] Failed to connect after {self.max_retries} attempts: {e}")
-                        self.is_connected = False
-                        self.consecutive_failures += 1
-                        
-                        # Try USB reset as last resort
-                        if (self.consecutive_failures >= self.max_consecutive_failures and 
-                            self.usb_reset_enabled):
-                            print(f"[USB RESET] Persistent failures, attempting USB reset...")
-                            if self.reset_usb_device(self.com_port):
-                                print(f"[USB RESET] USB reset successful, will retry on next connection attempt")
-                                time.sleep(3)
-                        
-                        return False
-            
-            self.is_connected = False
-            return False
-            
-        except Exception as e:
-            print(f"[ERROR] Failed to create PLC client: {e}")
-            self.is_connected = False
-            self.consecutive_failures += 1
-            
-            # Try USB reset if we've had many failures
-            if (self.consecutive_failures >= self.max_consecutive_failures and 
-                self.usb_reset_enabled):
-                print(f"[USB RESET] Persistent failures, attempting USB reset...")
-                if self.reset_usb_device(self.com_port):
-                    print(f"[USB RESET] USB reset successful")
-                    time.sleep(3)
-            
+        self.is_connected = False
+        return False
+    
+    def reset_usb_adapter(self):
+        """Reset the RS485 USB adapter - called by the link supervisor"""
+        if not self.reset_usb_device(self.com_port):
             return False
+        time.sleep(3)  # Let the device re-enumerate
+        return True
     
     def find_usb_device_path(self, tty_device):
         """Find the USB device path in /sys/bus/usb/devices/ for a given tty device"""
         if sys.platform.startswith('win'):
             return None  # Windows doesn't use this approach
         
+        # Cached by the hot-plug watcher, or resolved from /sys/class/tty
+        if self.device_watcher and tty_device == self.device_watcher.device_path:
+            usb_path = self.device_watcher.get_usb_path()
+        else:
+            usb_path = resolve_usb_path(tty_device)
+        if usb_path:
+            return usb_path
+        
         try:
-            # Get the device info using udevadm or by checking /sys/class/tty
+            # Fallback for unusual sysfs layouts
             # Method 1: Use udevadm to find USB device
             try:
                 result = subprocess.run(
@@ -366,192 +487,504 @@ class SensorControlService:
             return False
     
     def ensure_connected(self):
-        """Ensure PLC connection is active, reconnect if needed"""
-        if not self.is_connected or not self.plc_client or not self.plc_client.is_socket_open():
-            print("[RECONNECT] PLC connection lost, attempting to reconnect...")
-            return self.connect_plc(retry=True)
+        """Check the PLC link without blocking
+        
+        Returns False straight away while the link is down; reconnecting is
+        left to the link supervisor thread.
+        """
+        if not self.link_supervisor.is_usable():
+            return False
+        if self.plc_client and not self.plc_client.is_socket_open() and self.closed_by_timeout:
+            # pymodbus closes the client after an unanswered request; that timeout
+            # was already reported as one failure, so just reopen the port
+            with self.plc_lock:
+                self.closed_by_timeout = False
+                try:
+                    reopened = self.plc_client.is_socket_open() or self.plc_client.connect()
+                except Exception:
+                    reopened = False
+            if reopened:
+                return True
+        if not self.plc_client or not self.plc_client.is_socket_open():
+            print("[RECONNECT] PLC connection lost, handing over to link supervisor...")
+            self.is_connected = False
+            self.link_supervisor.report_link_lost()
+            return False
         return True
     
+    def open_db_connection(self):
+        """Open a new PostgreSQL connection with the session timezone set to IST"""
+        conn = psycopg2.connect(
+            host=PG_HOST,
+            port=PG_PORT,
+            database=PG_DATABASE,
+            user=PG_USER,
+            password=PG_PASSWORD
+        )
+        # Set timezone to IST
+        cursor = conn.cursor()
+        cursor.execute("SET timezone = 'Asia/Kolkata'")
+        conn.commit()
+        cursor.close()
+        return conn
+    
+    @property
+    def conn(self):
+        """The calling thread's PostgreSQL connection (None while the database is unreachable)"""
+        return self.db_connections.get()
+    
     def db_connect(self):
-        """Connect to PostgreSQL database"""
+        """Connect the calling thread to PostgreSQL"""
+        if self.conn:
+            print("[OK] Connected to PostgreSQL")
+    
+    def get_session_status(self, session_id):
+        """Status of a session (None if it does not exist), via the prepared statement"""
+        conn = self.conn
+        cursor = conn.cursor()
         try:
-            self.conn = psycopg2.connect(
-                host=PG_HOST,
-                port=PG_PORT,
-                database=PG_DATABASE,
-                user=PG_USER,
-                password=PG_PASSWORD
-            )
-            # Set timezone to IST
-            cursor = self.conn.cursor()
-            cursor.execute("SET timezone = 'Asia/Kolkata'")
-            self.conn.commit()
+            cursor.execute("EXECUTE session_status (%s)", (session_id,))
+            row = cursor.fetchone()
+        finally:
             cursor.close()
-            print("[OK] Connected to PostgreSQL")
-        except Exception as e:
-            print(f"[WARNING] Failed to connect to PostgreSQL: {e}")
-            self.conn = None
+        conn.commit()  # Don't leave the connection idle in transaction between checks
+        return row[0] if row else None
     
-    def scale_pressure(self, raw_value):
-        """Scale raw Modbus value to PSI"""
-        if raw_value is None:
+    def maintain_partitions(self):
+        """Create upcoming sensor_readings partitions, seal finished months and apply retention"""
+        conn = None
+        try:
+            conn = self.open_db_connection()
+            return run_partition_maintenance(
+                conn, get_ist_now().date(), TELEMETRY_PARTITIONS_AHEAD,
+                TELEMETRY_RETENTION_MONTHS, TELEMETRY_RETENTION_ACTION
+            )
+        except Exception as e:
+            print(f"[WARNING] Partition maintenance failed: {e}")
             return None
-        scaled = PRESSURE_OUTPUT_MIN + (raw_value - PRESSURE_MIN) * (PRESSURE_OUTPUT_MAX - PRESSURE_OUTPUT_MIN) / (PRESSURE_MAX - PRESSURE_MIN)
-        return round(scaled, 2)
+        finally:
+            if conn is not None:
+                conn.close()
     
-    def read_pressure(self):
-        """Read current pressure from PLC - Thread-safe"""
-        if not self.ensure_connected():
+    def archive_finished_sessions(self):
+        """Move samples of sessions that ended SESSION_ARCHIVE_AFTER_HOURS ago to the archive"""
+        if SESSION_ARCHIVE_AFTER_HOURS <= 0:
             return None
+        conn = None
         try:
-            with self.plc_lock:  # Thread-safe access
-                result = self.plc_client.read_input_registers(
-                    PRESSURE_REGISTER,
-                    count=1,
-                    slave=self.slave_id
-                )
-            
-            if result and not result.isError():
-                raw_value = result.registers[0]
-                # Reset failure counter on successful read
-                self.consecutive_failures = 0
-                if hasattr(self, '_usb_reset_attempted'):
-                    delattr(self, '_usb_reset_attempted')
-                return self.scale_pressure(raw_value)
+            conn = self.open_db_connection()
+            ended_before = get_ist_now().replace(tzinfo=None) - timedelta(hours=SESSION_ARCHIVE_AFTER_HOURS)
+            archived = archive_sessions(conn, SESSION_ARCHIVE_DIR, ended_before)
+            for session_id, samples in archived:
+                print(f"[ARCHIVE] Session {session_id}: {samples} sample(s) moved to {SESSION_ARCHIVE_DIR}")
+            return archived
+        except Exception as e:
+            print(f"[WARNING] Session archiving failed: {e}")
             return None
+        finally:
+            if conn is not None:
+                conn.close()
+    
+    def load_calibration(self):
+        """Pick up the calibration in effect now for the live values"""
+        conn = None
+        try:
+            conn = self.open_db_connection()
+            cursor = conn.cursor()
+            calibration = calibration_at(load_calibrations(cursor), get_ist_now().replace(tzinfo=None))
+            cursor.close()
         except Exception as e:
-            # Connection may have been lost
-            self.is_connected = False
-            self.consecutive_failures += 1
-            
-            # If we've had many failures, try USB reset
-            if (self.consecutive_failures >= self.max_consecutive_failures and 
-                self.usb_reset_enabled and 
-                not hasattr(self, '_usb_reset_attempted')):
-                self._usb_reset_attempted = True
-                print(f"[USB RESET] Multiple read failures, attempting USB reset...")
-                if self.reset_usb_device(self.com_port):
-                    print(f"[USB RESET] USB reset successful, will reconnect on next attempt")
-                    time.sleep(2)
-                    self._usb_reset_attempted = False  # Reset flag after delay
+            print(f"[WARNING] Could not load sensor calibration: {e}")
             return None
+        finally:
+            if conn is not None:
+                conn.close()
+        if calibration.version != self.calibration.version:
+            print(f"[CALIBRATION] Using calibration version {calibration.version} (effective from {calibration.effective_from})")
+        self.calibration = calibration
+        return calibration
     
-    def read_temperature(self):
-        """Read current temperature from PLC - Thread-safe"""
-        if not self.ensure_connected():
+    def prune_telemetry(self):
+        """Delete telemetry past its retention in small batches, only while no session is running"""
+        if self.control_active:
             return None
+        conn = None
         try:
-            with self.plc_lock:  # Thread-safe access
-                result = self.plc_client.read_input_registers(
-                    TEMPERATURE_REGISTER,
-                    count=1,
-                    slave=self.slave_id
-                )
-            
-            if result and not result.isError():
-                raw_value = result.registers[0]
-                temperature = 0 + (raw_value - 0) * (350 - 0) / (4095 - 0)
-                
-                # Apply adjustment formula: temperature + 0.2*(temperature-80) if temperature > 80
-                if temperature > 80:
-                    temperature = temperature + 0.2 * (temperature - 80)
-                
-                # Reset failure counter on successful read
-                self.consecutive_failures = 0
-                if hasattr(self, '_usb_reset_attempted'):
-                    delattr(self, '_usb_reset_attempted')
-                return round(temperature, 2)
-            return None
+            conn = self.open_db_connection()
+            return run_retention(
+                conn, get_ist_now().replace(tzinfo=None), RETENTION_DAYS,
+                should_continue=lambda: not self.control_active and not self.maintenance_stop_event.is_set()
+            )
         except Exception as e:
-            # Connection may have been lost
-            self.is_connected = False
-            self.consecutive_failures += 1
-            
-            # If we've had many failures, try USB reset
-            if (self.consecutive_failures >= self.max_consecutive_failures and 
-                self.usb_reset_enabled and 
-                not hasattr(self, '_usb_reset_attempted')):
-                self._usb_reset_attempted = True
-                print(f"[USB RESET] Multiple read failures, attempting USB reset...")
-                if self.reset_usb_device(self.com_port):
-                    print(f"[USB RESET] USB reset successful, will reconnect on next attempt")
-                    time.sleep(2)
-                    self._usb_reset_attempted = False  # Reset flag after delay
+            print(f"[WARNING] Telemetry retention failed: {e}")
             return None
+        finally:
+            if conn is not None:
+                conn.close()
     
-    def read_valve_position(self):
-        """Read current valve position - Thread-safe"""
+    def maintenance_loop(self):
+        """Database maintenance thread - calibration, partitions, session archiving and retention, at startup and then every PARTITION_MAINTENANCE_INTERVAL"""
+        while not self.maintenance_stop_event.is_set():
+            self.load_calibration()
+            self.maintain_partitions()
+            self.archive_finished_sessions()
+            self.prune_telemetry()
+            self.maintenance_stop_event.wait(PARTITION_MAINTENANCE_INTERVAL)
+    
+    def scale_pressure(self, raw_value):
+        """Scale raw Modbus value to PSI"""
+        return scale_pressure_counts(raw_value, self.calibration)
+    
+    def scale_temperature(self, raw_value):
+        """Scale raw Modbus value to degrees C"""
+        return scale_temperature_counts(raw_value, self.calibration)
+    
+    def modbus_call(self, method_name, *args, slave, **kwargs):
+        """Run one Modbus transaction with an RTT-derived timeout and retry budget
+        
+        Must be called with plc_lock held. Unanswered requests are retried while
+        the transaction budget allows; exception responses from the PLC are
+        returned as-is (the slave did answer). Connection errors propagate.
+        Connection errors are reported to the link supervisor, answers and
+        timeouts only for the controlled slave - a silent monitored unit says
+        nothing about the control link.
+        """
+        method = getattr(self.plc_client, method_name)
+        attempts = self.adaptive_timeouts.attempts_for(slave)
+        deadline = self.adaptive_timeouts.deadline()
+        result = None
+        for attempt in range(attempts):
+            apply_client_timeout(self.plc_client, self.adaptive_timeouts.timeout_for(slave, deadline - time.monotonic()))
+            started = time.monotonic()
+            try:
+                result = method(*args, slave=slave, **kwargs)
+            except Exception:
+                self.link_supervisor.report_failure()
+                raise
+            if isinstance(result, ModbusIOException):
+                self.closed_by_timeout = not self.plc_client.is_socket_open()
+                will_retry = self.adaptive_timeouts.can_retry(attempt, attempts, deadline)
+                self.adaptive_timeouts.record_timeout(slave, will_retry=will_retry)
+                if not will_retry:
+                    break
+                continue
+            self.adaptive_timeouts.record_success(slave, time.monotonic() - started, attempt)
+            if slave == self.slave_id:
+                self.link_supervisor.report_success()
+            return result
+        if slave == self.slave_id:
+            self.link_supervisor.report_failure()
+        return result
+    
+    def get_link_stats(self):
+        """Link state, per-slave RTT estimates, current timeouts and retry counters"""
+        return {**self.adaptive_timeouts.stats(), 'link': self.link_supervisor.stats()}
+    
+    def print_link_stats(self):
+        """Print link state and one line of RTT/timeout stats per slave"""
+        stats = self.get_link_stats()
+        link = stats['link']
+        print(f"[LINK] {link['state']}, {link['disconnects']} disconnect(s), "
+              f"{link['probes']} reconnect attempt(s), {link['usb_resets']} USB reset(s)")
+        for slave_id, rtt in stats['slaves'].items():
+            print(f"[LINK] slave {slave_id}: srtt {rtt['srtt_ms']} ms, rttvar {rtt['rttvar_ms']} ms, "
+                  f"timeout {rtt['rto_ms']} ms, {rtt['timeouts']} timeout(s)")
+        print(f"[LINK] {stats['retries']} retries, {stats['failed_transactions']} failed transaction(s)")
+        shadow = self.get_shadow_stats()
+        print(f"[SHADOW] {shadow['writes_saved']} write(s) and {shadow['reads_saved']} read(s) saved, "
+              f"{shadow['verifications']} verification(s), {shadow['mismatches']} mismatch(es)")
+    
+    def read_snapshot(self, slave_id=None):
+        """Read pressure, temperature and valve position in one acquisition - Thread-safe
+        
+        Pressure and temperature are contiguous input registers, so they are fetched
+        with a single read_input_registers call. The valve holding register is read
+        once in the same lock hold, unless this is the controlled unit and the
+        register shadow already knows the value we wrote. Returns a SensorSnapshot
+        or None if the input registers could not be read. slave_id defaults to the
+        controlled unit.
+        """
+        if slave_id is None:
+            slave_id = self.slave_id
         if not self.ensure_connected():
             return None
         try:
             with self.plc_lock:  # Thread-safe access
-                result = self.plc_client.read_holding_registers(
-                    VALVE_CONTROL_REGISTER,
-                    count=1,
-                    slave=self.slave_id
+                result = self.modbus_call(
+                    'read_input_registers',
+                    SNAPSHOT_INPUT_START,
+                    count=SNAPSHOT_INPUT_COUNT,
+                    slave=slave_id
                 )
+                if not result or result.isError():
+                    return None
+                valve_position = None
+                if slave_id == self.slave_id:
+                    valve_position = self.register_shadow.cached_read(HOLDING_REGISTER, slave_id, VALVE_CONTROL_REGISTER)
+                if valve_position is None:
+                    valve_result = self.modbus_call(
+                        'read_holding_registers',
+                        VALVE_CONTROL_REGISTER,
+                        count=1,
+                        slave=slave_id
+                    )
+                    if valve_result and not valve_result.isError():
+                        valve_position = valve_result.registers[0]
+                        if slave_id == self.slave_id:
+                            self.register_shadow.record_read(HOLDING_REGISTER, slave_id, VALVE_CONTROL_REGISTER, valve_position)
             
-            if result and not result.isError():
-                return result.registers[0]
-            return None
-        except Exception as e:
-            # Connection may have been lost
-            self.is_connected = False
-            self.consecutive_failures += 1
+            raw_pressure = result.registers[PRESSURE_REGISTER - SNAPSHOT_INPUT_START]
+            raw_temperature = result.registers[TEMPERATURE_REGISTER - SNAPSHOT_INPUT_START]
             
-            # If we've had many failures, try USB reset
-            if (self.consecutive_failures >= self.max_consecutive_failures and 
-                self.usb_reset_enabled and 
-                not hasattr(self, '_usb_reset_attempted')):
-                self._usb_reset_attempted = True
-                print(f"[USB RESET] Multiple read failures, attempting USB reset...")
-                if self.reset_usb_device(self.com_port):
-                    print(f"[USB RESET] USB reset successful, will reconnect on next attempt")
-                    time.sleep(2)
-                    self._usb_reset_attempted = False  # Reset flag after delay
-            return None
+            return SensorSnapshot(
+                timestamp=get_ist_now(),
+                pressure=self.scale_pressure(raw_pressure),
+                temperature=self.scale_temperature(raw_temperature),
+                valve_position=valve_position,
+                raw_pressure=raw_pressure,
+                raw_temperature=raw_temperature,
+                slave_id=slave_id
+            )
+        except Exception as e:
+            return None  # Already reported to the link supervisor by modbus_call
+    
+    def read_pressure(self):
+        """Read current pressure from PLC - Thread-safe"""
+        snapshot = self.read_snapshot()
+        return snapshot.pressure if snapshot else None
+    
+    def read_temperature(self):
+        """Read current temperature from PLC - Thread-safe"""
+        snapshot = self.read_snapshot()
+        return snapshot.temperature if snapshot else None
+    
+    def read_valve_position(self):
+        """Read current valve position - Thread-safe"""
+        snapshot = self.read_snapshot()
+        return snapshot.valve_position if snapshot else None
     
     def set_valve_position(self, value):
         """Set valve control register (0-4000) - Thread-safe"""
+        return self.submit_plc_write(lambda: self.write_valve_register(value))
+    
+    def write_valve_register(self, value):
+        """Write the valve register - runs on the bus-owner thread"""
+        if not self.register_shadow.should_write(HOLDING_REGISTER, self.slave_id, VALVE_CONTROL_REGISTER, value):
+            self.valve_position = value
+            return True  # PLC already holds this value
         if not self.ensure_connected():
             return False
         try:
             with self.plc_lock:  # Thread-safe access
-                result = self.plc_client.write_register(
+                result = self.modbus_call(
+                    'write_register',
                     VALVE_CONTROL_REGISTER,
                     value,
                     slave=self.slave_id
                 )
             
             if not result.isError():
+                self.register_shadow.record_write(HOLDING_REGISTER, self.slave_id, VALVE_CONTROL_REGISTER, value)
                 self.valve_position = value
                 return True
+            self.register_shadow.invalidate(self.slave_id)
             return False
         except Exception as e:
             print(f"[ERROR] Writing valve: {e}")
-            # Connection may have been lost
-            self.is_connected = False
+            self.register_shadow.invalidate(self.slave_id)  # Write may or may not have landed
             return False
     
     def set_buzzer(self, state):
         """Set buzzer coil (True=ON, False=OFF) - Thread-safe"""
+        return self.submit_plc_write(lambda: self.write_buzzer_coil(state))
+    
+    def write_buzzer_coil(self, state):
+        """Write the buzzer coil - runs on the bus-owner thread"""
+        state = bool(state)
+        if not self.register_shadow.should_write(COIL, self.slave_id, BUZZER_COIL_ADDRESS, state):
+            return True  # Coil already in this state
         if not self.ensure_connected():
             return False
         try:
             with self.plc_lock:  # Thread-safe access to avoid RS485 conflicts
-                result = self.plc_client.write_coil(
+                result = self.modbus_call(
+                    'write_coil',
                     BUZZER_COIL_ADDRESS,
                     state,
                     slave=self.slave_id
                 )
             
             if not result.isError():
+                self.register_shadow.record_write(COIL, self.slave_id, BUZZER_COIL_ADDRESS, state)
                 return True
+            self.register_shadow.invalidate(self.slave_id)
             return False
         except Exception as e:
             print(f"[ERROR] Writing buzzer: {e}")
+            self.register_shadow.invalidate(self.slave_id)
             return False
     
+    def verify_shadow_coils(self):
+        """Re-read shadowed coils that are due for verification - runs on the bus-owner thread
+        
+        The valve register is verified by read_snapshot() itself.
+        """
+        due = self.register_shadow.due_for_verify(COIL)
+        if not due or not self.ensure_connected():
+            return
+        for _, slave_id, address in due:
+            try:
+                with self.plc_lock:
+                    result = self.modbus_call('read_coils', address, count=1, slave=slave_id)
+                if result and not result.isError():
+                    self.register_shadow.record_read(COIL, slave_id, address, bool(result.bits[0]))
+            except Exception as e:
+                print(f"[ERROR] Verifying coil {address}: {e}")
+                self.register_shadow.invalidate(slave_id)
+    
+    def get_shadow_stats(self):
+        """Writes and reads saved by the register shadow"""
+        return self.register_shadow.stats()
+    
+    def is_acquisition_running(self):
+        """Check if the acquisition thread currently owns the bus"""
+        return self.acquisition_thread is not None and self.acquisition_thread.is_alive()
+    
+    def submit_plc_write(self, write_fn):
+        """Run a PLC write on the acquisition thread and wait for its result
+        
+        Falls back to running the write directly (under plc_lock) when the
+        acquisition thread is not running or when called from it.
+        """
+        if not self.is_acquisition_running() or threading.current_thread() is self.acquisition_thread:
+            return write_fn()
+        
+        request = {'fn': write_fn, 'done': threading.Event(), 'result': False}
+        self.plc_write_queue.put(request)
+        if not request['done'].wait(PLC_WRITE_WAIT):
+            print(f"[WARNING] PLC write not executed within {PLC_WRITE_WAIT}s")
+            return False
+        return request['result']
+    
+    def execute_plc_write(self, request):
+        """Execute a queued PLC write and wake up the waiting caller"""
+        try:
+            request['result'] = request['fn']()
+        except Exception as e:
+            print(f"[ERROR] Queued PLC write failed: {e}")
+            request['result'] = False
+        finally:
+            request['done'].set()
+    
+    def drain_plc_writes(self):
+        """Execute every queued PLC write"""
+        while True:
+            try:
+                request = self.plc_write_queue.get_nowait()
+            except queue.Empty:
+                return
+            self.execute_plc_write(request)
+    
+    def publish_snapshot(self, snapshot):
+        """Publish a snapshot to the latest-value slot and the ring buffer"""
+        self.slave_snapshots[snapshot.slave_id] = snapshot
+        if snapshot.slave_id != self.slave_id:
+            return  # Monitored unit - only the per-slave slot is updated
+        self.snapshot_buffer.append(snapshot)
+        self.latest_snapshot = snapshot
+        if snapshot.valve_position is not None:
+            self.valve_position = snapshot.valve_position
+    
+    def get_latest_snapshot(self, max_age=SNAPSHOT_MAX_AGE):
+        """Get the most recent snapshot, or None if there is none or it is stale"""
+        snapshot = self.latest_snapshot
+        if snapshot is None:
+            return None
+        if max_age is not None and (get_ist_now() - snapshot.timestamp).total_seconds() > max_age:
+            return None
+        return snapshot
+    
+    def get_recent_snapshots(self, count=None):
+        """Get recent snapshots from the ring buffer, oldest first"""
+        snapshots = list(self.snapshot_buffer)
+        if count is not None:
+            snapshots = snapshots[-count:]
+        return snapshots
+    
+    def get_bus_report(self):
+        """Per-slave health and bus time from the poll scheduler"""
+        return self.poll_scheduler.bus_report(transactions_per_poll=[SNAPSHOT_INPUT_COUNT, 1])
+    
+    def acquisition_loop(self):
+        """Acquisition loop - the only thread that polls the PLC
+        
+        Each ACQUISITION_INTERVAL is split into one time slot per slave on the
+        bus. A slot reads one snapshot from its slave and serves queued writes
+        (valve, buzzer) until the slot ends, so no other thread touches the bus.
+        """
+        print(f"[ACQ] Acquisition thread started ({ACQUISITION_INTERVAL}s interval, slaves {self.poll_scheduler.slave_ids})")
+        next_tick = time.monotonic()
+        next_report = time.monotonic() + BUS_REPORT_INTERVAL
+        
+        while not self.acquisition_stop_event.is_set():
+            try:
+                self.drain_plc_writes()
+                
+                slave_id = self.poll_scheduler.next_slave()
+                if slave_id is not None:
+                    poll_started = time.monotonic()
+                    snapshot = self.read_snapshot(slave_id)
+                    self.poll_scheduler.record_poll(slave_id, snapshot is not None, time.monotonic() - poll_started)
+                    if snapshot is not None:
+                        self.publish_snapshot(snapshot)
+                        if slave_id == self.slave_id:
+                            self.verify_shadow_coils()
+                
+                if time.monotonic() >= next_report:
+                    next_report = time.monotonic() + BUS_REPORT_INTERVAL
+                    if len(self.poll_scheduler.slave_ids) > 1:
+                        self.poll_scheduler.print_report(transactions_per_poll=[SNAPSHOT_INPUT_COUNT, 1])
+                    self.print_link_stats()
+                    self.telemetry_writer.print_stats()
+                
+                # Serve writes while waiting for the next slot
+                next_tick += self.poll_scheduler.slot_seconds
+                while not self.acquisition_stop_event.is_set():
+                    remaining = next_tick - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        request = self.plc_write_queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    self.execute_plc_write(request)
+                
+                # Don't try to catch up after a long stall (e.g. reconnect)
+                if time.monotonic() - next_tick > self.poll_scheduler.slot_seconds:
+                    next_tick = time.monotonic()
+            except Exception as e:
+                print(f"[ERROR] Acquisition loop error: {e}")
+                time.sleep(ACQUISITION_INTERVAL)
+        
+        # Run any writes queued during shutdown (e.g. closing the valve)
+        self.drain_plc_writes()
+        print("[ACQ] Acquisition thread stopped")
+    
+    def start_acquisition(self):
+        """Start the acquisition thread if it is not already running"""
+        if self.is_acquisition_running():
+            return
+        self.acquisition_stop_event.clear()
+        self.acquisition_thread = threading.Thread(target=self.acquisition_loop, daemon=True)
+        self.acquisition_thread.start()
+    
+    def stop_acquisition(self):
+        """Stop the acquisition thread"""
+        if not self.is_acquisition_running():
+            return
+        self.acquisition_stop_event.set()
+        self.acquisition_thread.join(timeout=PLC_WRITE_WAIT)
+    
     def buzzer_control_loop(self):
         """Buzzer control loop - runs in separate thread"""
         print("[BUZZER] Buzzer control thread started")
@@ -563,28 +996,16 @@ class SensorControlService:
                     time.sleep(BUZZER_CHECK_INTERVAL)
                     continue
                 
-                # Read current pressure (thread-safe)
-                pressure = self.read_pressure()
+                # Latest pressure from the acquisition thread
+                snapshot = self.get_latest_snapshot()
+                pressure = snapshot.pressure if snapshot else None
                 
                 if pressure is None:
                     time.sleep(BUZZER_CHECK_INTERVAL)
                     continue
                 
                 # Calculate buzzer threshold based on whether it's a range or constant
-                buzzer_threshold = None
-                if self.current_psi_range and '-' in self.current_psi_range:
-                    # Range: buzzer activates when pressure < (lower + 1)
-                    parts = self.current_psi_range.split('-')
-                    if len(parts) == 2:
-                        try:
-                            lower_bound = float(parts[0].strip())
-                            buzzer_threshold = lower_bound + 1
-                        except:
-                            pass
-                
-                if buzzer_threshold is None:
-                    # Constant value: buzzer activates when pressure < (constant - 2)
-                    buzzer_threshold = self.target_pressure - 2
+                buzzer_threshold = get_buzzer_threshold(self.target_pressure, self.current_psi_range)
                 
                 # Check if pressure is below threshold (activate buzzer)
                 if pressure < buzzer_threshold:
@@ -632,24 +1053,7 @@ class SensorControlService:
     
     def parse_pressure_range(self, psi_range):
         """Parse pressure from range string (e.g., '5-10' -> 7.5, '10' -> 10)"""
-        if '-' in psi_range:
-            parts = psi_range.split('-')
-            if len(parts) == 2:
-                try:
-                    low = float(parts[0].strip())
-                    high = float(parts[1].strip())
-                    return (low + high) / 2  # Median
-                except:
-                    pass
-        # Single value or "Steady at X"
-        try:
-            import re
-            numbers = re.findall(r'\d+(?:\.\d+)?', psi_range)
-            if numbers:
-                return float(numbers[0])
-        except:
-            pass
-        return 0
+        return parse_pressure_range(psi_range)
     
     def check_step_completion(self):
         """Check if current step duration has been exceeded"""
@@ -717,37 +1121,23 @@ class SensorControlService:
         print(f"[STEP] Target: {target_pressure} PSI ({new_step['psi_range']})")
         print(f"[STEP] Duration: {new_step['duration_minutes']} min")
     
-    def save_sensor_reading(self, pressure, temperature):
-        """Save sensor reading to database"""
-        if not self.conn:
-            return
-            
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute(
-                "INSERT INTO sensor_readings (pressure, temperature, timestamp) VALUES (%s, %s, %s)",
-                (pressure, temperature, get_ist_now())
-            )
-            self.conn.commit()
-            cursor.close()
-        except Exception as e:
-            pass
-    
-    def save_process_log(self, pressure, temperature, valve_position):
-        """Save process log"""
-        if not self.conn or not self.session_id:
-            return
-            
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute(
-                "INSERT INTO process_logs (session_id, program_name, pressure, temperature, valve_position, status) VALUES (%s, %s, %s, %s, %s, %s)",
-                (self.session_id, 'Active Control', pressure, temperature, valve_position, 'running')
-            )
-            self.conn.commit()
-            cursor.close()
-        except Exception as e:
-            pass
+    def save_telemetry(self, snapshot, valve_position=None, session_id=None):
+        """Queue one sensor_readings row for a snapshot; each snapshot is written once
+
+        During a session the row carries the session id and valve position, so
+        the session history and reports read the same stream as the live view.
+        Pressure and temperature are stored as raw ADC counts (converted on read,
+        see sensor_calibration.py).
+        """
+        with self.telemetry_lock:
+            if snapshot.timestamp == self.last_telemetry_timestamp:
+                return False
+            self.last_telemetry_timestamp = snapshot.timestamp
+        return self.telemetry_writer.submit(
+            'sensor_readings',
+            (session_id, raw_counts(snapshot.raw_pressure), raw_counts(snapshot.raw_temperature),
+             valve_position, snapshot.timestamp)
+        )
     
     def start_control_session(self, target_pressure, duration_minutes, program_name="Manual Control", steps_data=None, existing_session_id=None):
         """Start a new control session - ALWAYS stops old control when starting new"""
@@ -872,6 +1262,10 @@ class SensorControlService:
             end_datetime = datetime.fromtimestamp(self.end_time, IST)
             print(f"[SESSION] Session will complete at: {end_datetime.strftime('%Y-%m-%d %H:%M:%S')}")
             
+            # Control and buzzer loops consume snapshots from the acquisition thread
+            self.start_acquisition()
+            self.telemetry_writer.start()
+            
             # Start control thread only if not already running
             if not hasattr(self, 'control_thread') or self.control_thread is None or not self.control_thread.is_alive():
                 self.control_thread = threading.Thread(target=self.control_loop, daemon=True)
@@ -916,17 +1310,12 @@ class SensorControlService:
         if success:
             print(f"[SAFETY] Valve closed to 0/4000")
         
-        if self.conn and self.session_id:
-            try:
-                cursor = self.conn.cursor()
-                cursor.execute(
-                    "UPDATE process_sessions SET status='stopped', end_time=%s WHERE id=%s",
-                    (get_ist_now(), self.session_id)
-                )
-                self.conn.commit()
-                cursor.close()
-            except Exception as e:
-                print(f"[ERROR] Stopping session: {e}")
+        if self.session_id:
+            # Priority write - flushed ahead of queued telemetry, retried if the DB is down
+            self.telemetry_writer.submit_state_change(
+                "UPDATE process_sessions SET status='stopped', end_time=%s WHERE id=%s",
+                (get_ist_now(), self.session_id)
+            )
         
         self.target_pressure = None
         self.session_id = None
@@ -960,16 +1349,10 @@ class SensorControlService:
             # Check if session was stopped externally - this must run before anything else
             if self.conn and self.session_id:
                 try:
-                    cursor = self.conn.cursor()
-                    cursor.execute(
-                        "SELECT status FROM process_sessions WHERE id=%s",
-                        (self.session_id,)
-                    )
-                    row = cursor.fetchone()
-                    cursor.close()
+                    status = self.get_session_status(self.session_id)
                     
-                    if row and row[0] in ('stopped', 'completed'):
-                        print(f"[CONTROL] Session status changed to: {row[0]}")
+                    if status in ('stopped', 'completed'):
+                        print(f"[CONTROL] Session status changed to: {status}")
                         print("[CONTROL] Session finished, stopping control and closing valve")
                         self.control_active = False
                         # Reset valve to closed position
@@ -977,7 +1360,7 @@ class SensorControlService:
                         if success:
                             print(f"[SAFETY] Valve closed to 0/4000")
                         break
-                    elif not row or row[0] not in ('running', 'paused'):
+                    elif status not in ('running', 'paused'):
                         # Session not found or in unexpected state
                         no_active_session_count += 1
                         if no_active_session_count > 300:  # 5 minutes (300 seconds)
@@ -985,7 +1368,7 @@ class SensorControlService:
                             self.control_active = False
                             self.set_valve_position(0)
                             break
-                    elif row and row[0] == 'paused':
+                    elif status == 'paused':
                         no_active_session_count = 0  # Reset counter
                         # Mark step as paused (if multi-step program)
                         if self.program_steps and self.current_step_index < len(self.program_steps):
@@ -997,13 +1380,9 @@ class SensorControlService:
                         
                         # Wait while paused
                         while self.control_active:
-                            cursor = self.conn.cursor()
-                            cursor.execute(
-                                "SELECT status FROM process_sessions WHERE id=%s",
-                                (self.session_id,)
-                            )
-                            status = cursor.fetchone()[0]
-                            cursor.close()
+                            status = self.get_session_status(self.session_id)
+                            if status is None:
+                                break  # Session gone - counted by the check above
                             if status == 'running':
                                 print("[CONTROL] Resumed")
                                 # Mark as resumed (if multi-step program)
@@ -1058,28 +1437,24 @@ class SensorControlService:
             
             # ===== NOW DO SENSOR READING AND CONTROL (Inside try-except for RS485 errors) =====
             try:
-                # ===== SENSOR READING (RS485 dependent) =====
-                pressure = self.read_pressure()
-                temperature = self.read_temperature()
-                valve_position = self.read_valve_position()
+                # ===== SENSOR READING (from acquisition thread) =====
+                snapshot = self.get_latest_snapshot()
                 
                 # If no PLC connection, just wait and continue (completion checks above will still work)
-                if pressure is None:
+                if snapshot is None:
                     time.sleep(1)
                     continue
                 
+                pressure = snapshot.pressure
+                temperature = snapshot.temperature
+                valve_position = snapshot.valve_position
+                
                 # ===== CONTROL LOGIC (Only runs if we have sensor readings) =====
                 
                 # Only control if session status is 'running'
                 if self.conn and self.session_id:
                     try:
-                        cursor = self.conn.cursor()
-                        cursor.execute(
-                            "SELECT status FROM process_sessions WHERE id=%s",
-                            (self.session_id,)
-                        )
-                        status = cursor.fetchone()[0]
-                        cursor.close()
+                        status = self.get_session_status(self.session_id)
                         
                         if status == 'running':
                             no_active_session_count = 0  # Reset safety counter
@@ -1107,7 +1482,7 @@ class SensorControlService:
                         elif status == 'paused':
                             no_active_session_count = 0  # Reset counter (paused is valid)
                             print("[CONTROL] Paused - no valve adjustments")
-                        else:
+                        elif status is not None:  # A missing session is counted by the status check above
                             # Unexpected status - increment safety counter
                             no_active_session_count += 1
                             if no_active_session_count > 300:
@@ -1118,9 +1493,9 @@ class SensorControlService:
                     except Exception as e:
                         pass  # Continue if check fails
                 
-                # Log to database (only if we have readings)
-                if pressure is not None:
-                    self.save_process_log(pressure, temperature, valve_position)
+                # Log every sample of the session (save_telemetry skips snapshots already written)
+                if pressure is not None and self.session_id:
+                    self.save_telemetry(snapshot, valve_position, self.session_id)
                 
                 time.sleep(1)
             except Exception as e:
@@ -1224,50 +1599,53 @@ class SensorControlService:
         print(f"\n{'='*60}")
         print("Sensor & Control Service")
         print(f"{'='*60}")
-        print(f"COM Port: {self.com_port}")
+        print(f"PLC link: {self.transport.describe()}")
+        print(f"Slave IDs: {SLAVE_IDS} (controlling {self.slave_id})")
         print(f"Reading sensors every {SENSOR_READ_INTERVAL} second")
         print(f"Control interval: {CONTROL_INTERVAL} seconds")
         print(f"{'='*60}\n")
         
-        # Connect to PLC with retry logic
-        print(f"[INFO] Attempting to connect to PLC on {self.com_port}...")
-        if not self.connect_plc(retry=True):
-            print(f"[ERROR] Failed to connect to PLC on {self.com_port}")
+        # Link supervisor connects (and later reconnects) in the background
+        print(f"[INFO] Attempting to connect to PLC on {self.transport.describe()}...")
+        if self.device_watcher and self.device_watcher.start():
+            print(f"[HOTPLUG] Watching {COM_PORT} for unplug/replug")
+        self.link_supervisor.start()
+        if not self.link_supervisor.wait_connected(LINK_STARTUP_WAIT):
+            print(f"[ERROR] Failed to connect to PLC on {self.transport.describe()}")
             print("Check cable connection and ensure PLC is powered")
             print("The service will continue trying to reconnect...")
         else:
-            print(f"[OK] Connected to PLC on {self.com_port}\n")
+            print()
         print("[INFO] Service ready. Waiting for frontend to start control...")
         print("       Or you can start control manually with API endpoints\n")
         print("[SAFETY] Control will auto-stop if no active sessions for 5 minutes\n")
         
+        # Acquisition thread owns the bus from here on (and handles reconnects)
+        self.start_acquisition()
+        self.telemetry_writer.start()
+        threading.Thread(target=self.maintenance_loop, daemon=True).start()
+        
         # Initialize valve to 0
         self.set_valve_position(0)
         
         reading_count = 0
-        connection_check_counter = 0
+        last_saved_timestamp = None
         
         try:
             while True:
-                # Periodically check connection status (every 10 readings)
-                connection_check_counter += 1
-                if connection_check_counter >= 10:
-                    connection_check_counter = 0
-                    if not self.is_connected:
-                        print("[INFO] Device not connected, attempting to reconnect...")
-                        self.connect_plc(retry=True)
+                # Latest sensors from the acquisition thread
+                snapshot = self.get_latest_snapshot()
                 
-                # Read sensors
-                pressure = self.read_pressure()
-                temperature = self.read_temperature()
-                valve_position = self.read_valve_position()
-                
-                if pressure is not None and temperature is not None:
+                if snapshot is not None and snapshot.timestamp != last_saved_timestamp:
+                    last_saved_timestamp = snapshot.timestamp
+                    pressure = snapshot.pressure
+                    temperature = snapshot.temperature
                     reading_count += 1
-                    timestamp = get_ist_now().strftime("%H:%M:%S")
+                    timestamp = snapshot.timestamp.strftime("%H:%M:%S")
                     
-                    # Save to database
-                    self.save_sensor_reading(pressure, temperature)
+                    # Save to database (control_loop saves every sample while a session runs)
+                    if not self.control_active:
+                        self.save_telemetry(snapshot)
                     
                     # Check for new sessions that need control (only when not already controlling)
                     if not self.control_active and self.conn:
@@ -1306,7 +1684,7 @@ class SensorControlService:
                         print(f"[{timestamp}] Reading #{reading_count} - Pressure: {pressure} PSI, Temperature: {temperature}°C")
                 else:
                     # Connection issue - readings failed
-                    if not self.is_connected:
+                    if not self.link_supervisor.is_usable():
                         timestamp = get_ist_now().strftime("%H:%M:%S")
                         print(f"[{timestamp}] [WARNING] Cannot read sensors - device not connected. Retrying...")
                 
@@ -1317,13 +1695,15 @@ class SensorControlService:
         finally:
             if self.control_active:
                 self.stop_control_session()
+            self.stop_acquisition()
+            self.maintenance_stop_event.set()
+            self.telemetry_writer.stop()
+            self.link_supervisor.stop()
+            if self.device_watcher:
+                self.device_watcher.stop()
             if self.plc_client:
-                try:
-                    self.plc_client.close()
-                except:
-                    pass
-            if self.conn:
-                self.conn.close()
+                self.transport.release_client(self.plc_client)
+            self.db_connections.closeall()
             print("\n[OK] Service stopped")
 
 
@@ -1339,6 +1719,11 @@ def main():
     print("  [OK] Logs all actions")
     print("="*60)
     
+    if SERVICE_RUNTIME == 'asyncio' or '--asyncio' in sys.argv:
+        from sensor_control_async import run_async_service
+        run_async_service()
+        return
+    
     service = SensorControlService()
     service.run()
 
@@ -10,6 +10,7 @@ from dotenv import load_dotenv
 import json
 import subprocess
 import time
+from sensor_calibration import READING_VALUE_COLUMNS, load_calibrations, calibrate_rows
 
 load_dotenv()
 
@@ -88,10 +89,11 @@ def get_latest_reading():
         cursor = conn.cursor()
         
         cursor.execute(
-            "SELECT timestamp, pressure, temperature FROM sensor_readings ORDER BY timestamp DESC LIMIT 1"
+            f"SELECT timestamp, {READING_VALUE_COLUMNS} FROM sensor_readings ORDER BY timestamp DESC LIMIT 1"
         )
         
-        row = cursor.fetchone()
+        rows = calibrate_rows(cursor.fetchall(), load_calibrations(cursor))
+        row = rows[0] if rows else None
         cursor.close()
         conn.close()
         
@@ -176,11 +178,11 @@ def get_session_logs(session_id):
         cursor = conn.cursor()
         
         cursor.execute(
-            "SELECT timestamp, pressure, temperature, valve_position, status FROM process_logs WHERE session_id=%s ORDER BY timestamp ASC LIMIT 100",
+            f"SELECT timestamp, {READING_VALUE_COLUMNS}, valve_position FROM sensor_readings WHERE session_id=%s ORDER BY timestamp ASC LIMIT 100",
             (session_id,)
         )
         
-        rows = cursor.fetchall()
+        rows = calibrate_rows(cursor.fetchall(), load_calibrations(cursor))
         cursor.close()
         conn.close()
         
@@ -190,7 +192,7 @@ def get_session_logs(session_id):
                 'pressure': float(row[1]),
                 'temperature': float(row[2]),
                 'valve_position': row[3],
-                'status': row[4]
+                'status': 'running'
             }
             for row in rows
         ]
@@ -0,0 +1,161 @@
+"""
+Session Archive
+Telemetry of finished sessions never changes, so once a session has been
+over for a while its samples are moved out of sensor_readings into a
+per-session columnar file:
+
+    session_<id>.npy   structured array, one record per sample:
+                       dt_ms (int32, ms since the previous sample),
+                       pressure / temperature (float32), valve (int16, -1 = none)
+    session_<id>.json  first timestamp and sample count (written last - an
+                       archive without it is incomplete and ignored)
+
+Readers memory-map the .npy file, so an archived session costs a file open
+instead of an index scan and NUMERIC decoding. Minute/hour rollups stay in
+the database.
+"""
+
+import os
+import json
+from datetime import datetime
+import numpy as np
+from sensor_calibration import READING_VALUE_COLUMNS, load_calibrations, calibrate_rows, wall_clock
+
+ARCHIVE_DTYPE = np.dtype([('dt_ms', '<i4'), ('pressure', '<f4'), ('temperature', '<f4'), ('valve', '<i2')])
+ARCHIVE_VERSION = 1
+NO_VALVE = -1
+ARCHIVE_BATCH = 20  # Sessions archived per maintenance run
+
+
+def archive_paths(archive_dir, session_id):
+    base = os.path.join(archive_dir, f"session_{int(session_id)}")
+    return base + '.npy', base + '.json'
+
+
+def is_archived(archive_dir, session_id):
+    return os.path.exists(archive_paths(archive_dir, session_id)[1])
+
+
+def load_session_archive(archive_dir, session_id):
+    """Archived samples as numpy arrays, or None if the session is not archived
+
+    Returns {'timestamp': datetime64[ms], 'pressure', 'temperature', 'valve'}
+    where valve is NO_VALVE for samples without a valve position.
+    """
+    data_path, meta_path = archive_paths(archive_dir, session_id)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        records = np.load(data_path, mmap_mode='r')
+    except FileNotFoundError:
+        return None
+    start = np.datetime64(meta['first_timestamp'], 'ms')
+    return {
+        'timestamp': start + np.cumsum(records['dt_ms'], dtype=np.int64).astype('timedelta64[ms]'),
+        'pressure': records['pressure'],
+        'temperature': records['temperature'],
+        'valve': records['valve'],
+    }
+
+
+def archive_rows(archive_dir, session_id, rows):
+    """Append (timestamp, pressure, temperature, valve_position) rows to a session's archive
+
+    Rows already archived are merged in, so archiving the same session twice
+    keeps everything; a sample archived again (a run that died before its
+    DELETE committed) is kept once, as the newer copy. Files are fsynced and renamed into place; the .json
+    is written last.
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    timestamps = np.array([wall_clock(row[0]) for row in rows], dtype='datetime64[ms]')
+    pressure = np.array([row[1] for row in rows], dtype=np.float32)
+    temperature = np.array([row[2] for row in rows], dtype=np.float32)
+    valve = np.array([NO_VALVE if row[3] is None else row[3] for row in rows], dtype=np.int16)
+
+    existing = load_session_archive(archive_dir, session_id)
+    if existing is not None:
+        timestamps = np.concatenate([existing['timestamp'], timestamps])
+        pressure = np.concatenate([existing['pressure'], pressure])
+        temperature = np.concatenate([existing['temperature'], temperature])
+        valve = np.concatenate([existing['valve'], valve])
+        order = np.argsort(timestamps, kind='stable')
+        # Last of each run of equal timestamps - the stable sort keeps the new rows after the archived ones
+        last = np.append(timestamps[order][1:] != timestamps[order][:-1], True)
+        order = order[last]
+        timestamps, pressure, temperature, valve = timestamps[order], pressure[order], temperature[order], valve[order]
+        del existing  # Release the memory map before the file is replaced
+
+    records = np.empty(len(timestamps), dtype=ARCHIVE_DTYPE)
+    ms = timestamps.astype(np.int64)
+    records['dt_ms'] = np.diff(ms, prepend=ms[0]) if len(ms) else []
+    records['pressure'] = pressure
+    records['temperature'] = temperature
+    records['valve'] = valve
+
+    data_path, meta_path = archive_paths(archive_dir, session_id)
+    write_atomic(data_path, lambda f: np.save(f, records))
+    meta = {
+        'version': ARCHIVE_VERSION,
+        'session_id': int(session_id),
+        'first_timestamp': str(timestamps[0]) if len(timestamps) else None,
+        'samples': int(len(records)),
+        'archived_at': datetime.now().isoformat(timespec='seconds'),
+    }
+    write_atomic(meta_path, lambda f: f.write(json.dumps(meta).encode()))
+    return len(records)
+
+
+def write_atomic(path, write_fn):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        write_fn(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def archive_sessions(conn, archive_dir, ended_before, limit=ARCHIVE_BATCH):
+    """Move samples of sessions that ended before `ended_before` out of sensor_readings
+
+    Samples are archived as calibrated values, so a later recalibration
+    does not change sessions that are already archived.
+    Returns [(session_id, samples)] for the sessions archived in this run.
+    """
+    cursor = conn.cursor()
+    archived = []
+    try:
+        calibrations = load_calibrations(cursor)
+        cursor.execute("""
+            SELECT s.id, s.start_time FROM process_sessions s
+            WHERE s.end_time IS NOT NULL AND s.end_time < %s
+              AND s.status IN ('completed', 'stopped')
+              AND EXISTS (
+                  SELECT 1 FROM sensor_readings r
+                  WHERE r.session_id = s.id AND r.timestamp >= s.start_time
+              )
+            ORDER BY s.end_time
+            LIMIT %s
+        """, (ended_before, limit))
+        for session_id, start_time in cursor.fetchall():
+            cursor.execute(f"""
+                SELECT timestamp, {READING_VALUE_COLUMNS}, valve_position FROM sensor_readings
+                WHERE session_id = %s AND timestamp >= %s
+                ORDER BY timestamp
+            """, (session_id, start_time))
+            rows = calibrate_rows(cursor.fetchall(), calibrations)
+            if not rows:
+                continue
+            samples = archive_rows(archive_dir, session_id, rows)
+            # The archive is on disk - evict exactly the archived rows from the hot table
+            cursor.execute(
+                "DELETE FROM sensor_readings WHERE session_id = %s AND timestamp >= %s AND timestamp <= %s",
+                (session_id, start_time, rows[-1][0])
+            )
+            conn.commit()
+            archived.append((session_id, samples))
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return archived
@@ -0,0 +1,133 @@
+"""
+Session Cache
+In-process cache of process_sessions rows for the session status endpoints,
+so frequent status polls are answered from a dictionary:
+
+- the active (running/paused) session and any session still in progress
+  are kept for at most `ttl` seconds - the sensor service completes
+  sessions in another process, this bounds how long that goes unnoticed
+- finished sessions (completed/stopped) no longer change and are kept
+  until evicted (oldest first above max_finished)
+- invalidate() drops everything that can still change; the API calls it
+  after each state transition it makes
+
+A load that raced with an invalidate() is returned but not cached.
+
+process_sessions_version holds a counter that a trigger bumps on every
+change to process_sessions, from any process; the API derives the ETags of
+the session list from it.
+"""
+
+import time
+import threading
+
+FINAL_STATUSES = ('completed', 'stopped')
+
+
+class SessionCache:
+    def __init__(self, ttl=2.0, max_finished=256):
+        self.ttl = ttl
+        self.max_finished = max_finished
+        self.lock = threading.Lock()
+        self.active = None  # (loaded_at, session dict or None)
+        self.sessions = {}  # id -> (loaded_at, session dict), insertion ordered
+        self.generation = 0  # Bumped by invalidate()
+        self.hits = 0
+        self.misses = 0
+
+    def fresh(self, entry):
+        loaded_at, session = entry
+        return (session is not None and session['status'] in FINAL_STATUSES) or time.monotonic() - loaded_at < self.ttl
+
+    def get_active(self, load_fn):
+        """The running or paused session (None if there is none); load_fn() reads it on a miss"""
+        with self.lock:
+            entry = self.active
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self.generation
+        session = load_fn()
+        with self.lock:
+            if generation == self.generation:
+                self.active = (time.monotonic(), session)
+        return session
+
+    def get(self, session_id, load_fn):
+        """One session by id (None if it does not exist); load_fn(session_id) reads it on a miss"""
+        with self.lock:
+            entry = self.sessions.get(session_id)
+            if entry is not None and self.fresh(entry):
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self.generation
+        session = load_fn(session_id)
+        if session is not None:
+            with self.lock:
+                if generation == self.generation:
+                    self.sessions.pop(session_id, None)
+                    self.sessions[session_id] = (time.monotonic(), session)
+                    while len(self.sessions) > self.max_finished:
+                        self.sessions.pop(next(iter(self.sessions)))
+        return session
+
+    def invalidate(self):
+        """A session changed state - forget everything that is not final"""
+        with self.lock:
+            self.generation += 1
+            self.active = None
+            for session_id in [i for i, (_, s) in self.sessions.items() if s['status'] not in FINAL_STATUSES]:
+                del self.sessions[session_id]
+
+    def stats(self):
+        with self.lock:
+            return {
+                'cached_sessions': len(self.sessions),
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+# process_sessions change counter, bumped by a statement trigger in the same
+# transaction as the change (so it is never newer than the data it covers)
+SESSION_VERSION_TABLE = 'process_sessions_version'
+
+
+def session_version_statements():
+    """DDL for the change counter and its trigger on process_sessions (idempotent)"""
+    return [
+        f"""
+            CREATE TABLE IF NOT EXISTS {SESSION_VERSION_TABLE} (
+                id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+                version BIGINT NOT NULL DEFAULT 0
+            )
+        """,
+        f"INSERT INTO {SESSION_VERSION_TABLE} (id, version) VALUES (TRUE, 0) ON CONFLICT (id) DO NOTHING",
+        f"""
+            CREATE OR REPLACE FUNCTION bump_process_sessions_version() RETURNS trigger AS $$
+            BEGIN
+                UPDATE {SESSION_VERSION_TABLE} SET version = version + 1;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS process_sessions_version_bump ON process_sessions",
+        """
+            CREATE TRIGGER process_sessions_version_bump
+            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON process_sessions
+            FOR EACH STATEMENT EXECUTE FUNCTION bump_process_sessions_version()
+        """,
+    ]
+
+
+def create_session_version_table(cursor):
+    for sql in session_version_statements():
+        cursor.execute(sql)
+
+
+def read_session_version(cursor):
+    """Current process_sessions change counter"""
+    cursor.execute(f"SELECT version FROM {SESSION_VERSION_TABLE}")
+    return cursor.fetchone()[0]
@@ -0,0 +1,98 @@
+"""
+Session Linkage
+Samples are tagged with their session_id at ingest, and session queries use
+the (session_id, timestamp) index. Sessions recorded before that only have
+a start and end time; backfill_session_ids() tags the samples in their time
+range once, so history can be read the same way.
+
+This is a one-shot migration. Its first run records a cutoff in
+session_linkage_state: the start of the first session tagged at ingest, or
+(if there is none yet) just after the newest session. Only finished sessions
+starting before the cutoff are linked. Later sessions also have a few untagged
+samples at their start, and archived ones have no tagged samples left; both
+must stay as they are. Each session is linked in its own transaction,
+together with a rebuild of the rollup buckets of just that session and the
+idle time it covers.
+Once a run completes it is recorded, and later runs do nothing.
+"""
+
+from telemetry_rollups import rebuild_session_rollups
+from session_archive import is_archived
+
+# End of a session that has no end_time (e.g. the service died): its planned duration
+SESSION_END_SQL = "COALESCE(s.end_time, s.start_time + s.duration_minutes * INTERVAL '1 minute')"
+
+LINKAGE_STATE_TABLE = 'session_linkage_state'
+
+
+def linkage_state_statements():
+    """DDL for the migration state and its cutoff, recorded on the first run (idempotent)"""
+    return [
+        f"""
+            CREATE TABLE IF NOT EXISTS {LINKAGE_STATE_TABLE} (
+                id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+                tagged_from TIMESTAMP NOT NULL,
+                completed_at TIMESTAMP
+            )
+        """,
+        f"""
+            INSERT INTO {LINKAGE_STATE_TABLE} (id, tagged_from)
+            SELECT TRUE, COALESCE(
+                (SELECT min(s.start_time) FROM process_sessions s
+                 WHERE EXISTS (SELECT 1 FROM sensor_readings r WHERE r.session_id = s.id AND r.timestamp >= s.start_time)),
+                (SELECT max(start_time) + INTERVAL '1 second' FROM process_sessions),
+                '-infinity'::timestamp
+            )
+            ON CONFLICT (id) DO NOTHING
+        """,
+    ]
+
+
+def backfill_session_ids(conn, archive_dir=None):
+    """Tag untagged sensor_readings inside finished pre-tagging sessions; returns (sessions, rows) tagged"""
+    cursor = conn.cursor()
+    sessions = rows = 0
+    try:
+        for sql in linkage_state_statements():
+            cursor.execute(sql)
+        conn.commit()
+        cursor.execute(f"SELECT tagged_from, completed_at FROM {LINKAGE_STATE_TABLE}")
+        tagged_from, completed_at = cursor.fetchone()
+        if completed_at is not None:
+            return 0, 0
+
+        cursor.execute(f"""
+            SELECT s.id, s.start_time, {SESSION_END_SQL}
+            FROM process_sessions s
+            WHERE s.status IN ('completed', 'stopped')
+              AND s.start_time IS NOT NULL AND s.start_time < %s AND {SESSION_END_SQL} IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM sensor_readings r WHERE r.session_id = s.id)
+            ORDER BY s.start_time
+        """, (tagged_from,))
+        for session_id, start_time, end_time in cursor.fetchall():
+            if archive_dir and is_archived(archive_dir, session_id):
+                continue
+            cursor.execute("""
+                WITH tagged AS (
+                    UPDATE sensor_readings SET session_id = %s
+                    WHERE session_id IS NULL AND timestamp >= %s AND timestamp <= %s
+                    RETURNING timestamp
+                )
+                SELECT count(*), min(timestamp), max(timestamp) FROM tagged
+            """, (session_id, start_time, end_time))
+            tagged, first, last = cursor.fetchone()
+            if tagged:
+                # Committed together with the rebuilt buckets
+                rebuild_session_rollups(conn, session_id, first, last)
+                sessions += 1
+                rows += tagged
+            conn.commit()
+
+        cursor.execute(f"UPDATE {LINKAGE_STATE_TABLE} SET completed_at = LOCALTIMESTAMP")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return sessions, rows
@@ -0,0 +1,196 @@
+"""
+Telemetry Partitions
+sensor_readings is range-partitioned by month on timestamp, so session and
+report queries only touch the months they cover and old months can be
+detached or dropped as a whole instead of deleted row by row.
+
+Partition layout:
+    sensor_readings_legacy   rows from before partitioning (MINVALUE .. first month)
+    sensor_readings_YYYY_MM  one per month, created PARTITIONS_AHEAD months early
+
+The current and future months get a btree on timestamp (latest-reading
+queries walk partitions newest first). Once a month is over its partition is
+append-only and sealed: the btree is replaced by a much smaller BRIN index.
+
+run_partition_maintenance() is idempotent; docker-init-db.py runs it once
+and the sensor service runs it periodically.
+"""
+
+import re
+from datetime import date
+
+PARENT_TABLE = 'sensor_readings'
+LEGACY_PARTITION = 'sensor_readings_legacy'
+PARTITIONS_AHEAD = 3  # Months created in advance
+
+# Upper bound of a partition, e.g. "FOR VALUES FROM (...) TO ('2026-11-01 00:00:00')"
+PARTITION_UPPER_BOUND = re.compile(r"TO \('(\d{4})-(\d{2})-(\d{2})")
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def add_months(day, months):
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"{PARENT_TABLE}_{month.year:04d}_{month.month:02d}"
+
+
+def is_partitioned(cursor, table=PARENT_TABLE):
+    cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (table,))
+    row = cursor.fetchone()
+    return row is not None and row[0] == 'p'
+
+
+def list_partitions(cursor):
+    """[(name, upper_bound_date or None)] for the attached partitions"""
+    cursor.execute("""
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s)
+        ORDER BY c.relname
+    """, (PARENT_TABLE,))
+    partitions = []
+    for name, bound in cursor.fetchall():
+        match = PARTITION_UPPER_BOUND.search(bound or '')
+        upper = date(int(match.group(1)), int(match.group(2)), int(match.group(3))) if match else None
+        partitions.append((name, upper))
+    return partitions
+
+
+def convert_to_partitioned(cursor, today):
+    """Turn a plain sensor_readings table into a partitioned one; returns True if converted
+
+    The existing table (and all its rows) becomes the legacy partition,
+    covering everything up to the end of the month of its newest row.
+    """
+    if is_partitioned(cursor):
+        return False
+    cursor.execute(f"LOCK TABLE {PARENT_TABLE} IN ACCESS EXCLUSIVE MODE")
+    cursor.execute(f"SELECT max(timestamp) FROM {PARENT_TABLE}")
+    newest = cursor.fetchone()[0]
+    last_day = max(newest.date(), today) if newest else today
+    boundary = add_months(month_start(last_day), 1)
+
+    cursor.execute(f"ALTER TABLE {PARENT_TABLE} RENAME TO {LEGACY_PARTITION}")
+    # Free the index names for the partitioned table
+    cursor.execute("SELECT indexrelid::regclass::text FROM pg_index WHERE indrelid = to_regclass(%s)", (LEGACY_PARTITION,))
+    for (index_name,) in cursor.fetchall():
+        cursor.execute(f'ALTER INDEX "{index_name}" RENAME TO "{index_name[:55]}_legacy"')
+
+    cursor.execute(f"""
+        CREATE TABLE {PARENT_TABLE} (LIKE {LEGACY_PARTITION} INCLUDING DEFAULTS)
+        PARTITION BY RANGE (timestamp)
+    """)
+    # Keep the id sequence alive when the legacy partition is dropped later
+    cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", (LEGACY_PARTITION,))
+    sequence = cursor.fetchone()[0]
+    if sequence:
+        cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY {PARENT_TABLE}.id")
+
+    cursor.execute(
+        f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {LEGACY_PARTITION} "
+        f"FOR VALUES FROM (MINVALUE) TO (%s)",
+        (boundary.isoformat(),)
+    )
+    # Unique keys on a partitioned table must include the partition key
+    cursor.execute(f"CREATE UNIQUE INDEX idx_{PARENT_TABLE}_ingest_key ON {PARENT_TABLE}(ingest_key, timestamp)")
+    cursor.execute(f"CREATE INDEX idx_{PARENT_TABLE}_session ON {PARENT_TABLE}(session_id, timestamp)")
+    print(f"[PARTITION] {PARENT_TABLE} is now partitioned by month "
+          f"(existing rows kept in {LEGACY_PARTITION} up to {boundary})")
+    return True
+
+
+def create_partitions(cursor, today, ahead=PARTITIONS_AHEAD):
+    """Create monthly partitions from the last existing one up to `ahead` months past today"""
+    uppers = [upper for _, upper in list_partitions(cursor) if upper is not None]
+    month = max(uppers) if uppers else month_start(today)
+    last = add_months(month_start(today), ahead + 1)
+    created = []
+    while month < last:
+        name = partition_name(month)
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARENT_TABLE} FOR VALUES FROM (%s) TO (%s)",
+            (month.isoformat(), add_months(month, 1).isoformat())
+        )
+        # Hot partition: btree for newest-first reads (replaced by BRIN when sealed)
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name}_timestamp_idx ON {name}(timestamp DESC)")
+        created.append(name)
+        month = add_months(month, 1)
+    return created
+
+
+def seal_partitions(cursor, today):
+    """Swap the timestamp btree for a BRIN index on partitions whose month is over"""
+    sealed = []
+    current = month_start(today)
+    for name, upper in list_partitions(cursor):
+        if upper is None or upper > current:
+            continue
+        cursor.execute("""
+            SELECT i.relname, am.amname
+            FROM pg_index x
+            JOIN pg_class i ON i.oid = x.indexrelid
+            JOIN pg_am am ON am.oid = i.relam
+            JOIN pg_attribute a ON a.attrelid = x.indrelid AND a.attnum = x.indkey[0]
+            WHERE x.indrelid = to_regclass(%s) AND x.indnatts = 1 AND a.attname = 'timestamp'
+              AND NOT EXISTS (SELECT 1 FROM pg_inherits h WHERE h.inhrelid = x.indexrelid)
+        """, (name,))
+        indexes = cursor.fetchall()
+        btrees = [index for index, method in indexes if method == 'btree']
+        if any(method == 'brin' for _, method in indexes) and not btrees:
+            continue
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name}_timestamp_brin ON {name} USING brin(timestamp)")
+        for index in btrees:
+            cursor.execute(f'DROP INDEX IF EXISTS "{index}"')
+        sealed.append(name)
+    return sealed
+
+
+def expire_partitions(cursor, today, retention_months, action='detach'):
+    """Detach or drop partitions entirely older than retention_months (0 keeps everything)"""
+    if retention_months <= 0:
+        return []
+    cutoff = add_months(month_start(today), -retention_months)
+    expired = []
+    for name, upper in list_partitions(cursor):
+        if upper is None or upper > cutoff:
+            continue
+        if action == 'drop':
+            cursor.execute(f"DROP TABLE {name}")
+        else:
+            # Detached partitions stay as plain tables for archiving
+            cursor.execute(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}")
+        expired.append(name)
+    return expired
+
+
+def run_partition_maintenance(conn, today, ahead=PARTITIONS_AHEAD, retention_months=0, retention_action='detach'):
+    """Convert (first run), pre-create, seal and expire partitions; commits each step"""
+    cursor = conn.cursor()
+    try:
+        if convert_to_partitioned(cursor, today):
+            conn.commit()
+        created = create_partitions(cursor, today, ahead)
+        conn.commit()
+        sealed = seal_partitions(cursor, today)
+        conn.commit()
+        expired = expire_partitions(cursor, today, retention_months, retention_action)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    for name in created:
+        print(f"[PARTITION] Created {name}")
+    for name in sealed:
+        print(f"[PARTITION] Sealed {name} (BRIN index on timestamp)")
+    for name in expired:
+        print(f"[PARTITION] {'Dropped' if retention_action == 'drop' else 'Detached'} {name} (older than {retention_months} months)")
+    return {'created': created, 'sealed': sealed, 'expired': expired}
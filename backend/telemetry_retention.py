@@ -0,0 +1,200 @@
+"""
+Telemetry Retention
+Row-level pruning of telemetry that is not removed by dropping a whole
+month (telemetry_partitions.py) or by archiving a session (session_archive.py):
+
+    idle_readings     sensor_readings samples taken while no session was running
+    idle_rollups_1m   minute rollups of idle time (session 0); session and hour rollups are kept
+    process_logs      legacy per-session log table
+
+Every policy is off unless a retention is set. Idle rows inside a session's
+time range are never pruned, whether or not they carry its session_id.
+
+Rows are deleted oldest first in batches of about batch_rows, each in its own
+short transaction, with a pause in between. The cutoff and the newest
+timestamp deleted are stored in retention_progress after every batch, so an
+interrupted run resumes with the same cutoff and never re-scans the range it
+already deleted. Pruning only runs while no session is active and stops as
+soon as one starts; a table that lost many rows is vacuumed afterwards.
+"""
+
+import time
+from datetime import timedelta
+
+
+def outside_sessions_sql(ts_sql, bucket_unit=None):
+    """Filter for rows outside every session's time range
+
+    Untagged samples inside a session (its first seconds, or every sample of
+    a session recorded before ingest tagging) still belong to it. A session
+    without an end is treated as open-ended.
+    """
+    start_sql = f"date_trunc('{bucket_unit}', s.start_time)" if bucket_unit else "s.start_time"
+    return (
+        f"NOT EXISTS (SELECT 1 FROM process_sessions s WHERE {ts_sql} >= {start_sql} AND {ts_sql} <= "
+        f"COALESCE(s.end_time, s.start_time + s.duration_minutes * INTERVAL '1 minute', 'infinity'::timestamp))"
+    )
+
+
+# (name, table, timestamp column, row filter)
+RETENTION_POLICIES = (
+    ('idle_readings', 'sensor_readings', 'timestamp',
+     f"session_id IS NULL AND {outside_sessions_sql('sensor_readings.timestamp')}"),
+    ('idle_rollups_1m', 'sensor_rollup_1m', 'bucket',
+     f"session_id = 0 AND {outside_sessions_sql('sensor_rollup_1m.bucket', 'minute')}"),
+    ('process_logs', 'process_logs', 'timestamp', 'TRUE'),
+)
+RETENTION_BATCH_ROWS = 5000  # Rows deleted per transaction (about)
+RETENTION_BATCH_PAUSE = 0.5  # Seconds between batches
+RETENTION_TIME_BUDGET = 300  # Seconds of pruning per run at most
+VACUUM_MIN_DELETED = 10000  # VACUUM (ANALYZE) a table after this many deletions, ANALYZE below
+
+
+def create_progress_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS retention_progress (
+            policy TEXT PRIMARY KEY,
+            cutoff TIMESTAMP NOT NULL,
+            deleted_through TIMESTAMP,
+            deleted BIGINT NOT NULL DEFAULT 0,
+            started_at TIMESTAMP NOT NULL DEFAULT NOW(),
+            updated_at TIMESTAMP NOT NULL DEFAULT NOW(),
+            finished_at TIMESTAMP
+        )
+    """)
+
+
+def active_session_exists(cursor):
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM process_sessions WHERE status IN ('running', 'paused'))")
+    return cursor.fetchone()[0]
+
+
+def start_run(cursor, name, cutoff):
+    """(cutoff, deleted_through) to prune with - an unfinished run is resumed as it was"""
+    cursor.execute(
+        "SELECT cutoff, deleted_through FROM retention_progress WHERE policy = %s AND finished_at IS NULL",
+        (name,)
+    )
+    row = cursor.fetchone()
+    if row:
+        return row
+    cursor.execute("""
+        INSERT INTO retention_progress (policy, cutoff, deleted_through, deleted, started_at, updated_at, finished_at)
+        VALUES (%s, %s, NULL, 0, NOW(), NOW(), NULL)
+        ON CONFLICT (policy) DO UPDATE SET cutoff = EXCLUDED.cutoff, deleted_through = NULL, deleted = 0,
+            started_at = NOW(), updated_at = NOW(), finished_at = NULL
+    """, (name, cutoff))
+    return cutoff, None
+
+
+def prune_batch(cursor, table, ts_column, condition, cutoff, deleted_through, batch_rows):
+    """Delete the oldest ~batch_rows matching rows below cutoff; returns (deleted, newest timestamp deleted)
+
+    The batch ends at the timestamp of its last row, so each DELETE is an
+    index range scan (and only touches the partitions in that range).
+    """
+    lower = f" AND {ts_column} >= %s" if deleted_through is not None else ""
+    params = (cutoff, deleted_through) if deleted_through is not None else (cutoff,)
+    cursor.execute(
+        f"SELECT {ts_column} FROM {table} WHERE {condition} AND {ts_column} < %s{lower} "
+        f"ORDER BY {ts_column} OFFSET %s LIMIT 1",
+        params + (batch_rows - 1,)
+    )
+    row = cursor.fetchone()
+    upper, upper_sql = (row[0], f"{ts_column} <= %s") if row else (cutoff, f"{ts_column} < %s")
+    cursor.execute(
+        f"DELETE FROM {table} WHERE {condition} AND {upper_sql}{lower}",
+        (upper,) + params[1:]
+    )
+    return cursor.rowcount, upper
+
+
+def prune_policy(conn, policy, cutoff, should_continue, batch_rows=RETENTION_BATCH_ROWS,
+                 pause=RETENTION_BATCH_PAUSE, deadline=None):
+    """Prune one policy in batches; returns (rows deleted, finished)"""
+    name, table, ts_column, condition = policy
+    cursor = conn.cursor()
+    deleted = 0
+    try:
+        cursor.execute("SELECT to_regclass(%s)", (table,))
+        if cursor.fetchone()[0] is None:
+            return 0, True
+        cutoff, deleted_through = start_run(cursor, name, cutoff)
+        conn.commit()
+        while True:
+            if not should_continue() or (deadline is not None and time.monotonic() > deadline):
+                return deleted, False
+            count, upper = prune_batch(cursor, table, ts_column, condition, cutoff, deleted_through, batch_rows)
+            finished = upper >= cutoff or count < batch_rows
+            cursor.execute("""
+                UPDATE retention_progress
+                SET deleted_through = %s, deleted = deleted + %s, updated_at = NOW(),
+                    finished_at = CASE WHEN %s THEN NOW() END
+                WHERE policy = %s
+            """, (min(upper, cutoff), count, finished, name))
+            conn.commit()
+            deleted += count
+            deleted_through = min(upper, cutoff)
+            if finished:
+                return deleted, True
+            time.sleep(pause)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def vacuum_table(conn, table, deleted):
+    """VACUUM (ANALYZE) after large deletions, ANALYZE after small ones"""
+    command = f"VACUUM (ANALYZE) {table}" if deleted >= VACUUM_MIN_DELETED else f"ANALYZE {table}"
+    autocommit = conn.autocommit
+    conn.autocommit = True  # VACUUM cannot run inside a transaction
+    try:
+        cursor = conn.cursor()
+        cursor.execute(command)
+        cursor.close()
+    finally:
+        conn.autocommit = autocommit
+    return command
+
+
+def run_retention(conn, now, retention_days, should_continue=lambda: True,
+                  batch_rows=RETENTION_BATCH_ROWS, pause=RETENTION_BATCH_PAUSE, time_budget=RETENTION_TIME_BUDGET):
+    """Prune every policy with retention_days[name] > 0; returns {name: rows deleted}
+
+    now is naive IST. Nothing is done while a session is active;
+    should_continue() is checked before every batch (e.g. the service's
+    control state) and pruning resumes on the next run when it says stop.
+    """
+    cursor = conn.cursor()
+    try:
+        create_progress_table(cursor)
+        conn.commit()
+        if active_session_exists(cursor):
+            return {}
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    deadline = time.monotonic() + time_budget
+    results = {}
+    for policy in RETENTION_POLICIES:
+        name, table = policy[0], policy[1]
+        days = retention_days.get(name, 0)
+        if days <= 0:
+            continue
+        deleted, finished = prune_policy(
+            conn, policy, now - timedelta(days=days), should_continue, batch_rows, pause, deadline
+        )
+        results[name] = deleted
+        if deleted:
+            print(f"[RETENTION] {name}: deleted {deleted} row(s) older than {days} day(s) from {table}")
+        if not finished:
+            print(f"[RETENTION] {name}: paused, will resume on the next run")
+            break
+        if deleted and should_continue():
+            print(f"[RETENTION] {vacuum_table(conn, table, deleted)}")
+    return results
@@ -0,0 +1,200 @@
+"""
+Telemetry Rollups
+Per-minute and per-hour aggregates of sensor_readings (min / max / avg / last
+of pressure, temperature and valve position), kept up to date by the
+telemetry writer as batches are committed.
+
+Refreshing recomputes whole buckets from the level below, starting at the
+bucket of the oldest new sample, so it is idempotent: replayed or retried
+rows just recompute the same buckets.
+
+    sensor_readings (raw, ~1 s) -> sensor_rollup_1m -> sensor_rollup_1h
+
+Idle samples (no session) are rolled up under session_id 0. Raw ADC counts
+are converted with the calibration in effect at each sample (see
+sensor_calibration.py), so after a recalibration the rollups are refreshed
+from the start of the new calibration.
+"""
+from sensor_calibration import calibration_table_statements, calibration_join_sql, pressure_sql, temperature_sql
+
+# (name, bucket seconds, table, date_trunc unit) from finest to coarsest
+RESOLUTIONS = (
+    ('raw', 1, 'sensor_readings', None),
+    ('1m', 60, 'sensor_rollup_1m', 'minute'),
+    ('1h', 3600, 'sensor_rollup_1h', 'hour'),
+)
+ROLLUP_TABLES = [table for name, _, table, unit in RESOLUTIONS if unit]
+
+METRICS = ('pressure', 'temperature', 'valve')
+# Value column of each metric in calibrated_readings_sql()
+RAW_COLUMNS = {'pressure': 'pressure', 'temperature': 'temperature', 'valve': 'valve_position'}
+
+ROLLUP_COLUMNS = ['samples'] + [
+    f"{metric}_{stat}" for metric in METRICS for stat in ('min', 'max', 'avg', 'last')
+] + ['last_ts']
+
+
+def rollup_table_statements():
+    """DDL for the rollup tables and the calibration table they read (idempotent)"""
+    value_columns = ',\n'.join(
+        f"                {metric}_{stat} REAL" for metric in METRICS for stat in ('min', 'max', 'avg', 'last')
+    )
+    statements = calibration_table_statements()
+    for table in ROLLUP_TABLES:
+        statements.append(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                session_id INTEGER NOT NULL DEFAULT 0,
+                bucket TIMESTAMP NOT NULL,
+                samples INTEGER NOT NULL,
+{value_columns},
+                last_ts TIMESTAMP,
+                PRIMARY KEY (session_id, bucket)
+            );
+        """)
+        statements.append(f"CREATE INDEX IF NOT EXISTS idx_{table}_bucket ON {table}(bucket)")
+    return statements
+
+
+def create_rollup_tables(cursor):
+    """Create the rollup tables if they do not exist"""
+    for sql in rollup_table_statements():
+        cursor.execute(sql)
+
+
+def upsert_sql(table, select_sql):
+    updates = ', '.join(f"{column} = EXCLUDED.{column}" for column in ROLLUP_COLUMNS)
+    return (
+        f"INSERT INTO {table} (session_id, bucket, {', '.join(ROLLUP_COLUMNS)}) {select_sql} "
+        f"ON CONFLICT (session_id, bucket) DO UPDATE SET {updates}"
+    )
+
+
+def calibrated_readings_sql(since_sql):
+    """sensor_readings rows from since_sql onwards with calibrated pressure and temperature"""
+    return (
+        f"SELECT r.session_id, r.timestamp, {pressure_sql('r', 'c')} AS pressure, "
+        f"{temperature_sql('r', 'c')} AS temperature, r.valve_position "
+        f"FROM sensor_readings r {calibration_join_sql('r', 'c')} "
+        f"WHERE r.timestamp >= {since_sql}"
+    )
+
+
+def rollup_select_sql(source, unit, since_sql, where_sql=None):
+    """SELECT of the `unit` buckets from `source` (sensor_readings or the finer rollup) from since_sql onwards"""
+    if source == 'sensor_readings':
+        aggregates = ', '.join(
+            f"min({column}), max({column}), avg({column}), (array_agg({column} ORDER BY timestamp DESC))[1]"
+            for column in (RAW_COLUMNS[metric] for metric in METRICS)
+        )
+        return (
+            f"SELECT COALESCE(session_id, 0), date_trunc('{unit}', timestamp), count(*), {aggregates}, max(timestamp) "
+            f"FROM ({calibrated_readings_sql(since_sql)}) readings "
+            f"{f'WHERE {where_sql} ' if where_sql else ''}"
+            f"GROUP BY 1, 2"
+        )
+    # Coarser level from the finer rollup: sample-weighted averages, last of the last bucket
+    aggregates = ', '.join(
+        f"min({metric}_min), max({metric}_max), "
+        f"sum({metric}_avg * samples) / NULLIF(sum(samples) FILTER (WHERE {metric}_avg IS NOT NULL), 0), "
+        f"(array_agg({metric}_last ORDER BY bucket DESC))[1]"
+        for metric in METRICS
+    )
+    return (
+        f"SELECT session_id, date_trunc('{unit}', bucket), sum(samples), {aggregates}, max(last_ts) "
+        f"FROM {source} WHERE bucket >= {since_sql}{f' AND {where_sql}' if where_sql else ''} "
+        f"GROUP BY 1, 2"
+    )
+
+
+def refresh_statements(placeholder='%s'):
+    """SQL statements that recompute every bucket from the one containing the
+    timestamp bound to `placeholder` ('%s' for psycopg2, '$1' for asyncpg)"""
+    statements = []
+    source = None
+    for name, _, table, unit in RESOLUTIONS:
+        if unit is not None:
+            since_sql = f"date_trunc('{unit}', {placeholder}::timestamp)"
+            statements.append(upsert_sql(table, rollup_select_sql(source, unit, since_sql)))
+        source = table
+    return statements
+
+
+def refresh_rollups(conn, since):
+    """Recompute rollup buckets from `since` onwards and commit"""
+    cursor = conn.cursor()
+    try:
+        for sql in refresh_statements():
+            cursor.execute(sql, (since,))
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+def rebuild_session_rollups(conn, session_id, first, last):
+    """Recompute the rollup buckets of session_id and of idle time (session 0)
+    between samples `first` and `last`, in one transaction
+
+    Needed after idle samples were re-tagged to session_id (refresh_rollups
+    only upserts, so their buckets under session 0 would stay). No other
+    bucket is touched, and each level is recomputed from the level below,
+    so hour buckets whose raw samples or minute rollups are gone are kept.
+    Does nothing if the rollup tables do not exist yet.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT to_regclass(%s)", (ROLLUP_TABLES[0],))
+        if cursor.fetchone()[0] is None:
+            return False
+        source = None
+        for name, _, table, unit in RESOLUTIONS:
+            if unit is not None:
+                window_sql = f"date_trunc('{unit}', %(first)s::timestamp)"
+                end_sql = f"date_trunc('{unit}', %(last)s::timestamp) + INTERVAL '1 {unit}'"
+                cursor.execute(
+                    f"DELETE FROM {table} WHERE session_id IN (0, %(session_id)s) "
+                    f"AND bucket >= {window_sql} AND bucket < {end_sql}",
+                    {'session_id': session_id, 'first': first, 'last': last}
+                )
+                column = 'timestamp' if source == 'sensor_readings' else 'bucket'
+                where_sql = f"COALESCE(session_id, 0) IN (0, %(session_id)s) AND {column} < {end_sql}"
+                cursor.execute(
+                    upsert_sql(table, rollup_select_sql(source, unit, window_sql, where_sql)),
+                    {'session_id': session_id, 'first': first, 'last': last}
+                )
+            source = table
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return True
+
+
+def backfill_rollups(conn):
+    """Create the rollup tables and, if they are empty, roll up all existing history"""
+    cursor = conn.cursor()
+    try:
+        create_rollup_tables(cursor)
+        conn.commit()
+        cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {ROLLUP_TABLES[0]})")
+        if cursor.fetchone()[0]:
+            return False
+        cursor.execute("SELECT min(timestamp) FROM sensor_readings")
+        oldest = cursor.fetchone()[0]
+    finally:
+        cursor.close()
+    if oldest is None:
+        return False
+    refresh_rollups(conn, oldest)
+    return True
+
+
+def choose_resolution(span_seconds, max_points):
+    """Finest resolution whose bucket count over span_seconds fits in max_points (0 = raw)"""
+    if max_points <= 0:
+        return RESOLUTIONS[0]
+    for resolution in RESOLUTIONS:
+        if span_seconds / resolution[1] <= max_points:
+            return resolution
+    return RESOLUTIONS[-1]
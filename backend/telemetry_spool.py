@@ -0,0 +1,172 @@
+"""
+Local Telemetry Spool
+Append-only SQLite (WAL mode) store for telemetry rows that could not be
+written to PostgreSQL. The telemetry writer spools rows while the database is
+unreachable and replays them once it is back: COPY into a temp table, then
+INSERT ... ON CONFLICT (ingest_key, timestamp) DO NOTHING, so a replay that is
+interrupted after the commit never writes a row twice.
+
+Each row is stored with its column layout and replayed into those columns,
+so rows spooled by an older version survive an upgrade that changes the
+row layout.
+"""
+
+import io
+import os
+import csv
+import json
+import sqlite3
+from datetime import datetime
+
+
+def encode_row(row):
+    """JSON-encode a row tuple, keeping datetimes"""
+    return json.dumps([
+        {'$dt': value.isoformat()} if isinstance(value, datetime) else value
+        for value in row
+    ])
+
+
+def decode_row(text):
+    return tuple(
+        datetime.fromisoformat(value['$dt']) if isinstance(value, dict) and '$dt' in value else value
+        for value in json.loads(text)
+    )
+
+
+class TelemetrySpool:
+    """Durable FIFO of (table, row) telemetry tuples
+
+    Not thread-safe: use it from one thread only (the telemetry writer or
+    the asyncio runtime's spool worker).
+    """
+
+    def __init__(self, path, max_rows=1000000):
+        self.path = path
+        self.max_rows = max_rows
+        self.db = None
+        self.depth = 0  # Rows currently spooled (readable from other threads)
+        self.spooled = 0
+        self.replayed = 0
+        self.dropped = 0
+        self.oldest_replayed = None  # Oldest timestamp in the last replayed chunk
+
+    def open(self):
+        if self.db is not None:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")  # Durable across app crashes; WAL fsyncs at checkpoints
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS spool (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name TEXT NOT NULL,
+                columns TEXT NOT NULL,
+                row TEXT NOT NULL
+            )
+        """)
+        self.db.commit()
+        self.depth = self.db.execute("SELECT COUNT(*) FROM spool").fetchone()[0]
+        if self.depth:
+            print(f"[SPOOL] {self.depth} telemetry row(s) waiting for replay in {self.path}")
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    def append(self, batch, columns_by_table):
+        """Store (table, row) tuples and their column layout in one SQLite transaction"""
+        self.open()
+        with self.db:
+            self.db.executemany(
+                "INSERT INTO spool (table_name, columns, row) VALUES (?, ?, ?)",
+                [(table, ','.join(columns_by_table[table]), encode_row(row)) for table, row in batch]
+            )
+        self.depth += len(batch)
+        self.spooled += len(batch)
+        if self.depth > self.max_rows:
+            self.trim()
+
+    def trim(self):
+        """Drop the oldest rows above max_rows"""
+        excess = self.depth - self.max_rows
+        with self.db:
+            self.db.execute(
+                "DELETE FROM spool WHERE seq IN (SELECT seq FROM spool ORDER BY seq LIMIT ?)", (excess,)
+            )
+        self.depth -= excess
+        self.dropped += excess
+        print(f"[SPOOL] Spool full, dropped {excess} oldest row(s)")
+
+    def peek(self, limit):
+        """Oldest rows as [(seq, table, columns, row)]"""
+        self.open()
+        return [
+            (seq, table, tuple(columns.split(',')), decode_row(text))
+            for seq, table, columns, text in self.db.execute(
+                "SELECT seq, table_name, columns, row FROM spool ORDER BY seq LIMIT ?", (limit,)
+            )
+        ]
+
+    def remove_through(self, seq):
+        """Delete every row up to and including seq (after it was replayed)"""
+        with self.db:
+            removed = self.db.execute("DELETE FROM spool WHERE seq <= ?", (seq,)).rowcount
+        self.depth = max(self.depth - removed, 0)
+        self.replayed += removed
+
+    def replay(self, conn, limit=1000):
+        """Copy up to limit spooled rows into PostgreSQL; returns the number replayed
+
+        Rows go into the columns they were spooled with. Raises on database
+        errors (nothing is removed from the spool then).
+        """
+        entries = self.peek(limit)
+        if not entries:
+            return 0
+        by_layout = {}
+        for _, table, columns, row in entries:
+            by_layout.setdefault((table, columns), []).append(row)
+
+        self.oldest_replayed = None
+        cursor = conn.cursor()
+        for (table, layout), rows in by_layout.items():
+            if 'timestamp' in layout:
+                index = layout.index('timestamp')
+                oldest = min(row[index] for row in rows)
+                if self.oldest_replayed is None or oldest < self.oldest_replayed:
+                    self.oldest_replayed = oldest
+            columns = ', '.join(layout)
+            staging = f"spool_{table}"
+            # All columns of the table, so every layout can be staged in it
+            cursor.execute(
+                f"CREATE TEMP TABLE IF NOT EXISTS {staging} ON COMMIT DELETE ROWS "
+                f"AS SELECT * FROM {table} WITH NO DATA"
+            )
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in rows:
+                writer.writerow(['' if value is None else value for value in row])
+            buffer.seek(0)
+            cursor.copy_expert(f"COPY {staging} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {staging} "
+                f"ON CONFLICT (ingest_key, timestamp) DO NOTHING"
+            )
+            cursor.execute(f"TRUNCATE {staging}")  # Next layout group reuses the staging table
+        conn.commit()
+        cursor.close()
+        self.remove_through(entries[-1][0])
+        return len(entries)
+
+    def stats(self):
+        return {
+            'depth': self.depth,
+            'spooled': self.spooled,
+            'replayed': self.replayed,
+            'dropped': self.dropped,
+        }
@@ -0,0 +1,397 @@
+"""
+Batched Telemetry Writer
+Background thread that owns its own PostgreSQL connection and writes
+sensor_readings rows in batches (one multi-row INSERT via execute_values and
+one commit per batch) instead of INSERT + commit per row.
+
+Session state changes (e.g. marking a session stopped) go through a separate
+priority queue: they wake the writer immediately and are committed on their
+own ahead of the telemetry batch, so bad telemetry never drops them.
+
+While PostgreSQL is unreachable, rows go to a local durable spool
+(telemetry_spool.py) and are replayed when it comes back. Every row carries
+an ingest_key (UUID), and inserts use ON CONFLICT (ingest_key, timestamp)
+DO NOTHING (unique keys on the partitioned table must include the timestamp),
+so a batch retried after an ambiguous failure is never written twice.
+
+After each write the minute/hour rollups (telemetry_rollups.py) are
+recomputed from the oldest new sample onwards.
+"""
+
+import time
+import uuid
+import queue
+import threading
+from collections import deque
+import psycopg2
+from psycopg2.extras import execute_values
+from telemetry_rollups import create_rollup_tables, refresh_rollups
+
+# Row layouts per telemetry table (column order of the queued tuples)
+TELEMETRY_TABLES = {
+    'sensor_readings': ('session_id', 'pressure_raw', 'temperature_raw', 'valve_position', 'timestamp', 'ingest_key'),
+}
+SPOOL_REPLAY_CHUNK = 1000  # Spooled rows replayed per transaction
+ROLLUP_SOURCE = 'sensor_readings'
+ROLLUP_TS_INDEX = TELEMETRY_TABLES[ROLLUP_SOURCE].index('timestamp')
+
+RECONNECT_DELAY_MAX = 30  # Seconds between reconnect attempts at most
+
+
+class TelemetryWriter:
+    """Bounded queue + writer thread that flushes by row count or time window
+
+    connect_fn() returns a new psycopg2 connection. spool (optional) is a
+    TelemetrySpool used while the database is unreachable.
+    """
+
+    def __init__(self, connect_fn, batch_size=100, flush_interval=1.0, queue_size=5000, spool=None):
+        self.connect_fn = connect_fn
+        self.spool = spool
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rows = queue.Queue(maxsize=queue_size)  # (table, row) telemetry
+        self.priority = queue.Queue()  # (sql, params) session state changes
+        self.retry_rows = deque()  # Rows from a failed flush, written before new ones
+        self.retry_changes = deque()  # State changes from a failed flush, kept in order
+        self.queue_size = queue_size
+        self.wake_event = threading.Event()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.conn = None
+        self.reconnect_delay = 1
+        self.next_connect_attempt = 0
+        self.lock = threading.Lock()
+        self.rollup_since = None  # Oldest sample written since the rollups were refreshed
+        self.rollup_tables_ready = False
+
+        # Metrics
+        self.rows_written = 0
+        self.state_changes_written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_error = None
+        self.max_depth = 0
+        self.last_flush_ms = None
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+
+    def submit(self, table, row):
+        """Queue a telemetry row; returns False (and counts a drop) if the queue is full
+
+        row is in TELEMETRY_TABLES column order without the ingest_key, which is added here.
+        """
+        try:
+            self.rows.put_nowait((table, tuple(row) + (str(uuid.uuid4()),)))
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+            return False
+        depth = self.rows.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+        if depth >= self.batch_size:
+            self.wake_event.set()
+        return True
+
+    def submit_state_change(self, sql, params):
+        """Queue a session state change; flushed ahead of telemetry and never dropped"""
+        self.priority.put((sql, params))
+        self.wake_event.set()
+
+    def record_error(self, context, error):
+        with self.lock:
+            self.errors += 1
+            self.last_error = f"{context}: {error}"
+        print(f"[ERROR] Telemetry writer {context} ({self.errors} error(s)): {error}")
+
+    def ensure_connection(self):
+        """Connect if needed, backing off after failures"""
+        if self.conn is not None and not self.conn.closed:
+            return True
+        if time.monotonic() < self.next_connect_attempt:
+            return False
+        try:
+            self.conn = self.connect_fn()
+            self.reconnect_delay = 1
+            return True
+        except Exception as e:
+            self.conn = None
+            self.record_error("connect", e)
+            self.next_connect_attempt = time.monotonic() + self.reconnect_delay
+            self.reconnect_delay = min(self.reconnect_delay * 2, RECONNECT_DELAY_MAX)
+            return False
+
+    def take_rows(self):
+        """Rows for the next batch: retried rows first, then the queue"""
+        batch = []
+        while self.retry_rows and len(batch) < self.batch_size:
+            batch.append(self.retry_rows.popleft())
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.rows.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def take_state_changes(self):
+        changes = list(self.retry_changes)
+        self.retry_changes.clear()
+        while True:
+            try:
+                changes.append(self.priority.get_nowait())
+            except queue.Empty:
+                return changes
+
+    def flush(self):
+        """Write pending state changes, then one batch of rows
+
+        The state changes are committed in their own transaction first, so a
+        telemetry batch that fails on bad data cannot take a session
+        transition down with it. Returns the number of telemetry rows
+        written, or None if the flush failed.
+        """
+        changes = self.take_state_changes()
+        batch = self.take_rows()
+        if not changes and not batch:
+            return 0
+        if not self.ensure_connection():
+            self.requeue(changes, batch)
+            self.spool_pending()
+            return None
+
+        started = time.monotonic()
+        if changes:
+            try:
+                cursor = self.conn.cursor()
+                for sql, params in changes:
+                    cursor.execute(sql, params)
+                self.conn.commit()
+                cursor.close()
+            except Exception as e:
+                if self.handle_flush_error(e, changes, batch):
+                    return None
+                # A state change the database rejects would fail forever - drop it, keep the rows
+                with self.lock:
+                    self.dropped += len(changes)
+                self.retry_rows.extendleft(reversed(batch))
+                return None
+            with self.lock:
+                self.state_changes_written += len(changes)
+
+        try:
+            cursor = self.conn.cursor()
+            by_table = {}
+            for table, row in batch:
+                by_table.setdefault(table, []).append(row)
+            for table, rows in by_table.items():
+                columns = ', '.join(TELEMETRY_TABLES[table])
+                execute_values(
+                    cursor,
+                    f"INSERT INTO {table} ({columns}) VALUES %s ON CONFLICT (ingest_key, timestamp) DO NOTHING",
+                    rows,
+                    page_size=self.batch_size
+                )
+            self.conn.commit()
+            cursor.close()
+        except Exception as e:
+            if not self.handle_flush_error(e, [], batch):
+                # Bad data would fail forever - drop the batch rather than block the queue
+                with self.lock:
+                    self.dropped += len(batch)
+            return None
+
+        self.note_rollup([row[ROLLUP_TS_INDEX] for table, row in batch if table == ROLLUP_SOURCE])
+        elapsed_ms = (time.monotonic() - started) * 1000
+        with self.lock:
+            self.batches += 1
+            self.rows_written += len(batch)
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            self.total_flush_ms += elapsed_ms
+        return len(batch)
+
+    def handle_flush_error(self, error, changes, batch):
+        """Roll back a failed write; True if the connection is gone and changes/batch were kept for a retry"""
+        self.record_error("flush", error)
+        try:
+            self.conn.rollback()
+        except Exception:
+            pass
+        if not isinstance(error, (psycopg2.OperationalError, psycopg2.InterfaceError)):
+            return False
+        self.conn = None  # Connection is gone - reconnect and retry the batch
+        self.requeue(changes, batch)
+        self.spool_pending()
+        return True
+
+    def requeue(self, changes, batch):
+        """Keep a failed flush for the next attempt (oldest telemetry dropped past queue_size)"""
+        self.retry_changes.extendleft(reversed(changes))
+        self.retry_rows.extendleft(reversed(batch))
+        while len(self.retry_rows) > self.queue_size:
+            self.retry_rows.popleft()  # Oldest first
+            with self.lock:
+                self.dropped += 1
+
+    def spool_pending(self):
+        """Move every queued row to the durable spool while the database is down"""
+        if self.spool is None:
+            return
+        batch = list(self.retry_rows)
+        self.retry_rows.clear()
+        while True:
+            try:
+                batch.append(self.rows.get_nowait())
+            except queue.Empty:
+                break
+        if not batch:
+            return
+        try:
+            self.spool.append(batch, TELEMETRY_TABLES)
+        except Exception as e:
+            self.record_error("spool", e)
+            self.retry_rows.extendleft(reversed(batch))
+
+    def replay_spool(self):
+        """Replay one chunk of spooled rows; returns the number replayed, None on error"""
+        if self.spool is None or self.spool.depth == 0 or not self.ensure_connection():
+            return 0
+        try:
+            replayed = self.spool.replay(self.conn, SPOOL_REPLAY_CHUNK)
+        except Exception as e:
+            self.record_error("spool replay", e)
+            try:
+                self.conn.rollback()
+            except Exception:
+                pass
+            if isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError)):
+                self.conn = None
+            return None
+        if replayed:
+            self.note_rollup([self.spool.oldest_replayed] if self.spool.oldest_replayed else [])
+        if replayed and self.spool.depth == 0:
+            print(f"[SPOOL] Replay complete ({self.spool.replayed} row(s) in total)")
+        return replayed
+
+    def note_rollup(self, timestamps):
+        """Remember the oldest sample whose rollup buckets need recomputing"""
+        if not timestamps:
+            return
+        oldest = min(timestamps)
+        if self.rollup_since is None or oldest < self.rollup_since:
+            self.rollup_since = oldest
+
+    def refresh_rollups(self):
+        """Recompute the rollup buckets touched since the last refresh"""
+        if self.rollup_since is None or not self.ensure_connection():
+            return
+        try:
+            if not self.rollup_tables_ready:
+                cursor = self.conn.cursor()
+                create_rollup_tables(cursor)
+                self.conn.commit()
+                cursor.close()
+                self.rollup_tables_ready = True
+            refresh_rollups(self.conn, self.rollup_since)
+            self.rollup_since = None
+        except Exception as e:
+            self.record_error("rollup refresh", e)
+            try:
+                self.conn.rollback()
+            except Exception:
+                pass
+            if isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError)):
+                self.conn = None
+
+    def pending(self):
+        return self.rows.qsize() + len(self.retry_rows) + self.priority.qsize() + len(self.retry_changes)
+
+    def run(self):
+        """Writer thread - flush when a batch is full, on a state change, or every flush_interval"""
+        print(f"[DB] Telemetry writer started (batch {self.batch_size} rows / {self.flush_interval}s)")
+        if self.spool is not None:
+            try:
+                self.spool.open()  # Rows left over from a previous run are replayed first
+            except Exception as e:
+                self.record_error("spool open", e)
+                self.spool = None
+        while not self.stop_event.is_set():
+            self.wake_event.wait(self.flush_interval)
+            self.wake_event.clear()
+            # Drain full batches; stop early if the database is unavailable
+            flushed = True
+            while self.pending():
+                written = self.flush()
+                if written is None:
+                    flushed = False
+                    break
+                if written < self.batch_size:
+                    break
+            # Catch up on spooled rows a chunk at a time, between live flushes
+            if flushed and self.replay_spool():
+                self.wake_event.set()
+            if flushed:
+                self.refresh_rollups()
+        # Final flush on shutdown
+        while self.pending():
+            if self.flush() is None:
+                break
+        self.refresh_rollups()
+        if self.pending():
+            print(f"[WARNING] Telemetry writer stopped with {self.pending()} unsaved row(s)")
+        if self.spool is not None:
+            self.spool.close()
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+        print("[DB] Telemetry writer stopped")
+
+    def start(self):
+        """Start the writer thread if it is not already running"""
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=10):
+        """Flush what is queued and stop the writer thread"""
+        self.stop_event.set()
+        self.wake_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=timeout)
+
+    def stats(self):
+        """Queue depth, flush latency and error counters"""
+        with self.lock:
+            return {
+                'queue_depth': self.rows.qsize(),
+                'retry_depth': len(self.retry_rows),
+                'priority_depth': self.priority.qsize() + len(self.retry_changes),
+                'max_queue_depth': self.max_depth,
+                'rows_written': self.rows_written,
+                'state_changes_written': self.state_changes_written,
+                'batches': self.batches,
+                'dropped': self.dropped,
+                'errors': self.errors,
+                'last_error': self.last_error,
+                'last_flush_ms': round(self.last_flush_ms, 1) if self.last_flush_ms is not None else None,
+                'avg_flush_ms': round(self.total_flush_ms / self.batches, 1) if self.batches else None,
+                'max_flush_ms': round(self.max_flush_ms, 1),
+                'spool': self.spool.stats() if self.spool is not None else None,
+            }
+
+    def print_stats(self):
+        stats = self.stats()
+        print(f"[DB] Telemetry: {stats['rows_written']} row(s) in {stats['batches']} batch(es), "
+              f"queue {stats['queue_depth']} (max {stats['max_queue_depth']}), "
+              f"flush avg {stats['avg_flush_ms']} ms / max {stats['max_flush_ms']} ms, "
+              f"{stats['dropped']} dropped, {stats['errors']} error(s)")
+        if stats['spool'] and (stats['spool']['depth'] or stats['spool']['spooled']):
+            spool = stats['spool']
+            print(f"[SPOOL] {spool['depth']} row(s) waiting, {spool['spooled']} spooled, "
+                  f"{spool['replayed']} replayed, {spool['dropped']} dropped")
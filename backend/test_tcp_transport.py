@@ -0,0 +1,95 @@
+"""Quick test of the Modbus TCP transport against a local pymodbus simulator
+
+Starts an in-process Modbus TCP server with the autoclave register map,
+then reads a snapshot and writes the valve through both service runtimes.
+No PLC or database needed:  python test_tcp_transport.py
+"""
+import os
+import time
+import asyncio
+import threading
+
+SIM_PORT = int(os.getenv('SIM_PORT', '5020'))
+os.environ['PLC_TRANSPORT'] = 'tcp'
+os.environ['PLC_HOST'] = '127.0.0.1'
+os.environ['PLC_TCP_PORT'] = str(SIM_PORT)
+
+from pymodbus.server import StartAsyncTcpServer
+from pymodbus.datastore import ModbusSequentialDataBlock, ModbusServerContext, ModbusSlaveContext
+
+
+def start_simulator(port):
+    """Run a Modbus TCP server with pressure/temperature/valve registers in a background thread"""
+    input_registers = [0] * 100
+    input_registers[68] = 2048  # Pressure counts (~43.5 PSI)
+    input_registers[69] = 1000  # Temperature counts (~86.6 C)
+    slave = ModbusSlaveContext(
+        ir=ModbusSequentialDataBlock(0, input_registers),
+        hr=ModbusSequentialDataBlock(0, [0] * 100),
+        co=ModbusSequentialDataBlock(0, [False] * 10),
+        zero_mode=True
+    )
+    context = ModbusServerContext(slaves=slave, single=True)
+
+    def runner():
+        asyncio.run(StartAsyncTcpServer(context=context, address=('127.0.0.1', port)))
+
+    threading.Thread(target=runner, daemon=True).start()
+    time.sleep(1)  # Let the server bind
+    return context
+
+
+print("="*60)
+print("Testing Modbus TCP transport")
+print("="*60)
+print(f"Simulator: 127.0.0.1:{SIM_PORT}")
+print("="*60)
+
+context = start_simulator(SIM_PORT)
+failures = 0
+
+# Threaded service over TCP
+from sensor_control_service import SensorControlService, VALVE_CONTROL_REGISTER
+service = SensorControlService()
+service.link_supervisor.start()
+if not service.link_supervisor.wait_connected(5):
+    print("[ERROR] Failed to connect to simulator")
+    exit(1)
+snapshot = service.read_snapshot()
+if snapshot and snapshot.pressure == 43.51 and snapshot.temperature == 86.56:
+    print(f"[OK] Threaded snapshot: {snapshot}")
+else:
+    print(f"[ERROR] Threaded snapshot: {snapshot}")
+    failures += 1
+
+if service.set_valve_position(1600) and context[0].getValues(3, VALVE_CONTROL_REGISTER, 1)[0] == 1600:
+    print("[OK] Valve write reached simulator")
+else:
+    print("[ERROR] Valve write failed")
+    failures += 1
+service.link_supervisor.stop()
+service.transport.release_client(service.plc_client)
+
+# Asyncio service over TCP (pipelined requests)
+from sensor_control_async import AsyncSensorControlService
+
+
+async def async_check():
+    async_service = AsyncSensorControlService()
+    async_service.bus_lock = asyncio.Lock()
+    async_service.connect_lock = asyncio.Lock()
+    try:
+        return await async_service.read_snapshot()
+    finally:
+        if async_service.plc_client:
+            async_service.transport.release_client(async_service.plc_client)
+
+snapshot = asyncio.run(async_check())
+if snapshot and snapshot.pressure == 43.51 and snapshot.valve_position == 1600:
+    print(f"[OK] Async snapshot: {snapshot}")
+else:
+    print(f"[ERROR] Async snapshot: {snapshot}")
+    failures += 1
+
+print(f"\n[{'OK' if failures == 0 else 'ERROR'}] Test complete ({failures} failure(s))")
+exit(1 if failures else 0)
@@ -69,6 +69,9 @@ export const HistoricalData = ({ onBack }: HistoricalDataProps) => {
   const [totalPages, setTotalPages] = useState(1);
   const [totalSessions, setTotalSessions] = useState(0);
   const [perPage] = useState(10); // Sessions per page
+  const [hasNextPage, setHasNextPage] = useState(false);
+  // Cursor that fetches page i + 1 is at index i (page 1 needs none)
+  const pageCursorsRef = useRef<(string | null)[]>([null]);
   const { toast } = useToast();
   const pressureChartRef = useRef<HTMLDivElement>(null);
   const temperatureChartRef = useRef<HTMLDivElement>(null);
@@ -81,8 +84,9 @@ export const HistoricalData = ({ onBack }: HistoricalDataProps) => {
   const fetchSessions = async (page: number = 1) => {
     try {
       setLoading(true);
-      // Use pagination parameters
-      const url = `${API_URL}/sessions?page=${page}&per_page=${perPage}`;
+      // Keyset pagination: each page is fetched with the cursor the previous page returned
+      const cursor = pageCursorsRef.current[page - 1];
+      const url = `${API_URL}/sessions?per_page=${perPage}${cursor ? `&cursor=${encodeURIComponent(cursor)}` : ''}`;
       const response = await fetch(url);
       const data = await response.json();
       
@@ -94,12 +98,17 @@ export const HistoricalData = ({ onBack }: HistoricalDataProps) => {
         // New format with pagination
         sessionsData = data.sessions;
         paginationData = data.pagination;
-        setTotalPages(paginationData.total_pages);
+        if (paginationData.next_cursor) {
+          pageCursorsRef.current[page] = paginationData.next_cursor;
+        }
+        setHasNextPage(paginationData.has_next);
+        setTotalPages(Math.max(paginationData.total_pages || 1, paginationData.has_next ? page + 1 : page));
         setTotalSessions(paginationData.total);
       } else if (Array.isArray(data)) {
         // Fallback for old format
         sessionsData = data;
         setTotalPages(1);
+        setHasNextPage(false);
         setTotalSessions(data.length);
       } else {
         sessionsData = [];
@@ -518,7 +527,7 @@ export const HistoricalData = ({ onBack }: HistoricalDataProps) => {
                         variant={currentPage === pageNum ? "default" : "outline"}
                         size="sm"
                         onClick={() => setCurrentPage(pageNum)}
-                        disabled={loading}
+                        disabled={loading || pageNum > pageCursorsRef.current.length}
                         className="min-w-[40px]"
                       >
                         {pageNum}
@@ -529,8 +538,8 @@ export const HistoricalData = ({ onBack }: HistoricalDataProps) => {
                 <Button
                   variant="outline"
                   size="sm"
-                  onClick={() => setCurrentPage(prev => Math.min(totalPages, prev + 1))}
-                  disabled={currentPage === totalPages || loading}
+                  onClick={() => setCurrentPage(prev => prev + 1)}
+                  disabled={!hasNextPage || loading}
                 >
                   Next
                   <ChevronRight className="h-4 w-4" />
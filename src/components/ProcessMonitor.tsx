@@ -5,6 +5,7 @@ import { Progress } from "@/components/ui/progress";
 import { Pause, StopCircle, Play } from "lucide-react";
 import { supabase, API_URL } from "@/integrations/supabase/client";
 import { useToast } from "@/hooks/use-toast";
+import { useLiveStream, LiveReading } from "@/hooks/use-live-stream";
 import { LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer } from "recharts";
 import { formatInTimeZone } from "date-fns-tz";
 
@@ -45,6 +46,7 @@ export function ProcessMonitor({ program, manualConfig, onStop }: ProcessMonitor
   const { toast } = useToast();
   const intervalRef = useRef<NodeJS.Timeout>();
   const logIntervalRef = useRef<NodeJS.Timeout>();
+  const latestReadingRef = useRef<LiveReading | null>(null);
 
   const isManualMode = !!manualConfig;
   const displayName = isManualMode 
@@ -68,86 +70,35 @@ export function ProcessMonitor({ program, manualConfig, onStop }: ProcessMonitor
   }, []);
 
   useEffect(() => {
-    let sensorPoll: NodeJS.Timeout;
-    let statusPoll: NodeJS.Timeout;
-    
     startSession();
-    
-    // Fetch initial sensor reading immediately
-    const fetchInitialReading = async () => {
-      try {
-        const response = await fetch(`${API_URL}/sensor-readings/latest`);
-        const data = await response.json();
-        if (data && 'pressure' in data && 'temperature' in data) {
-          console.log('Initial sensor reading:', data);
-          setCurrentPressure(data.pressure as number);
-          setCurrentTemperature(data.temperature as number);
-        }
-      } catch (error) {
-        console.error('Failed to fetch initial reading:', error);
-      }
-    };
-    
-    // Fetch immediately
-    fetchInitialReading();
-    
-    // Poll for sensor readings from API every second
-    sensorPoll = setInterval(async () => {
-      try {
-        const response = await fetch(`${API_URL}/sensor-readings/latest`);
-        const data = await response.json();
-        if (data && 'pressure' in data && 'temperature' in data) {
-          setCurrentPressure(data.pressure as number);
-          setCurrentTemperature(data.temperature as number);
-        }
-      } catch (error) {
-        // Silent fail - API not running
+  }, [sessionId]);
+
+  // Sensor readings and session status changes are pushed by the API (/api/stream)
+  useLiveStream({
+    onReading: (reading) => {
+      latestReadingRef.current = reading;
+      setCurrentPressure(reading.pressure);
+      setCurrentTemperature(reading.temperature);
+    },
+    onSession: (currentSession) => {
+      if (!sessionId || currentSession.id.toString() !== sessionId) {
+        return;
       }
-    }, 1000);
-    
-    // Poll for session status every 5 seconds
-    statusPoll = setInterval(async () => {
-      if (sessionId) {
-        try {
-          const response = await fetch(`${API_URL}/sessions`);
-          const data = await response.json();
-          
-          // Handle pagination wrapper format
-          let sessionsArray: any[] = [];
-          if (Array.isArray(data)) {
-            sessionsArray = data;
-          } else if (data.sessions && Array.isArray(data.sessions)) {
-            sessionsArray = data.sessions;
-          }
-          
-          const currentSession = sessionsArray.find((s: any) => s.id.toString() === sessionId);
-          
-          if (currentSession) {
-            setSessionData(currentSession);
-            if (currentSession.status === 'completed') {
-              console.log('Session completed, auto-redirecting to homepage');
-              setStatus('paused');
-              if (intervalRef.current) clearInterval(intervalRef.current);
-              if (logIntervalRef.current) clearInterval(logIntervalRef.current);
-              completeProcess();
-            } else if (currentSession.status === 'stopped') {
-              // User manually stopped - don't auto-redirect
-              console.log('Session stopped by user');
-              setStatus('paused');
-              if (intervalRef.current) clearInterval(intervalRef.current);
-            }
-          }
-        } catch (error) {
-          // Silent fail
-        }
+      setSessionData(currentSession);
+      if (currentSession.status === 'completed') {
+        console.log('Session completed, auto-redirecting to homepage');
+        setStatus('paused');
+        if (intervalRef.current) clearInterval(intervalRef.current);
+        if (logIntervalRef.current) clearInterval(logIntervalRef.current);
+        completeProcess();
+      } else if (currentSession.status === 'stopped') {
+        // User manually stopped - don't auto-redirect
+        console.log('Session stopped by user');
+        setStatus('paused');
+        if (intervalRef.current) clearInterval(intervalRef.current);
       }
-    }, 5000);
-    
-    return () => {
-      clearInterval(sensorPoll);
-      clearInterval(statusPoll);
-    };
-  }, [sessionId]);
+    },
+  });
 
   // Start simulation and progress updates
   useEffect(() => {
@@ -185,11 +136,10 @@ export function ProcessMonitor({ program, manualConfig, onStop }: ProcessMonitor
   const startSession = async () => {
     // Try to get the current active session from API
     try {
-      const response = await fetch(`${API_URL}/sessions`);
-      const sessions = await response.json();
-      const activeSession = sessions.find((s: any) => s.status === 'running');
+      const response = await fetch(`${API_URL}/sessions/active`);
+      const activeSession = await response.json();
       
-      if (activeSession) {
+      if (activeSession && activeSession.status === 'running') {
         setSessionId(activeSession.id.toString());
         setSessionData(activeSession);
         console.log('Set sessionId to:', activeSession.id);
@@ -217,24 +167,14 @@ export function ProcessMonitor({ program, manualConfig, onStop }: ProcessMonitor
 
     console.log('Starting interval for step:', currentStep, 'duration:', step.duration_minutes);
     
-    // Don't use currentPressure from closure - fetch fresh value
+    // Don't use currentPressure from closure - read the latest streamed value
     let iteration = 0;
     
-    intervalRef.current = setInterval(async () => {
-      // Fetch fresh sensor data for this iteration
-      let pressure = 0;
-      let temperature = 25;
-      
-      try {
-        const response = await fetch(`${API_URL}/sensor-readings/latest`);
-        const data = await response.json();
-        if (data && 'pressure' in data && 'temperature' in data) {
-          pressure = data.pressure as number;
-          temperature = data.temperature as number;
-        }
-      } catch (error) {
-        // Silent fail
-      }
+    intervalRef.current = setInterval(() => {
+      // Latest streamed sensor data for this iteration
+      const reading = latestReadingRef.current;
+      const pressure = reading ? reading.pressure : 0;
+      const temperature = reading ? reading.temperature : 25;
       
         // Only add to chart if we have valid sensor data
         if (pressure > 0 || temperature > 0) {
@@ -0,0 +1,75 @@
+import { useEffect, useRef } from "react";
+import { API_URL } from "@/integrations/supabase/client";
+
+export interface LiveReading {
+  timestamp: string;
+  pressure: number;
+  temperature: number;
+  valve_position: number | null;
+  session_id: number | null;
+}
+
+export interface LiveSession {
+  id: number;
+  program_name: string | null;
+  status: string;
+  start_time: string | null;
+  end_time: string | null;
+  target_pressure: number | null;
+  duration_minutes: number | null;
+  steps_data: any;
+  roll_category_name: string | null;
+  sub_roll_name: string | null;
+  roll_id: string | null;
+  operator_name: string | null;
+  number_of_rolls: number | null;
+}
+
+interface LiveStreamHandlers {
+  onReading?: (reading: LiveReading) => void;
+  onSession?: (session: LiveSession) => void;
+}
+
+// One EventSource per tab, shared by every component using the hook
+let source: EventSource | null = null;
+let users = 0;
+
+function acquireSource() {
+  if (!source) {
+    source = new EventSource(`${API_URL}/stream`);
+  }
+  users++;
+  return source;
+}
+
+function releaseSource() {
+  users--;
+  if (users === 0 && source) {
+    source.close();
+    source = null;
+  }
+}
+
+/**
+ * Subscribe to /api/stream: new sensor samples ('reading') and session
+ * status changes ('session'). The browser reconnects on its own if the
+ * stream drops.
+ */
+export function useLiveStream({ onReading, onSession }: LiveStreamHandlers) {
+  const handlers = useRef<LiveStreamHandlers>({ onReading, onSession });
+  handlers.current = { onReading, onSession };
+
+  useEffect(() => {
+    const stream = acquireSource();
+    const handleReading = (event: MessageEvent) => handlers.current.onReading?.(JSON.parse(event.data));
+    const handleSession = (event: MessageEvent) => handlers.current.onSession?.(JSON.parse(event.data));
+    stream.addEventListener("reading", handleReading);
+    stream.addEventListener("session", handleSession);
+
+    return () => {
+      stream.removeEventListener("reading", handleReading);
+      stream.removeEventListener("session", handleSession);
+      releaseSource();
+    };
+  }, []);
+}
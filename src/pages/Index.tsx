@@ -5,6 +5,7 @@ import { ProcessMonitor } from "@/components/ProcessMonitor";
 import { ManualControl } from "@/components/ManualControl";
 import { HistoricalData } from "@/components/HistoricalData";
 import { useToast } from "@/hooks/use-toast";
+import { useLiveStream } from "@/hooks/use-live-stream";
 import { supabase, API_URL } from "@/integrations/supabase/client";
 
 type AppMode = 'selection' | 'auto-program' | 'auto-running' | 'manual-config' | 'manual-running' | 'history';
@@ -37,17 +38,12 @@ const Index = () => {
     const checkActiveSession = async () => {
       console.log('[INDEX] Checking for active sessions on page load...');
       try {
-        const response = await fetch(`${API_URL}/sessions`);
-        const sessions = await response.json();
-        
-        console.log('[INDEX] All sessions:', sessions);
-        
-        // Check for active running sessions (look for most recent running session)
-        const activeSession = sessions.find((s: any) => s.status === 'running');
+        const response = await fetch(`${API_URL}/sessions/active`);
+        const activeSession = await response.json();
         
         console.log('[INDEX] Active session:', activeSession);
         
-        if (activeSession) {
+        if (activeSession && activeSession.status === 'running') {
           // Check if it's an auto program (has steps_data)
           if (activeSession.steps_data && Array.isArray(activeSession.steps_data) && activeSession.steps_data.length > 0) {
             // AUTO PROGRAM - restore with program data
@@ -108,75 +104,45 @@ const Index = () => {
     checkActiveSession();
   }, []);
 
-  useEffect(() => {
-    // Fetch latest sensor reading from API
-    const fetchLatestReading = async () => {
-      try {
-        const response = await fetch(`${API_URL}/sensor-readings/latest`);
-        const data = await response.json();
-        if (data && 'pressure' in data && 'temperature' in data) {
-          setCurrentPressure(data.pressure as number);
-          setCurrentTemperature(data.temperature as number);
-        }
-      } catch (error) {
-        console.error('Failed to fetch sensor reading:', error);
+  // Live readings and session changes are pushed by the API (/api/stream)
+  useLiveStream({
+    onReading: (reading) => {
+      setCurrentPressure(reading.pressure);
+      setCurrentTemperature(reading.temperature);
+    },
+    onSession: (activeSession) => {
+      if (activeSession.status !== 'running' || mode !== 'selection') {
+        return;
       }
-    };
-
-    fetchLatestReading();
-
-    // Poll for updates every second
-    const interval = setInterval(fetchLatestReading, 1000);
-    
-    // Also check for active session every 2 seconds (in case one starts)
-    const sessionCheck = setInterval(async () => {
-      try {
-        const response = await fetch(`${API_URL}/sessions`);
-        const sessions = await response.json();
-        const activeSession = sessions.find((s: any) => s.status === 'running');
+      // We were on selection screen but a session is active - restore it
+      console.log('[INDEX] 🔄 Active session found while on selection screen, restoring...', activeSession);
+      
+      // Check if it's an auto program
+      if (activeSession.steps_data && Array.isArray(activeSession.steps_data) && activeSession.steps_data.length > 0) {
+        // Auto program
+        const program: Program = {
+          id: activeSession.id.toString(),
+          program_name: activeSession.program_name || 'Auto Program',
+          steps: activeSession.steps_data
+        };
         
-        if (activeSession && mode === 'selection') {
-          // We were on selection screen but a session is active - restore it
-          console.log('[INDEX] 🔄 Active session found while on selection screen, restoring...', activeSession);
-          
-          // Check if it's an auto program
-          if (activeSession.steps_data && Array.isArray(activeSession.steps_data) && activeSession.steps_data.length > 0) {
-            // Auto program
-            const program: Program = {
-              id: activeSession.id.toString(),
-              program_name: activeSession.program_name || 'Auto Program',
-              steps: activeSession.steps_data
-            };
-            
-            setSelectedProgram(program);
-            setMode('auto-running');
-          } else if (activeSession.target_pressure && activeSession.duration_minutes) {
-            // Manual mode
-            const targetPressure = parseFloat(activeSession.target_pressure);
-            const duration = parseInt(activeSession.duration_minutes);
-            
-            setManualConfig({
-              targetPressure: targetPressure,
-              duration: duration
-            });
-            setMode('manual-running');
-          }
-          
-          toast({
-            title: "Session Detected",
-            description: "Resuming active session...",
-          });
-        }
-      } catch (error) {
-        console.error('[INDEX] Session check error:', error);
+        setSelectedProgram(program);
+        setMode('auto-running');
+      } else if (activeSession.target_pressure && activeSession.duration_minutes) {
+        // Manual mode
+        setManualConfig({
+          targetPressure: activeSession.target_pressure,
+          duration: activeSession.duration_minutes
+        });
+        setMode('manual-running');
       }
-    }, 2000); // Check every 2 seconds
-
-    return () => {
-      clearInterval(interval);
-      clearInterval(sessionCheck);
-    };
-  }, [mode]);
+      
+      toast({
+        title: "Session Detected",
+        description: "Resuming active session...",
+      });
+    },
+  });
 
   const handleModeSelect = (selectedMode: 'auto' | 'manual' | 'history') => {
     if (selectedMode === 'auto') {